@@ -0,0 +1,4 @@
+"""Performance benchmarks for the calculator. Run from the repository root, e.g.
+
+    python -m benchmarks.bench_engine
+"""
@@ -0,0 +1,29 @@
+"""Batch evaluation throughput (lines/s) for a mixed expression file at 1, 4 and one-per-CPU processes."""
+import os
+import sys
+import time
+import calc_batch
+
+class _NullWriter:
+    def write(self, text): pass
+
+def make_lines(count):
+    # Arithmetic, trig with functions and a few errors, as a generated file of one expression per line would give
+    patterns = ["{i}+{j}*{k}-{j}/{k}", "sin({i}/100)+cos({j})*2", "sqrt({i})*ln({k})", "({i}+{j})^2÷{k}", "log({j}-{j})"]
+    return (patterns[i % len(patterns)].format(i=i, j=i % 97 + 1, k=i % 13 + 1) + "\n" for i in range(count))
+
+def run(count=200000, process_counts=None):
+    cpus = os.cpu_count() or 1
+    results = {"lines": count, "cpus": cpus}
+    for processes in process_counts or sorted({1, 4, cpus}):
+        start = time.perf_counter()
+        calc_batch.evaluate_file(make_lines(count), _NullWriter(), processes=processes)
+        results[f"lines_per_s@{processes}"] = count / (time.perf_counter() - start)
+    return results
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    for key, value in run(count).items(): print(f"{key:>18}: {value:,.0f}" if isinstance(value, float) else f"{key:>18}: {value}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+"""Cost of the calc_cost pre-evaluation check per expression."""
+import time
+from calc_cost import estimate_bits
+from calc_engine import parse
+from benchmarks.bench_engine import make_expressions
+
+SAMPLES = ["2+3", "12*7-3/4", "9**9**9", "2**64*3**40", "(1+2)*(3+4)**5", "sin(30)+cos(60)", "123456789*987654321+1"]
+
+def run(count=20000):
+    trees = [parse(expression) for expression in SAMPLES + make_expressions(count, count)]
+    start = time.perf_counter()
+    for tree in trees: estimate_bits(tree)
+    elapsed = time.perf_counter() - start
+    worst = max(_time_one(tree) for tree in trees[:len(SAMPLES)])
+    return {"expressions": len(trees), "mean_us": elapsed / len(trees) * 1e6, "worst_sample_us": worst * 1e6}
+
+def _time_one(tree, repeat=1000):
+    start = time.perf_counter()
+    for _ in range(repeat): estimate_bits(tree)
+    return (time.perf_counter() - start) / repeat
+
+def main():
+    for key, value in run().items():
+        print(f"{key:>16}: {value:.3f}" if isinstance(value, float) else f"{key:>16}: {value}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""Compare the cached expression engine with the old ``eval(self.expression)`` path."""
+import random
+import time
+from calc_engine import ExpressionEngine
+
+def make_expressions(count, distinct, seed=42):
+    rng = random.Random(seed)
+    pool = []
+    for _ in range(distinct):
+        parts = [str(rng.randint(1, 9999))]
+        for _ in range(rng.randint(1, 6)):
+            parts.append(rng.choice(["+", "-", "*", "/"])); parts.append(str(rng.choice([rng.randint(1, 999), round(rng.uniform(1, 99), 4)])))
+        pool.append("".join(parts))
+    # Calculator input repeats: results are recalled from memory and history and edited further
+    return [rng.choice(pool) for _ in range(count)]
+
+def _time(func, expressions):
+    start = time.perf_counter()
+    for expression in expressions: func(expression)
+    return time.perf_counter() - start
+
+def run(count=20000, distinct=2000):
+    expressions = make_expressions(count, distinct)
+    eval_seconds = _time(eval, expressions)
+    cold = ExpressionEngine(cache_size=0)
+    cold_seconds = _time(cold.evaluate, expressions)
+    engine = ExpressionEngine(cache_size=4096)
+    cached_seconds = _time(engine.evaluate, expressions)
+    return {
+        "expressions": count, "distinct": distinct,
+        "eval_us": eval_seconds / count * 1e6,
+        "engine_uncached_us": cold_seconds / count * 1e6,
+        "engine_cached_us": cached_seconds / count * 1e6,
+        "speedup_vs_eval": eval_seconds / cached_seconds,
+        "cache_hit_rate": engine.cache_info().hits / count,
+    }
+
+def main():
+    for key, value in run().items():
+        print(f"{key:>20}: {value:.3f}" if isinstance(value, float) else f"{key:>20}: {value}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""Keystroke cost on a long input line: ``str`` concatenation vs ExpressionBuffer.
+
+Types ``length`` keys, deleting every fifth, and reads the display text every
+``read_every`` keys (1 is the old per-keystroke display; larger values model
+coalesced display updates).
+"""
+import time
+from expression_buffer import ExpressionBuffer
+
+def _keys(length):
+    return [("Del" if i % 5 == 4 else "+" if i % 7 == 6 else str(i % 10)) for i in range(length)]
+
+def _with_str(keys, read_every):
+    expression = ""
+    for i, key in enumerate(keys):
+        expression = expression[:-1] if key == "Del" else expression + key
+        if i % read_every == 0: len(expression)
+    return expression
+
+def _with_buffer(keys, read_every):
+    buffer = ExpressionBuffer()
+    for i, key in enumerate(keys):
+        if key == "Del": buffer.pop()
+        else: buffer.append(key)
+        if i % read_every == 0: buffer.text
+    return buffer.text
+
+def run(length=200000):
+    keys = _keys(length); results = {"keys": length}
+    for read_every in (1, 100):
+        for name, func in (("str", _with_str), ("buffer", _with_buffer)):
+            start = time.perf_counter(); func(keys, read_every)
+            results[f"us_per_key[{name}, read every {read_every}]"] = (time.perf_counter() - start) / length * 1e6
+    return results
+
+def main():
+    for key, value in run().items(): print(f"{key:>38}: {value:.3f}" if isinstance(value, float) else f"{key:>38}: {value}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+"""HistoryStore append and lookup cost as the history grows."""
+import os
+import shutil
+import tempfile
+import time
+from history_store import HistoryStore
+
+def run(sizes=(1000, 100000), appends=500):
+    directory = tempfile.mkdtemp()
+    results = {}
+    try:
+        store = HistoryStore(os.path.join(directory, "history.sqlite3"))
+        loaded = 0
+        for size in sizes:
+            store.extend((f"{i}*3", str(i * 3), 1.7e9 + i) for i in range(loaded, size)); loaded = size
+            start = time.perf_counter()
+            for i in range(appends): store.append(f"{i}+1", str(i + 1))
+            results[f"append_us@{size}"] = (time.perf_counter() - start) / appends * 1e6
+            start = time.perf_counter()
+            for i in range(100): store.ids_containing(f"{i}*", limit=50); store.ids_with_value(i * 3, i * 3); store.ids_between(1.7e9 + i, 1.7e9 + i + 100)
+            results[f"lookup_us@{size}"] = (time.perf_counter() - start) / 300 * 1e6
+            loaded += appends
+        store.close()
+    finally:
+        shutil.rmtree(directory)
+    return results
+
+def main():
+    for key, value in run().items(): print(f"{key:>20}: {value:.1f}")
+
+if __name__ == "__main__":
+    main()
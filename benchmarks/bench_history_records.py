@@ -0,0 +1,36 @@
+"""Memory per in-memory history entry: "expr=result" strings vs HistoryRecord."""
+import time
+import tracemalloc
+from history_store import HistoryRecord
+
+class _DictRecord: # The same fields without __slots__, for comparison
+    def __init__(self, expression, value, degree_mode=False, timestamp=None):
+        self.expression = expression; self.value = value
+        self.degree_mode = degree_mode; self.timestamp = timestamp
+
+def _bytes_per_entry(build, count):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    entries = build(count)
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del entries
+    return used / count
+
+def _expressions(count):
+    return [(f"{i}*3+{i % 97}", i * 3 + i % 97) for i in range(count)]
+
+def run(count=100000):
+    now = time.time()
+    builders = {
+        "string": lambda n: [f"{expression}={value}" for expression, value in _expressions(n)],
+        "dict_record": lambda n: [_DictRecord(expression, float(value), False, now + i) for i, (expression, value) in enumerate(_expressions(n))],
+        "history_record": lambda n: [HistoryRecord(expression, float(value), False, now + i) for i, (expression, value) in enumerate(_expressions(n))],
+    }
+    return {f"bytes_per_entry[{name}]": _bytes_per_entry(build, count) for name, build in builders.items()}
+
+def main():
+    for key, value in run().items(): print(f"{key:>30}: {value:.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""Per-keystroke history filter latency over a large history (default 500,000 entries)."""
+import os
+import random
+import shutil
+import tempfile
+import time
+from history_search import search
+from history_store import HistoryStore
+
+QUERIES = ["1", "12", "123", "1234", "*35", "+7", "=42", "=100..200", "2026-01-15", "2026-01-01..2026-01-31"]
+
+def build(path, entries, seed=7):
+    rng = random.Random(seed)
+    store = HistoryStore(path)
+    start_ts = time.mktime((2026, 1, 1, 0, 0, 0, 0, 0, -1))
+    batch = []
+    for i in range(entries):
+        a, b = rng.randint(1, 9999), rng.randint(1, 999)
+        op = rng.choice("+-*")
+        batch.append((f"{a}{op}{b}", str(eval(f"{a}{op}{b}")), start_ts + i * 30))
+        if len(batch) == 50000: store.extend(batch); batch = []
+    store.extend(batch)
+    return store
+
+def run(entries=500000):
+    directory = tempfile.mkdtemp()
+    try:
+        start = time.perf_counter()
+        store = build(os.path.join(directory, "history.sqlite3"), entries)
+        results = {"entries": entries, "build_s": time.perf_counter() - start}
+        for query in QUERIES:
+            start = time.perf_counter()
+            ids = search(store, query)
+            store.records_by_ids(ids[-12:]) # First visible page
+            results[f"{query!r}_ms"] = (time.perf_counter() - start) * 1e3
+            results[f"{query!r}_matches"] = len(ids)
+        store.close()
+    finally:
+        shutil.rmtree(directory)
+    return results
+
+def main():
+    for key, value in run().items():
+        print(f"{key:>32}: {value:.2f}" if isinstance(value, float) else f"{key:>32}: {value}")
+
+if __name__ == "__main__":
+    main()
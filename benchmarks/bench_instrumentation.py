@@ -0,0 +1,35 @@
+"""Cost of the instrumentation wrappers.
+
+A disabled calculator has no wrappers, so the disabled cost is that of a plain
+method call; enabled, each call pays two ``perf_counter_ns`` reads and one
+histogram insert. Also times ``percentile`` and a full ``snapshot``.
+"""
+import time
+from instrumentation import Instrumentation, LatencyHistogram
+
+class _Target:
+    def op(self, x): return x
+
+def _per_call_ns(func, calls):
+    start = time.perf_counter_ns()
+    for i in range(calls): func(i)
+    return (time.perf_counter_ns() - start) / calls
+
+def run(calls=1000000):
+    plain = _Target(); timed = _Target()
+    stats = Instrumentation(); stats.instrument(timed, ("op",))
+    disabled_ns = _per_call_ns(plain.op, calls)
+    enabled_ns = _per_call_ns(timed.op, calls)
+    histogram = LatencyHistogram()
+    add_ns = _per_call_ns(histogram.add, calls)
+    start = time.perf_counter(); histogram.percentile(0.99); percentile_us = (time.perf_counter() - start) * 1e6
+    for name in ("a", "b", "c", "d", "e", "f", "g", "h", "i", "j"): stats.histogram(name).add(1000)
+    start = time.perf_counter(); stats.snapshot(); snapshot_us = (time.perf_counter() - start) * 1e6
+    return {"call_ns[disabled]": disabled_ns, "call_ns[enabled]": enabled_ns, "overhead_ns": enabled_ns - disabled_ns,
+            "histogram_add_ns": add_ns, "percentile_us": percentile_us, "snapshot_us[10 ops]": snapshot_us}
+
+def main():
+    for key, value in run().items(): print(f"{key:>20}: {value:.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""Sustained keystrokes per second the main window absorbs, per-key display updates vs coalesced.
+
+Keys arrive in bursts; after each burst ``root.update()`` runs the event loop
+(draining the input queue and redrawing), as it would between bursts of
+auto-repeat or scanner input. Rates are measured with a short expression and
+with one already ``long_length`` characters long, where each per-key display
+update copies the whole text into Tk. Needs a display.
+"""
+import os
+import tempfile
+import time
+
+def _rate(calc, root, coalesce, prefix, seconds, burst):
+    keys = "1234567890+"; typed = 0
+    calc.expression = prefix; root.update()
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        for i in range(burst):
+            char = keys[(typed + i) % len(keys)]
+            if coalesce: calc.handle_keypress(type("Event", (), {"char": char, "keysym": char})())
+            else: calc.button_click(char) # One display update per key, as before coalescing
+        root.update()
+        typed += burst
+        if len(calc.buffer) > len(prefix) + 20000: calc.expression = prefix
+    return typed / (time.perf_counter() - start)
+
+def run(seconds=1.0, burst=100, long_length=20000):
+    import tkinter as tk
+    import calculator
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        calculator.Calculator.SETTINGS_FILE = os.path.join(directory, "settings.json")
+        calculator.Calculator.HISTORY_FILE = os.path.join(directory, "history.sqlite3")
+        try: root = tk.Tk()
+        except tk.TclError as e: return {"display": str(e)}
+        try:
+            calc = calculator.Calculator(root)
+            for label, prefix in (("short", ""), ("long", "1+" * (long_length // 2))):
+                for mode, coalesce in (("per_key", False), ("coalesced", True)):
+                    results[f"keys_per_s[{mode}, {label}]"] = _rate(calc, root, coalesce, prefix, seconds, burst)
+            calc.settings_store.flush()
+        finally:
+            root.destroy()
+    return results
+
+def main():
+    for key, value in run().items(): print(f"{key:>30}: {value:,.0f}" if isinstance(value, float) else f"{key:>30}: {value}")
+
+if __name__ == "__main__":
+    main()
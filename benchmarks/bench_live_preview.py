@@ -0,0 +1,43 @@
+"""Live preview cost per keystroke: incremental PreviewEvaluator vs re-evaluating the whole expression."""
+import time
+from calc_engine import ExpressionEngine
+from expression_buffer import ExpressionBuffer
+from live_preview import PreviewEvaluator
+
+def _keys(terms):
+    keys = []
+    for i in range(terms):
+        if i: keys.append("+-*"[i % 3])
+        keys.extend(str(i % 97 + 1))
+        if i % 10 == 9: keys.append("Del"); keys.extend(str(i % 7 + 1)) # Corrections
+    return keys
+
+def _type(keys, preview):
+    buffer = ExpressionBuffer()
+    start = time.perf_counter()
+    for key in keys:
+        if key == "Del": buffer.pop()
+        else: buffer.append(key)
+        preview(buffer)
+    return (time.perf_counter() - start) / len(keys) * 1e6
+
+def _full(engine):
+    def preview(buffer):
+        try: return engine.evaluate(buffer.text.rstrip("+-*/"))
+        except Exception: return None
+    return preview
+
+def run(terms=(50, 500, 2000)):
+    results = {}
+    for count in terms:
+        keys = _keys(count)
+        evaluator = PreviewEvaluator()
+        results[f"us_per_key[incremental, {count} terms]"] = _type(keys, evaluator.update)
+        results[f"us_per_key[full, {count} terms]"] = _type(keys, _full(ExpressionEngine(cache_size=0)))
+    return results
+
+def main():
+    for key, value in run().items(): print(f"{key:>36}: {value:.1f}")
+
+if __name__ == "__main__":
+    main()
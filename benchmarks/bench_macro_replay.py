@@ -0,0 +1,41 @@
+"""Replay speed of a synthetic 100k-step session (macro.replay) against the headless CalculatorCore.
+
+The session mixes keypad clicks, keyboard keys, Del, "=", memory buttons and
+pastes, in roughly the proportions of a long working session. No display needed.
+"""
+import os
+import random
+import tempfile
+from macro import Step
+
+def make_session(steps, seed=3):
+    rng = random.Random(seed); session = []
+    while len(session) < steps:
+        for _ in range(rng.randint(1, 6)):
+            digits = str(rng.randint(1, 9999))
+            if rng.random() < 0.5: session.extend(Step(0, "c", digit) for digit in digits)
+            else: session.extend(Step(0, "k", [digit, digit]) for digit in digits)
+            session.append(Step(0, "c", rng.choice("+-*/")))
+        if rng.random() < 0.2: session.append(Step(0, "c", "Del"))
+        if rng.random() < 0.1: session.append(Step(0, "p", f"{rng.randint(1, 99)}*({rng.randint(1, 99)}+{rng.randint(1, 99)})"))
+        else: session.append(Step(0, "c", str(rng.randint(1, 9))))
+        session.append(Step(0, "k", ["Return", "\r"]) if rng.random() < 0.5 else Step(0, "c", "="))
+        if rng.random() < 0.1: session.append(Step(0, "c", rng.choice(["MS", "M+", "MR", "MNext"])))
+        if rng.random() < 0.3: session.append(Step(0, "c", "C"))
+    return session[:steps]
+
+def run(steps=100000):
+    import macro
+    from calc_core import CalculatorCore
+    session = make_session(steps)
+    with tempfile.TemporaryDirectory() as directory:
+        calc = CalculatorCore(macro.HeadlessView(), os.path.join(directory, "settings.json"), os.path.join(directory, "history.sqlite3"))
+        try: report = macro.replay(calc, session)
+        finally: calc.close()
+    return report.summary()
+
+def main():
+    for key, value in run().items(): print(f"{key:>14}: {value:,.1f}" if isinstance(value, float) else f"{key:>14}: {value}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+"""Table/Plot costs: vectorised evaluation rate and the time of one plot redraw (sample + polylines) while panning and zooming.
+
+A redraw has to fit in a 60 Hz frame (16.7 ms) for dragging to feel smooth. Canvas drawing itself needs a display and is not included.
+"""
+import time
+import calc_plot
+from calc_plot import FunctionOfX, Viewport
+
+FUNCTIONS = ["sin(x)*x^2", "tan(x)", "ln(x)+√x", "exp(sin(x))/(1+x^2)"]
+WIDTH, HEIGHT = 600, 400
+
+def _redraw_ms(function, viewport, steps=40):
+    budget = min(4000, 2 * viewport.width); start = time.perf_counter()
+    for step in range(steps): # Alternate panning and zooming, as a user would
+        if step % 2: viewport.pan(7, 3)
+        else: viewport.zoom(0.97 if step % 4 else 1.03, WIDTH / 2, HEIGHT / 2)
+        xs, ys = calc_plot.adaptive_samples(function, viewport.x_min, viewport.x_max, budget, (viewport.y_max - viewport.y_min) / viewport.height / 2)
+        calc_plot.polylines(xs, ys, viewport)
+    return (time.perf_counter() - start) / steps * 1000
+
+def run():
+    results = {"backend": "numpy" if calc_plot.numpy is not None else "python"}
+    xs = calc_plot.linspace(-10.0, 10.0, 100000)
+    for expression in FUNCTIONS:
+        function = FunctionOfX(expression)
+        start = time.perf_counter(); function(xs)
+        results[f"points_per_s[{expression}]"] = len(xs) / (time.perf_counter() - start)
+        y_min, y_max = calc_plot.y_range(function(calc_plot.linspace(-10.0, 10.0, 256)))
+        results[f"redraw_ms[{expression}]"] = _redraw_ms(function, Viewport(-10.0, 10.0, y_min, y_max, WIDTH, HEIGHT))
+    return results
+
+def main():
+    for key, value in run().items(): print(f"{key:>36}: {value:,.2f}" if isinstance(value, float) else f"{key:>36}: {value}")
+
+if __name__ == "__main__":
+    main()
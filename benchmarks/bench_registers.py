@@ -0,0 +1,52 @@
+"""Memory and persistence cost of 1,000 memory registers: a list of floats in the settings JSON vs. RegisterBank.
+
+A "store" is one MS: change one register and persist it. The list version rewrites the whole
+settings file (as SettingsStore does once per write); the bank patches 8 bytes in place.
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+from register_bank import RegisterBank
+from settings_store import SettingsStore
+
+REGISTERS = 1000
+STORES = 500
+
+def _list_bytes(values):
+    return sys.getsizeof(values) + sum(sys.getsizeof(value) for value in values)
+
+def run(registers=REGISTERS, stores=STORES):
+    directory = tempfile.mkdtemp()
+    try:
+        values = [i * 1.000001 for i in range(registers)] # Distinct floats, one object each
+        bank = RegisterBank(registers, os.path.join(directory, "calc_settings.registers")); bank[:] = values; bank.flush()
+        results = {"registers": registers, "list_bytes": _list_bytes(values), "bank_bytes": sys.getsizeof(bank.values)}
+
+        store = SettingsStore(os.path.join(directory, "calc_settings.json"), delay=3600)
+        start = time.perf_counter()
+        for i in range(stores):
+            values[i % registers] += 1.0
+            store.update({"theme": "Light", "memory_slots": values, "active_memory_slot_index": 0}); store.flush()
+        results["list_store_us"] = (time.perf_counter() - start) / stores * 1e6
+        results["list_bytes_per_store"] = store.bytes_written / stores
+
+        written = bank.bytes_written; start = time.perf_counter()
+        for i in range(stores):
+            bank[i % registers] += 1.0; bank.flush()
+        results["bank_store_us"] = (time.perf_counter() - start) / stores * 1e6
+        results["bank_bytes_per_store"] = (bank.bytes_written - written) / stores
+
+        start = time.perf_counter()
+        for _ in range(100): RegisterBank(registers, bank.path).load()
+        results["bank_load_us"] = (time.perf_counter() - start) / 100 * 1e6
+        return results
+    finally:
+        shutil.rmtree(directory, True)
+
+def main():
+    for key, value in run().items(): print(f"{key:>22}: {value:,.2f}" if isinstance(value, float) else f"{key:>22}: {value:,}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+"""Throughput and tail latency of calc_service under its own load-test client, in-process, with 0 and one-per-CPU workers.
+
+For numbers without the client sharing the server's event loop, run
+``python -m calc_service serve`` and ``python -m calc_service load`` in separate terminals.
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import calc_service
+
+async def _measure(workers, history_file, requests, mix):
+    service = calc_service.CalculatorService(workers, history_file)
+    await service.start(port=0)
+    host, port = service.address[:2]
+    try: return await calc_service.load_test(lambda: asyncio.open_connection(host, port), connections=16, requests=requests, depth=32, mix=mix)
+    finally: await service.close()
+
+def run(requests=50000, mix="mixed"):
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for workers in sorted({0, os.cpu_count() or 1}):
+            report = asyncio.run(_measure(workers, os.path.join(directory, "history.sqlite3"), requests, mix))
+            for key in ("requests_per_s", "p50_us", "p99_us", "max_us"): results[f"{key}@{workers}"] = report[key]
+    return results
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    for key, value in run(requests).items(): print(f"{key:>20}: {value:,.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""Disk writes and UI-thread time per 1,000 calculations: synchronous save vs. SettingsStore."""
+import collections
+import json
+import os
+import tempfile
+import time
+from settings_store import SettingsStore
+
+def _settings(history, i):
+    history.append(f"{i}+{i}={2 * i}")
+    return {"theme": "Light", "history": list(history), "memory_slots": [0.0] * 5, "active_memory_slot_index": 0}
+
+def legacy_save(path, settings):
+    with open(path, "w") as f: json.dump(settings, f, indent=4)
+
+def run(calculations=1000):
+    directory = tempfile.mkdtemp()
+    legacy_path = os.path.join(directory, "legacy.json")
+    history = collections.deque(maxlen=10)
+    start = time.perf_counter()
+    for i in range(calculations): legacy_save(legacy_path, _settings(history, i))
+    legacy_seconds = time.perf_counter() - start
+
+    store = SettingsStore(os.path.join(directory, "store.json"), delay=0.05)
+    history.clear()
+    start = time.perf_counter()
+    for i in range(calculations): store.update(_settings(history, i))
+    store_seconds = time.perf_counter() - start
+    store.flush()
+    for name in os.listdir(directory): os.remove(os.path.join(directory, name))
+    os.rmdir(directory)
+    return {
+        "calculations": calculations,
+        "legacy_writes": calculations, "legacy_ui_ms": legacy_seconds * 1e3,
+        "store_writes": store.writes, "store_ui_ms": store_seconds * 1e3,
+    }
+
+def main():
+    for key, value in run().items():
+        print(f"{key:>14}: {value:.3f}" if isinstance(value, float) else f"{key:>14}: {value}")
+
+if __name__ == "__main__":
+    main()
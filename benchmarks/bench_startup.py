@@ -0,0 +1,61 @@
+"""Startup cost in a fresh interpreter: importing calculator, building Calculator, first mainloop idle.
+
+Each sample runs in its own process so module imports are not cached. The
+budgets are enforced by test_startup.py.
+"""
+import json
+import os
+import subprocess
+import sys
+
+IMPORT_BUDGET_MS = 250 # CPU time, so other processes competing for the CPU (pytest -n) do not count against it
+FIRST_IDLE_BUDGET_MS = 1000 # From interpreter start of the measurement to the first idle callback
+
+_PROBE = r"""
+import json, sys, time
+start = time.perf_counter(); start_cpu = time.process_time()
+import calculator
+imported = time.perf_counter()
+result = {"import_ms": (imported - start) * 1e3, "import_cpu_ms": (time.process_time() - start_cpu) * 1e3, "deferred_modules": sorted(
+    name for name in ("multiprocessing", "calc_worker", "unit_batch", "csv", "argparse", "history_search", "tempfile") if name in sys.modules)}
+try:
+    root = calculator.tk.Tk()
+except Exception as e: # No display
+    result["error"] = str(e)
+else:
+    calculator.Calculator.SETTINGS_FILE = sys.argv[1]; calculator.Calculator.HISTORY_FILE = sys.argv[2]
+    calculator.Calculator(root)
+    constructed = time.perf_counter()
+    def first_idle():
+        result["construct_ms"] = (constructed - imported) * 1e3
+        result["first_idle_ms"] = (time.perf_counter() - start) * 1e3
+        root.destroy()
+    root.after_idle(first_idle)
+    root.mainloop()
+print(json.dumps(result))
+"""
+
+def measure(directory=None):
+    """One fresh-process sample: ``import_ms``, ``import_cpu_ms``, ``deferred_modules`` and, with a display, ``construct_ms`` and ``first_idle_ms``."""
+    import tempfile
+    with tempfile.TemporaryDirectory() as scratch:
+        directory = directory or scratch
+        args = [sys.executable, "-c", _PROBE, os.path.join(directory, "settings.json"), os.path.join(directory, "history.sqlite3")]
+        repo = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        output = subprocess.run(args, cwd=repo, capture_output=True, text=True, check=True).stdout
+        return json.loads(output.strip().splitlines()[-1])
+
+def run(samples=5):
+    results = [measure() for _ in range(samples)]
+    summary = {"deferred_modules_loaded": results[0]["deferred_modules"]}
+    for key in ("import_ms", "import_cpu_ms", "construct_ms", "first_idle_ms"):
+        values = sorted(result[key] for result in results if key in result)
+        if values: summary[key] = values[len(values) // 2] # Median
+    if "error" in results[0]: summary["display"] = results[0]["error"]
+    return summary
+
+def main():
+    for key, value in run().items(): print(f"{key:>24}: {value:.1f}" if isinstance(value, float) else f"{key:>24}: {value}")
+
+if __name__ == "__main__":
+    main()
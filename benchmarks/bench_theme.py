@@ -0,0 +1,63 @@
+"""Theme toggle latency with large History and Units windows open.
+
+Compares a delta-only toggle (``toggle_theme``) with a full push of the whole
+style table, and times compiling and diffing the tables themselves. The
+toggle timings need a display; without one only the table timings are reported.
+"""
+import os
+import tempfile
+import time
+import theme_styles
+
+def _table_timings(repeats=10000):
+    light, dark = theme_styles.THEMES["Light"], theme_styles.THEMES["Dark"]
+    start = time.perf_counter()
+    for _ in range(repeats): theme_styles.compile_theme("Dark", dark)
+    compile_us = (time.perf_counter() - start) / repeats * 1e6
+    light_table, dark_table = theme_styles.compile_theme("Light", light), theme_styles.compile_theme("Dark", dark)
+    start = time.perf_counter()
+    for _ in range(repeats): dark_table.changes_from(light_table)
+    delta_us = (time.perf_counter() - start) / repeats * 1e6
+    return {"compile_us": compile_us, "delta_us": delta_us}
+
+def _toggle_timings(directory, history_rows, batch_lines, toggles):
+    import tkinter as tk
+    import calculator
+    root = tk.Tk()
+    calculator.Calculator.SETTINGS_FILE = os.path.join(directory, "settings.json")
+    calculator.Calculator.HISTORY_FILE = os.path.join(directory, "history.sqlite3")
+    try:
+        calc = calculator.Calculator(root)
+        now = time.time()
+        calc.history_store.extend((f"{i}*3", str(i * 3), now) for i in range(history_rows))
+        calc.toggle_history_window()
+        calc.toggle_unit_conversion_window()
+        largest = max(calc.unit_catalog.names, key=lambda name: len(calc.unit_catalog[name].units))
+        calc.uc_category_var.set(largest); calc.update_unit_menus()
+        calc.toggle_uc_batch_window()
+        calc.uc_batch_input.insert(tk.END, "\n".join(map(str, range(batch_lines))))
+        root.update()
+        results = {}
+        for label, full in (("toggle_ms[delta]", False), ("toggle_ms[full]", True)):
+            start = time.perf_counter()
+            for _ in range(toggles):
+                if full: calc._applied_theme = None # Forces every option to be pushed again
+                calc.toggle_theme(); root.update_idletasks()
+            results[label] = (time.perf_counter() - start) / toggles * 1e3
+        calc.settings_store.flush()
+        return results
+    finally:
+        root.destroy()
+
+def run(history_rows=200000, batch_lines=50000, toggles=50):
+    results = _table_timings()
+    with tempfile.TemporaryDirectory() as directory:
+        try: results.update(_toggle_timings(directory, history_rows, batch_lines, toggles))
+        except Exception as e: results["display"] = str(e) # No display
+    return results
+
+def main():
+    for key, value in run().items(): print(f"{key:>20}: {value:.3f}" if isinstance(value, float) else f"{key:>20}: {value}")
+
+if __name__ == "__main__":
+    main()
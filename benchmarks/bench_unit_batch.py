@@ -0,0 +1,29 @@
+"""Batch conversion throughput for 10M values: chunked arithmetic and the full text stream."""
+import sys
+import time
+from array import array
+import unit_batch
+from units import default_catalog
+
+class _NullWriter:
+    def write(self, text): pass
+
+def run(count=10000000, chunk_size=unit_batch.CHUNK_SIZE):
+    scale, offset = default_catalog()["Length"].coefficients("mi", "km")
+    chunk = array("d", (float(i % 1000) for i in range(chunk_size)))
+    start = time.perf_counter()
+    for _ in range(count // chunk_size): unit_batch.convert_array(chunk, scale, offset)
+    arithmetic = (count // chunk_size) * chunk_size / (time.perf_counter() - start)
+    lines = (f"{i % 1000}.5\n" for i in range(count)) # Same text a file of one value per line would give
+    start = time.perf_counter()
+    converted = unit_batch.convert_file(lines, _NullWriter(), "Length", "mi", "km", chunk_size=chunk_size)
+    stream = converted / (time.perf_counter() - start)
+    return {"backend": "numpy" if unit_batch.numpy is not None else "array", "values": count,
+            "arithmetic_per_s": arithmetic, "stream_per_s": stream}
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000000
+    for key, value in run(count).items(): print(f"{key:>18}: {value / 1e6:.2f} M" if isinstance(value, float) else f"{key:>18}: {value}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+"""Unit catalogue cost: loading units.json, and lookup/type-ahead against thousands of units."""
+import random
+import string
+import time
+from units import DATA_FILE, UnitCatalog
+
+def _synthetic(count, seed):
+    rng = random.Random(seed)
+    units = []
+    for i in range(count):
+        code = "".join(rng.choice(string.ascii_uppercase) for _ in range(3)) + str(i)
+        units.append({"id": code, "name": f"Currency {code}", "symbol": code, "scale": rng.uniform(0.001, 1000), "aliases": [code.lower() + " money"]})
+    return {"categories": [{"name": "Currency", "format": ".2f", "units": units}]}
+
+def run(count=5000, queries=1000, seed=1):
+    start = time.perf_counter(); shipped = UnitCatalog.load(DATA_FILE); load_ms = (time.perf_counter() - start) * 1e3
+    catalog = UnitCatalog().merge(_synthetic(count, seed)); category = catalog["Currency"]
+    rng = random.Random(seed); ids = [unit.id for unit in category.units]
+    start = time.perf_counter(); category.search("a") # Builds the index
+    index_ms = (time.perf_counter() - start) * 1e3
+    typed = ["".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(1, 3))) for _ in range(queries)]
+    start = time.perf_counter()
+    for text in typed: category.search(text, 200)
+    search_us = (time.perf_counter() - start) / queries * 1e6
+    start = time.perf_counter()
+    for i in range(queries): category.convert(1.0, category.unit(ids[i % count]).id, ids[(i * 7) % count])
+    convert_us = (time.perf_counter() - start) / queries * 1e6
+    return {"shipped_units": len(shipped), "load_ms": load_ms, "synthetic_units": count, "index_ms": index_ms,
+            "search_us": search_us, "lookup_convert_us": convert_us}
+
+def main():
+    for key, value in run().items(): print(f"{key:>18}: {value:.1f}" if isinstance(value, float) else f"{key:>18}: {value}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Unit conversions per second: the old nested dict and if/elif chain vs the precomputed affine matrix."""
+import random
+import time
+from units import default_catalog
+
+CATEGORIES = ("Length", "Weight", "Temperature") # The categories the old converter had
+
+class _NestedDictConverter: # What perform_unit_conversion used to do
+    def __init__(self):
+        self.conversion_factors = {name: {unit.label: unit.scale for unit in default_catalog()[name].units} for name in ("Length", "Weight")}
+
+    def convert(self, value, category, from_label, to_label):
+        if category == "Temperature": return self._temperature(value, from_label, to_label)
+        category_factors = self.conversion_factors[category]
+        return value * category_factors[from_label] / category_factors[to_label]
+
+    @staticmethod
+    def _temperature(value, from_label, to_label):
+        if from_label == to_label: return value
+        if from_label == "Celsius (°C)":
+            if to_label == "Fahrenheit (°F)": return (value * 9/5) + 32
+            if to_label == "Kelvin (K)": return value + 273.15
+        elif from_label == "Fahrenheit (°F)":
+            if to_label == "Celsius (°C)": return (value - 32) * 5/9
+            if to_label == "Kelvin (K)": return ((value - 32) * 5/9) + 273.15
+        elif from_label == "Kelvin (K)":
+            if to_label == "Celsius (°C)": return value - 273.15
+            if to_label == "Fahrenheit (°F)": return ((value - 273.15) * 9/5) + 32
+        return None
+
+def _per_second(function, count):
+    start = time.perf_counter(); function(); return count / (time.perf_counter() - start)
+
+def run(count=1000000, seed=1):
+    rng = random.Random(seed)
+    values = [rng.uniform(-1e3, 1e3) for _ in range(count)]
+    legacy = _NestedDictConverter(); results = {}
+    for name in CATEGORIES:
+        category = default_catalog()[name]
+        ids = [unit.id for unit in category.units[:3]]; labels = [unit.label for unit in category.units[:3]] # Units the old table had
+        pairs = [(rng.randrange(3), rng.randrange(3)) for _ in range(count)]
+        old_args = [(v, labels[a], labels[b]) for v, (a, b) in zip(values, pairs)]
+        new_args = [(v, ids[a], ids[b]) for v, (a, b) in zip(values, pairs)]
+        results[f"nested_dict_{name}_per_s"] = _per_second(lambda: [legacy.convert(v, name, a, b) for v, a, b in old_args], count)
+        results[f"matrix_convert_{name}_per_s"] = _per_second(lambda: [category.convert(v, a, b) for v, a, b in new_args], count)
+    length = default_catalog()["Length"]
+    scale, offset = length.coefficients(length.units[1].id, length.units[3].id)
+    results["matrix_coefficients_per_s"] = _per_second(lambda: [v * scale + offset for v in values], count)
+    return results
+
+def main():
+    for key, value in run().items(): print(f"{key:>34}: {value / 1e6:.2f} M")
+
+if __name__ == "__main__":
+    main()
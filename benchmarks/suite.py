@@ -0,0 +1,186 @@
+"""The calculator's benchmark suite, compared against a stored baseline.
+
+    python -m benchmarks.suite                      # print the results
+    python -m benchmarks.suite --json out.json      # and write them as JSON
+    python -m benchmarks.suite --save-baseline      # record benchmarks/baseline.json
+    python -m benchmarks.suite --compare            # exit 1 if any metric regressed past --tolerance
+    xvfb-run -a python -m benchmarks.suite --compare
+
+Every case uses fixed inputs, runs ``--repeats`` times and reports the best
+run, as ``timeit`` does: slower runs measure other load on the machine, not
+the code. Metrics ending in ``_per_s`` are better when higher, all others
+(``_us``, ``_ms``) when lower. Cases that drive the Tk window are skipped,
+not failed, when there is no display; run them under Xvfb.
+
+Each run also times a fixed pure-Python workload (``calibration_per_s``).
+``--compare`` scales the baseline by how much faster or slower that workload
+ran, so a busier or slower machine is not reported as a regression. Record
+the baseline on the kind of machine that compares against it all the same.
+"""
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+DEFAULT_TOLERANCE = 0.25 # Allowed slowdown as a fraction of the baseline
+
+EVAL_CASES = { # Distinct expressions per case, evaluated through the engine's cache like recalled input
+    "simple": [f"{i}+{i % 97}*{i % 13 + 1}-{i % 7}/{i % 5 + 1}" for i in range(1, 201)],
+    "trig": [f"sin({i / 100})+cos({i / 50})*tan({i / 400})-ln({i})" for i in range(1, 201)],
+    "huge_int": [f"{i + 2}**{2000 + i}*3**1000" for i in range(20)],
+}
+HISTORY_SIZES = (10, 1000, 100000)
+
+def _per_second(func, items, seconds=0.2):
+    count = 0; start = time.perf_counter()
+    while True:
+        for item in items: func(item)
+        count += len(items); elapsed = time.perf_counter() - start
+        if elapsed >= seconds: return count / elapsed
+
+def _mean_us(func, calls):
+    start = time.perf_counter()
+    for _ in range(calls): func()
+    return (time.perf_counter() - start) / calls * 1e6
+
+def bench_calibration():
+    def workload(n):
+        total = 0
+        for i in range(n): total += i * i % 7
+        return total
+    return {"calibration_per_s": _per_second(workload, [1000])}
+
+def bench_evaluation():
+    from calc_engine import ExpressionEngine, evaluate_job
+    engine = ExpressionEngine(); results = {}
+    for name, expressions in EVAL_CASES.items():
+        for expression in expressions: engine.compile(expression) # Measure evaluation, not the first parse
+        results[f"eval_per_s[{name}]"] = _per_second(lambda expression: evaluate_job(engine, (expression, False, None, None)), expressions)
+    return results
+
+def bench_startup():
+    from benchmarks import bench_startup
+    sample = bench_startup.measure()
+    return {key: sample[key] for key in ("import_ms", "construct_ms", "first_idle_ms") if key in sample}
+
+def bench_window(directory):
+    """The Tk cases, in one withdrawn window; raises tkinter.TclError without a display."""
+    import tkinter as tk
+    import calculator
+    from history_store import HistoryRecord
+    Calculator = calculator.Calculator
+    Calculator.SETTINGS_FILE = os.path.join(directory, "settings.json")
+    Calculator.HISTORY_FILE = os.path.join(directory, "history.sqlite3")
+    root = tk.Tk(); root.withdraw()
+    try:
+        calc = Calculator(root); results = {}
+        keys = "12+34*56-78/9="
+        results["button_click_per_s"] = _per_second(calc.button_click, keys)
+        calc.memory_slots[:] = [2.0 ** 60 + i for i in range(Calculator.NUM_MEMORY_SLOTS)]
+        results["save_settings_us"] = _mean_us(calc.save_settings, 1000)
+        calc.settings_store.flush()
+        loaded = 0; now = time.time()
+        calc.toggle_history_window()
+        for size in HISTORY_SIZES:
+            calc.history_store.extend((f"{i}*3", str(i * 3), now) for i in range(loaded, size)); loaded = size
+            results[f"load_settings_us@{size}"] = _mean_us(calc.load_settings, 200)
+            calc.history_view.reload(); root.update_idletasks()
+            record = HistoryRecord("2+2", 4, timestamp=now)
+            results[f"update_history_display_us@{size}"] = _mean_us(lambda: (calc.update_history_display(record), root.update_idletasks()), 200)
+        calc.toggle_history_window()
+        calc.toggle_unit_conversion_window()
+        calc.uc_category_var.set("Length"); calc.update_unit_menus()
+        calc.uc_from_unit_var.set("ft"); calc.uc_to_unit_var.set("m"); calc.uc_input_var.set("12.5")
+        results["unit_conversion_us"] = _mean_us(calc.perform_unit_conversion, 2000)
+        calc.on_close_uc_window()
+        def toggle(): calc.toggle_theme(); root.update_idletasks()
+        results["apply_theme_ms"] = _mean_us(toggle, 20) / 1e3
+        calc.settings_store.flush()
+        return results
+    finally:
+        root.destroy()
+
+def _environment():
+    return {"python": platform.python_version(), "implementation": platform.python_implementation(),
+            "machine": platform.machine(), "system": platform.system(), "cpus": os.cpu_count()}
+
+def run(repeats=5):
+    """``{"environment": ..., "metrics": {name: best of repeats}, "skipped": {case: reason}}``."""
+    samples = {}; skipped = {}
+    def collect(results):
+        for key, value in results.items(): samples.setdefault(key, []).append(value)
+    for _ in range(repeats):
+        collect(bench_calibration()); collect(bench_evaluation()); collect(bench_startup())
+        if "window" not in skipped:
+            with tempfile.TemporaryDirectory() as directory:
+                try: collect(bench_window(directory))
+                except Exception as e: skipped["window"] = f"{type(e).__name__}: {e}" # No display
+    return {"environment": _environment(), "metrics": {key: (max if higher_is_better(key) else min)(values) for key, values in sorted(samples.items())},
+            "skipped": skipped}
+
+def higher_is_better(metric):
+    return metric.split("@")[0].split("[")[0].endswith("_per_s")
+
+def machine_speed(results, baseline):
+    """How much faster this machine ran the calibration workload than the baseline's did (1.0 if unknown)."""
+    now, then = results["metrics"].get("calibration_per_s"), baseline["metrics"].get("calibration_per_s")
+    return now / then if now and then else 1.0
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE, normalize=True):
+    """Rows ``(metric, baseline, current, change, status)``; status is "ok", "REGRESSED", "improved", "new", "missing" or "reference".
+
+    With ``normalize`` the baseline values are first scaled by ``machine_speed``.
+    """
+    rows = []; current = results["metrics"]; previous = dict(baseline["metrics"])
+    speed = machine_speed(results, baseline) if normalize else 1.0
+    for metric in previous:
+        if metric != "calibration_per_s": previous[metric] = previous[metric] * speed if higher_is_better(metric) else previous[metric] / speed
+    for metric in sorted(set(current) | set(previous)):
+        if metric not in previous: rows.append((metric, None, current[metric], None, "new")); continue
+        if metric not in current: rows.append((metric, previous[metric], None, None, "missing")); continue
+        old, new = previous[metric], current[metric]
+        if metric == "calibration_per_s": rows.append((metric, old, new, None, "reference")); continue # Measures the machine
+        # Slowdown factor minus one: positive is worse whichever way the metric points
+        change = (old / new if higher_is_better(metric) else new / old) - 1 if old and new else 0.0
+        status = "REGRESSED" if change > tolerance else "improved" if change < -tolerance else "ok"
+        rows.append((metric, old, new, change, status))
+    return rows
+
+def _format_value(value):
+    return "-" if value is None else f"{value:,.1f}"
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.suite", description="Run the calculator benchmark suite.")
+    parser.add_argument("--repeats", type=int, default=5, help="runs per case; the best is reported (default 5)")
+    parser.add_argument("--json", metavar="FILE", help="write the results to FILE")
+    parser.add_argument("--baseline", metavar="FILE", default=BASELINE_FILE, help="baseline file (default benchmarks/baseline.json)")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the baseline")
+    parser.add_argument("--compare", action="store_true", help="compare with the baseline and exit 1 on a regression")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="allowed slowdown fraction (default 0.25)")
+    parser.add_argument("--no-normalize", action="store_true", help="compare raw numbers, without scaling by the calibration workload")
+    args = parser.parse_args(argv)
+    results = run(args.repeats)
+    for case, reason in results["skipped"].items(): print(f"skipped {case}: {reason}", file=sys.stderr)
+    if args.json:
+        with open(args.json, "w") as f: json.dump(results, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w") as f: json.dump(results, f, indent=2)
+    if not args.compare:
+        for metric, value in results["metrics"].items(): print(f"{metric:>34}: {value:,.1f}")
+        return 0
+    with open(args.baseline) as f: baseline = json.load(f)
+    if baseline.get("environment") != results["environment"]: print("warning: the baseline was recorded on a different machine or Python", file=sys.stderr)
+    if not args.no_normalize: print(f"machine speed vs baseline: {machine_speed(results, baseline):.2f}x (baseline scaled to match)")
+    rows = compare(results, baseline, args.tolerance, normalize=not args.no_normalize)
+    for metric, old, new, change, status in rows:
+        print(f"{metric:>34} {_format_value(old):>14} {_format_value(new):>14} {'' if change is None else f'{change:+.0%}':>7}  {status}")
+    regressed = [row[0] for row in rows if row[4] == "REGRESSED"]
+    if regressed: print(f"{len(regressed)} metric(s) regressed more than {args.tolerance:.0%}: {', '.join(regressed)}", file=sys.stderr); return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
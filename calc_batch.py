@@ -0,0 +1,141 @@
+"""Batch evaluation of expressions: files and pipes, one expression per line.
+
+Lines are read lazily and evaluated ``chunk_size`` at a time, in this process
+or across a pool of worker processes, with results written in input order.
+At most a few chunks per worker are in flight, so a multi-GB input never sits
+in memory. Each line gets exactly what "=" gives in the calculator: the same
+expression engine, degree/radian mode, domain checks, tan pole rule and
+"Overflow" refusal, and pasted symbols (×, ÷, ^) are accepted. Also usable
+from the command line::
+
+    python -m calc_batch expressions.txt -o results.csv --processes 4
+    generate | python -m calc_batch --degrees --format jsonl
+"""
+import argparse
+import collections
+import csv
+import itertools
+import json
+import os
+import sys
+from calc_cost import ResultTooLargeError, check_bits
+from calc_engine import PASTE_SYMBOLS, ExpressionEngine, evaluate_job
+
+CHUNK_SIZE = 2048
+CHUNKS_PER_PROCESS = 2 # In-flight chunks per worker: enough to keep it busy, bounded for memory
+
+BatchResult = collections.namedtuple("BatchResult", "line expression result error") # result is None when error is set
+
+def evaluate_expression(engine, expression, degree_mode=False):
+    """``(result, error)`` for one line, as the calculator's "=" would show it."""
+    try:
+        check_bits(engine.compile(expression).bits)
+        return evaluate_job(engine, (expression, degree_mode, None, None))[1], None
+    except ResultTooLargeError: return None, "Overflow"
+    except Exception: return None, "Error"
+
+def clean_expression(text):
+    """``text`` without whitespace and with pasted symbols (×, ÷, ^, −) replaced, as a paste would give it."""
+    return "".join(text.split()).translate(PASTE_SYMBOLS)
+
+def evaluate_lines(numbered_lines, degree_mode=False, engine=None):
+    """BatchResults for ``(line number, text)`` pairs; blank lines are skipped."""
+    engine = engine or _engine(); results = []
+    for number, text in numbered_lines:
+        expression = clean_expression(text)
+        if expression: results.append(BatchResult(number, expression, *evaluate_expression(engine, expression, degree_mode)))
+    return results
+
+_worker_engine = None
+
+def _engine():
+    global _worker_engine # One engine (and compile cache) per process
+    if _worker_engine is None: _worker_engine = ExpressionEngine()
+    return _worker_engine
+
+def evaluate_expressions(jobs):
+    """``(result, error)`` for each ``(expression, degree_mode)`` pair, with this process's engine (a pool task)."""
+    engine = _engine()
+    return [evaluate_expression(engine, expression, degree_mode) for expression, degree_mode in jobs]
+
+def _evaluate_chunk(job):
+    return evaluate_lines(*job)
+
+def evaluate_stream(lines, degree_mode=False, processes=1, chunk_size=CHUNK_SIZE):
+    """Yield lists of BatchResults in input order, one list per ``chunk_size`` input lines.
+
+    ``processes`` > 1 evaluates chunks in that many worker processes (None or 0: one per CPU).
+    """
+    if chunk_size < 1: raise ValueError("chunk_size must be at least 1")
+    if processes is not None and processes < 0: raise ValueError("processes must not be negative")
+    processes = processes or os.cpu_count() or 1
+    numbered = enumerate(lines, 1)
+    chunks = iter(lambda: list(itertools.islice(numbered, chunk_size)), [])
+    if processes == 1:
+        for chunk in chunks: yield evaluate_lines(chunk, degree_mode)
+        return
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(processes) as pool:
+        pending = collections.deque()
+        for chunk in chunks:
+            pending.append(pool.submit(_evaluate_chunk, (chunk, degree_mode)))
+            if len(pending) >= processes * CHUNKS_PER_PROCESS: yield pending.popleft().result()
+        while pending: yield pending.popleft().result()
+
+class CsvWriter:
+    def __init__(self, destination):
+        self.writer = csv.writer(destination, lineterminator="\n")
+        self.writer.writerow(BatchResult._fields)
+
+    def write(self, results):
+        self.writer.writerows(results)
+
+class JsonLinesWriter:
+    def __init__(self, destination):
+        self.destination = destination
+
+    def write(self, results):
+        self.destination.write("".join(json.dumps(result._asdict(), ensure_ascii=False) + "\n" for result in results))
+
+WRITERS = {"csv": CsvWriter, "jsonl": JsonLinesWriter}
+
+def evaluate_file(source, destination, output_format="csv", **options):
+    """Evaluate ``source`` (a file object or iterable of lines) into ``destination``; returns ``(lines, errors)``."""
+    writer = WRITERS[output_format](destination); count = errors = 0
+    for results in evaluate_stream(source, **options):
+        writer.write(results); count += len(results); errors += sum(result.error is not None for result in results)
+    return count, errors
+
+def _positive_int(text):
+    value = int(text)
+    if value < 1: raise argparse.ArgumentTypeError(f"must be at least 1, not {value}")
+    return value
+
+def _non_negative_int(text):
+    value = int(text)
+    if value < 0: raise argparse.ArgumentTypeError(f"must be 0 or more, not {value}")
+    return value
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="calc_batch", description="Evaluate many calculator expressions, one per line.")
+    parser.add_argument("input", nargs="?", help="file to read (default: standard input)")
+    parser.add_argument("-o", "--output", help="file to write (default: standard output)")
+    parser.add_argument("--format", dest="output_format", choices=sorted(WRITERS), help="output format (default: from the output file's extension, else csv)")
+    parser.add_argument("--degrees", action="store_true", help="trigonometric functions take degrees (the Deg mode)")
+    parser.add_argument("--processes", type=_non_negative_int, default=1, help="worker processes; 0 for one per CPU (default 1)")
+    parser.add_argument("--chunk-size", type=_positive_int, default=CHUNK_SIZE, help=f"lines per chunk (default {CHUNK_SIZE})")
+    args = parser.parse_args(argv)
+    output_format = args.output_format or ("jsonl" if args.output and args.output.endswith((".jsonl", ".json")) else "csv")
+    source = open(args.input, encoding="utf-8") if args.input else sys.stdin
+    destination = open(args.output, "w", encoding="utf-8", newline="") if args.output else sys.stdout
+    try:
+        count, errors = evaluate_file(source, destination, output_format, degree_mode=args.degrees,
+                                      processes=args.processes or None, chunk_size=args.chunk_size)
+    finally:
+        if source is not sys.stdin: source.close()
+        if destination is not sys.stdout: destination.close()
+    if errors: print(f"{errors} of {count} expressions could not be evaluated", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,516 @@
+"""The calculator's state and keypad logic, without widgets.
+
+``CalculatorCore`` owns the expression, memory registers, angle mode, history,
+settings, live preview, unit conversion state and user definitions, and everything the keypad,
+keyboard and clipboard do to it. It reaches the outside world only through a
+view object with six methods:
+
+- ``variable(value)``: a holder with ``get()``/``set()`` (``tk.StringVar`` in the window)
+- ``after(ms, callback)``, ``after_idle(callback)``, ``after_cancel(job)``: scheduling
+- ``bell()`` and ``clipboard_text()``
+
+The Tk window (``calculator.Calculator``) subclasses the core, supplies a Tk
+view and overrides the display hooks (``apply_theme``, ``update_history_display``,
+``show_angle_mode``, ``show_live_preview``). Tests use the in-memory
+``test_support.FakeView``, and ``macro.HeadlessView`` replays macros without a
+display. Settings and history paths can be passed in, so instances do not
+share files.
+"""
+import collections
+import json
+import math
+import os
+import time
+from calc_cost import ResultTooLargeError, check_bits
+from calc_definitions import Definitions, is_definition
+from calc_engine import PASTE_SYMBOLS, ExpressionEngine, evaluate_job, known_name, tokenize
+from expression_buffer import ExpressionBuffer
+from history_store import HistoryRecord, HistoryStore
+from live_preview import PreviewEvaluator
+from register_bank import RegisterBank
+from settings_store import SettingsStore
+from units import default_catalog
+
+def convert_units(catalog, category, from_unit, to_unit, value_text):
+    """``(result, error)`` for the Units window's fields; the error is the text the window shows instead."""
+    if not all([value_text, from_unit, to_unit, category]): return None, "Missing input"
+    try: value_float = float(value_text)
+    except ValueError: return None, "Invalid input value"
+    try:
+        unit_category = catalog[category]
+        # Accepts a picked label or anything typed that names a unit ("ft", "feet", "Foot")
+        result = unit_category.convert(value_float, unit_category.unit(from_unit).id, unit_category.unit(to_unit).id)
+    except KeyError: return None, "Unknown unit"
+    return unit_category.format(result), None
+
+class CalculatorCore:
+    SETTINGS_FILE = "calc_settings.json" # Defaults; pass settings_file/history_file to use other files
+    SETTINGS_WRITE_DELAY = 0.5 # Seconds; saves within this window are coalesced into one write
+    HISTORY_FILE = "calc_history.sqlite3"
+    HISTORY_RETENTION_DAYS = 400 # Older calculations are dropped; None keeps everything
+    HISTORY_VISIBLE_ENTRIES = 10
+    NUM_MEMORY_SLOTS = 5 # Registers in the bank unless the "register_count" setting says otherwise
+    MAX_MEMORY_SLOTS = 10000
+    EVAL_TIME_BUDGET = 5.0 # Seconds before a background evaluation is abandoned
+    EVAL_MEMORY_BUDGET = 512 * 1024 * 1024 # Address-space limit for the evaluation worker (POSIX)
+    EVAL_POLL_MS = 15 # About one frame
+    INLINE_EVAL_MAX_LENGTH = 256 # Longer expressions are parsed and evaluated off the UI thread
+    INLINE_EVAL_MAX_BITS = 4096 # So are those whose estimated integer size (calc_cost) exceeds this
+    PREVIEW_INTERVAL_MS = 16 # Live preview refreshes at most once a frame
+    KEY_MAP = {"Return": "=", "KP_Enter": "=", "BackSpace": "Del"} # keysym -> keypad button; printable keys map by char
+    INSTRUMENTED_METHODS = ("button_click", "calculate", "_finish_calculate", "save_settings", "apply_theme", "update_history_display",
+                            "perform_unit_conversion", "_update_preview", "_drain_input") # See instrument()
+
+    def __init__(self, view, settings_file=None, history_file=None, registers_file=None):
+        self.view = view
+        self.buffer = ExpressionBuffer() # Tokens behind the expression property
+        self._pending_input = [] # Keys and pastes waiting for the next idle cycle
+        self._batching = False; self._display_dirty = False # While draining, typing marks the display dirty instead of setting it
+        self.recorder = None # macro.MacroRecorder capturing button_click, handle_keypress and on_paste input
+        self.instrumentation = None # instrumentation.Instrumentation timing INSTRUMENTED_METHODS, when enabled
+        self.result_var = view.variable("0")
+        self.definitions = Definitions() # Named variables and functions (calc_definitions), saved with the settings
+        self.live_preview = False # Running result under the display, toggled by the Preview button
+        self.preview = PreviewEvaluator(names=self.definitions.namespace)
+        self.preview_var = view.variable("")
+        self._preview_job = None
+
+        self.memory_slots = RegisterBank(CalculatorCore.NUM_MEMORY_SLOTS) # Replaced by load_settings with the bank read from registers_file
+        self.register_count = None # From the settings; None means NUM_MEMORY_SLOTS
+        self._register_entry = None # [command, digits, display] while STO/RCL is waiting for a register number
+        self.memory_slot_display_var = view.variable("")
+
+        self.engine = ExpressionEngine()
+        self.evaluator = None # calc_worker.EvaluationWorker, created by the first evaluation that needs it
+        self._pending_evaluation = None # (expression, on_result) while the worker is computing
+        self.degree_mode = False
+
+        self.history = collections.deque(maxlen=CalculatorCore.HISTORY_VISIBLE_ENTRIES) # Newest entries; the rest stay in history_store
+        self.unit_catalog = None # units.UnitCatalog, read from units.json on first use
+        self.unit_categories = []
+        self.uc_category_var = None # Created with the catalog
+        self.uc_from_unit_var = None
+        self.uc_to_unit_var = None
+        self.uc_input_var = None
+        self.uc_result_var = None
+        self.current_theme_name = "Light"
+
+        self.settings_file = settings_file or self.SETTINGS_FILE
+        self.history_file = history_file or self.HISTORY_FILE
+        self.registers_file = registers_file or os.path.splitext(self.settings_file)[0] + ".registers" # calc_settings.registers by default
+        self.settings_store = SettingsStore.for_path(self.settings_file, CalculatorCore.SETTINGS_WRITE_DELAY)
+        self.history_store = HistoryStore(self.history_file, max_age_days=CalculatorCore.HISTORY_RETENTION_DAYS, retain_on_open=False)
+        view.after_idle(self.history_store.apply_retention) # Pruning old rows can wait until after the first paint
+        self.load_settings()
+
+    @property
+    def expression(self):
+        return self.buffer.text
+
+    @expression.setter
+    def expression(self, text):
+        self.buffer.set(text); self._schedule_preview()
+
+    # Display hooks, overridden by the Tk window
+    def apply_theme(self):
+        pass
+
+    def update_history_display(self, new_entry=None):
+        pass
+
+    def show_angle_mode(self):
+        pass
+
+    def show_live_preview(self):
+        pass
+
+    @property
+    def active_memory_slot_index(self):
+        return self.memory_slots.active
+
+    @active_memory_slot_index.setter
+    def active_memory_slot_index(self, index):
+        self.memory_slots.active = index
+
+    @property
+    def angle_mode_text(self):
+        return "Deg" if self.degree_mode else "Rad" # Also the label of the angle-mode key
+
+    def load_settings(self):
+        legacy_registers = None
+        try:
+            loaded_settings = self.settings_store.load() # Includes saves still waiting to be written
+            if loaded_settings is not None:
+                self.current_theme_name = loaded_settings.get("theme", "Light")
+                self.live_preview = loaded_settings.get("live_preview", False) is True
+                loaded_history = loaded_settings.get("history", [])
+                if isinstance(loaded_history, list) and loaded_history: self.migrate_legacy_history(loaded_history)
+
+                register_count = loaded_settings.get("register_count")
+                valid_count = type(register_count) is int and 1 <= register_count <= CalculatorCore.MAX_MEMORY_SLOTS
+                self.register_count = register_count if valid_count else None
+                if isinstance(loaded_settings.get("memory_slots"), list): # Older versions kept the registers in the settings
+                    legacy_registers = (loaded_settings["memory_slots"], loaded_settings.get("active_memory_slot_index", 0))
+                loaded_definitions = loaded_settings.get("definitions", [])
+                if isinstance(loaded_definitions, list): self.definitions.load(text for text in loaded_definitions if isinstance(text, str))
+        except (json.JSONDecodeError, IOError) as e:
+            print(f"Error loading settings: {e}. Using default settings.")
+            self.current_theme_name = "Light"
+        self.load_registers(legacy_registers)
+        self.history.clear(); self.history.extend(self.history_store.tail_records(CalculatorCore.HISTORY_VISIBLE_ENTRIES))
+
+    def load_registers(self, legacy=None):
+        # The registers live in their own file (register_bank), patched in place; a different
+        # register_count keeps the registers both sizes share and leaves the rest in the file
+        self.memory_slots.flush()
+        bank = RegisterBank(self.register_count or CalculatorCore.NUM_MEMORY_SLOTS, self.registers_file)
+        if not bank.load() and legacy is not None:
+            slots, active = legacy
+            for index, value in enumerate(slots[:len(bank)]):
+                if type(value) in (int, float):
+                    try: bank[index] = value
+                    except OverflowError: pass
+            if type(active) is int and 0 <= active < len(bank): bank.active = active
+            bank.flush(); self.save_settings() # Drops the legacy keys from the settings file
+        self.memory_slots = bank
+        self.memory_slot_display_var.set(f"M{bank.active + 1}")
+
+    def migrate_legacy_history(self, entries):
+        # Older versions kept the last 10 "expr=result" strings in the settings file
+        if self.history_store.count(): return # Already migrated
+        now = time.time(); imported = []
+        for i, item in enumerate(entries):
+            if isinstance(item, str) and "=" in item:
+                expression, result = item.rsplit("=", 1)
+                imported.append((expression, result, now - len(entries) + i)) # Keeps the original order
+        self.history_store.extend(imported)
+        self.save_settings() # Drops the legacy list from the settings file
+
+    def save_settings(self):
+        # Marks the settings dirty; SettingsStore writes them from a background thread (see SETTINGS_WRITE_DELAY).
+        # History is not part of the settings any more: each calculation is appended to history_store.
+        settings_to_save = {
+            "theme": self.current_theme_name, "live_preview": self.live_preview,
+            "register_count": self.register_count,
+            "definitions": self.definitions.sources() # Compact "name=expression" strings, each after those it uses
+        }
+        self.settings_store.update(settings_to_save)
+        self.memory_slots.flush() # Registers changed directly (not through a memory key) are written with the settings
+
+    def close(self):
+        """Write pending settings, close the history and stop the evaluation worker."""
+        self.settings_store.flush(); self.memory_slots.flush(); self.history_store.close()
+        self.cancel_evaluation()
+        if self.evaluator is not None: self.evaluator.shutdown()
+
+    def toggle_theme(self):
+        self.current_theme_name = "Dark" if self.current_theme_name == "Light" else "Light"
+        self.apply_theme(); self.save_settings()
+
+    def load_unit_catalog(self):
+        if self.unit_catalog is None:
+            self.unit_catalog = default_catalog(); self.unit_categories = self.unit_catalog.names
+            self.uc_category_var = self.view.variable(""); self.uc_from_unit_var = self.view.variable(""); self.uc_to_unit_var = self.view.variable("")
+            self.uc_input_var = self.view.variable(""); self.uc_result_var = self.view.variable("")
+        return self.unit_catalog
+
+    def perform_unit_conversion(self):
+        self.load_unit_catalog()
+        result, error = convert_units(self.unit_catalog, self.uc_category_var.get(), self.uc_from_unit_var.get(),
+                                      self.uc_to_unit_var.get(), self.uc_input_var.get())
+        self.uc_result_var.set(error or result)
+
+    def handle_keypress(self, event):
+        # Keys are queued and applied together on the next idle cycle, so a burst (auto-repeat, a barcode
+        # scanner) costs one display update instead of one per key
+        char = event.char; keysym = event.keysym
+        if self.recorder is not None: self.recorder.record("k", [keysym, char])
+        if keysym == "Escape": self._pending_input.clear(); self._press("C"); return # Cancels at once
+        key = CalculatorCore.KEY_MAP.get(keysym) or (char if char and char in "0123456789+-*/.^" else None)
+        if key is not None: self._queue_input(key)
+
+    def on_paste(self, event=None):
+        text = self.view.clipboard_text()
+        if self.recorder is not None: self.recorder.record("p", text)
+        self._queue_input(("paste", text))
+        return "break"
+
+    def _queue_input(self, item):
+        self._pending_input.append(item)
+        if len(self._pending_input) == 1: self.view.after_idle(self._drain_input)
+
+    def _drain_input(self):
+        items, self._pending_input = self._pending_input, []
+        self._batching = True
+        try:
+            for item in items:
+                if isinstance(item, tuple): self.paste_expression(item[1])
+                elif item == "=": self._flush_display(); self._press(item) # Results and errors replace the typed text
+                else: self._press(item)
+        finally:
+            self._batching = False; self._flush_display()
+
+    def _refresh_display(self):
+        if self._batching: self._display_dirty = True
+        else: self.result_var.set(self.expression or "0")
+
+    def _flush_display(self):
+        if self._display_dirty: self._display_dirty = False; self.result_var.set(self.expression or "0")
+
+    def _display_text(self):
+        # What the display shows, counting a refresh that is still pending
+        return (self.expression or "0") if self._display_dirty else self.result_var.get()
+
+    def paste_expression(self, text):
+        """Validate ``text`` and append it to the expression in one edit; returns False (with a beep) if it is rejected."""
+        cleaned = "".join(text.split()).translate(PASTE_SYMBOLS)
+        try: tokens = tokenize(cleaned)
+        except SyntaxError: tokens = None
+        if not tokens or self._pending_evaluation is not None or not all(self._pasteable(kind, value) for kind, value in tokens):
+            self.view.bell(); return False
+        if self._display_text().startswith("Mode:"): self.buffer.clear()
+        self.buffer.extend(cleaned); self._refresh_display(); self._schedule_preview()
+        return True
+
+    def _pasteable(self, kind, text):
+        # Keypad names and the user's definitions; commas only separate the arguments of user functions
+        if kind == "name": return known_name(text) or text in self.definitions
+        return text != "," or bool(self.definitions)
+
+    def button_click(self, text):
+        if self.recorder is not None: self.recorder.record("c", text)
+        self._press(text)
+
+    def _press(self, text):
+        # Keypad logic; keyboard input reaches it through the input queue, so only the original input is recorded
+        if text in ("Theme", "Units", "Preview", "Plot", "Vars"): return
+        if self._pending_evaluation is not None and text != "C": return # Only C (Escape) works while computing
+        if self._register_entry is not None: self._register_key(text); return
+        if text in ("STO", "RCL"): # Direct addressing: STO 12 = stores into register 12, RCL 12 = recalls it
+            self._flush_display(); self._register_entry = [text, "", self.result_var.get()]
+            self.result_var.set(f"{text} _"); return
+
+        if text == self.angle_mode_text:
+            self.degree_mode = not self.degree_mode
+            self.definitions.set_degree_mode(self.degree_mode); self.show_angle_mode()
+            self.result_var.set("Mode: " + self.angle_mode_text); self.expression = ""; return
+
+        active_slot = self.active_memory_slot_index
+        if text in ("MS", "M+", "M-"):
+            if self.expression: self._evaluate(lambda expression, value, result: self._finish_memory_op(text, value))
+            else:
+                try: self._finish_memory_op(text, float(self.result_var.get()))
+                except ValueError: self.result_var.set("Error"); self.expression = ""
+            return
+        elif text == "MR": self.expression = str(self.memory_slots[active_slot]); self.result_var.set(self.expression); return
+        elif text == "MC": self.memory_slots[active_slot] = 0.0; self.memory_slots.flush(); return
+        elif text == "MNext": self.select_register((active_slot + 1) % len(self.memory_slots)); return
+        elif text == "MAC": self.memory_slots.clear(); self.memory_slots.flush(); return
+
+        if text == "=": self.calculate()
+        elif text == "C": self.clear()
+        elif text == "Del":
+            if self._display_text().startswith("Mode:"): self.clear()
+            else: self.delete()
+        elif text == "tan": self.apply_tan()
+        elif text in ("sin", "cos", "log", "ln", "exp", "√"): self.apply_math_func(text)
+        elif text == "x²": self.apply_power(2)
+        elif text == "x³": self.apply_power(3)
+        elif text == "^":
+            if self.buffer.last_kind in ("num", "rparen") and self.buffer.last != ".": self.buffer.append("**")
+            elif not self.buffer and self._display_text() not in ["0", "Error", "Mode: Rad", "Mode: Deg"]: self.expression = self._display_text() + "**"
+            self._refresh_display(); self._schedule_preview()
+        elif text == "π": self.expression = str(math.pi); self.result_var.set(self.expression)
+        elif text == "e": self.expression = str(math.e); self.result_var.set(self.expression)
+        else:
+            if self._display_text().startswith("Mode:"): self.expression = ""; self.result_var.set("0")
+            if not text.isdigit() and not text == ".":
+                if not self.buffer and text in ["*", "/", "+"]: return
+                last = self.buffer.last
+                if last in ["+", "-", "*", "/", ".", "**"]:
+                    if text == "*" and last == "*": text = "**"; self.buffer.pop() # "**" is one token
+                    elif text in ["+", "-", "*", "/","."]: return
+            self.buffer.append(text)
+            self._refresh_display(); self._schedule_preview()
+
+    def enter_definition(self, text):
+        """Define ``name = …`` or ``name(a, b) = …``, or evaluate an expression over the definitions; returns the text to show."""
+        cleaned = "".join(text.split()).translate(PASTE_SYMBOLS)
+        try:
+            if not is_definition(cleaned): return str(self.definitions.evaluate(cleaned))
+            name = self.definitions.define(cleaned); self.save_settings(); self._definitions_changed()
+            if self.definitions.definitions[name].params is not None: return f"Defined {name}()"
+            return f"{name} = {self.definitions.result_text(name)}"
+        except ResultTooLargeError: return "Overflow"
+        except (SyntaxError, NameError, ValueError) as e: return f"Error: {e}"
+        except Exception: return "Error"
+
+    def remove_definition(self, name):
+        """Forget ``name``; returns an error text if other definitions still use it."""
+        try: self.definitions.remove(name)
+        except ValueError as e: return f"Error: {e}"
+        self.save_settings(); self._definitions_changed()
+
+    def _definitions_changed(self):
+        # Preview states computed with the old values are stale
+        self.preview.reset(self.degree_mode); self._schedule_preview()
+
+    def use_definition(self, name):
+        """Type variable ``name``, or ``name(`` for a function, into the expression; "=" evaluates it over the definitions."""
+        if self._pending_evaluation is not None or name not in self.definitions: self.view.bell(); return
+        if self._display_text().startswith("Mode:") or self.buffer.last_kind not in (None, "op", "lparen"): self.buffer.clear() # Replaces a finished operand, as MR does
+        self.buffer.append(name)
+        if self.definitions.definitions[name].params is not None: self.buffer.append("(")
+        self._refresh_display(); self._schedule_preview()
+
+    def definition_rows(self):
+        """``(name, text)`` for every definition, in definition order, with each variable's current value."""
+        rows = []
+        for name, definition in self.definitions.definitions.items():
+            rows.append((name, definition.text if definition.params is not None else f"{definition.text}   → {self.definitions.result_text(name)}"))
+        return rows
+
+    def toggle_live_preview(self):
+        self.live_preview = not self.live_preview
+        if self.live_preview: self._schedule_preview()
+        else:
+            if self._preview_job is not None: self.view.after_cancel(self._preview_job); self._preview_job = None
+            self.preview_var.set("")
+        self.show_live_preview(); self.save_settings()
+
+    def _schedule_preview(self):
+        # However fast keys arrive, the preview is recomputed at most once per PREVIEW_INTERVAL_MS
+        if self.live_preview and self._preview_job is None:
+            self._preview_job = self.view.after(CalculatorCore.PREVIEW_INTERVAL_MS, self._update_preview)
+
+    def _update_preview(self):
+        self._preview_job = None
+        value = self.preview.update(self.buffer, self.degree_mode) # Re-evaluates only the tokens edited since last time
+        text = "" if value is None else str(value)
+        self.preview_var.set("" if text == self.expression else "= " + text)
+
+    def select_register(self, index):
+        """Make register ``index`` (0-based) the one MS, MR, MC, M+ and M- use."""
+        self.memory_slots.active = index; self.memory_slots.flush()
+        self.memory_slot_display_var.set(f"M{index + 1}")
+
+    def _register_key(self, text):
+        # Keys while STO/RCL waits for a register number: digits, Del, = to go, C (Escape) to cancel
+        command, digits, display = self._register_entry
+        if text.isdigit() and len(digits) < len(str(len(self.memory_slots))): digits += text
+        elif text == "Del": digits = digits[:-1]
+        elif text in ("=", "C"):
+            self._register_entry = None; self.result_var.set(display)
+            if text == "C": return
+            if not digits or not 1 <= int(digits) <= len(self.memory_slots): self.view.bell(); return
+            self.select_register(int(digits) - 1); self._press("MS" if command == "STO" else "MR"); return
+        else: self.view.bell(); return
+        self._register_entry[1] = digits; self.result_var.set(f"{command} {digits}_")
+
+    def _finish_memory_op(self, text, value):
+        active_slot = self.active_memory_slot_index
+        try:
+            if text == "MS": self.memory_slots[active_slot] = value
+            elif text == "M+": self.memory_slots[active_slot] += value
+            else: self.memory_slots[active_slot] -= value
+        except (OverflowError, TypeError) as e: # Registers hold floats: no huge integers or complex numbers
+            self.result_var.set("Overflow" if isinstance(e, OverflowError) else "Error"); self.expression = ""; return
+        self.result_var.set(str(value)); self.expression = ""; self.memory_slots.flush()
+
+    def _evaluate(self, on_result, function=None, power=None):
+        # Cheap expressions finish inline; long ones or those estimated to build big integers go to the
+        # worker process. Results past calc_cost.MAX_RESULT_BITS are refused up front with "Overflow".
+        job = (self.expression, self.degree_mode, function, power)
+        definitions = self.definitions.sources() if self.definitions and self.definitions.mentions(self.expression) else None # "area(3)", "r*2"
+        engine = self.engine if definitions is None else self.definitions
+        if len(self.buffer) <= CalculatorCore.INLINE_EVAL_MAX_LENGTH:
+            try:
+                bits = (self.engine.compile(self.expression).bits if definitions is None else self.definitions.estimate_bits(self.expression)) * (power or 1) # x² and x³ multiply the size
+                check_bits(bits)
+                outcome = evaluate_job(engine, job) if bits <= CalculatorCore.INLINE_EVAL_MAX_BITS else None
+            except ResultTooLargeError: self.result_var.set("Overflow"); self.expression = ""; return
+            except Exception: self.result_var.set("Error"); self.expression = ""; return
+            if outcome is not None: on_result(self.expression, *outcome); return
+        if self.evaluator is None:
+            from calc_worker import EvaluationWorker
+            self.evaluator = EvaluationWorker(CalculatorCore.EVAL_TIME_BUDGET, CalculatorCore.EVAL_MEMORY_BUDGET)
+        self.evaluator.submit(job, definitions)
+        self._pending_evaluation = (self.expression, on_result)
+        self.result_var.set("Computing…")
+        self.view.after(CalculatorCore.EVAL_POLL_MS, self._poll_evaluation)
+
+    def _poll_evaluation(self):
+        if self._pending_evaluation is None: return # Cancelled
+        outcome = self.evaluator.poll()
+        if outcome is None: self.view.after(CalculatorCore.EVAL_POLL_MS, self._poll_evaluation); return
+        self._deliver_outcome(outcome)
+
+    def _deliver_outcome(self, outcome):
+        expression, on_result = self._pending_evaluation
+        self._pending_evaluation = None
+        if outcome[0] == "ok": on_result(expression, outcome[1], outcome[2])
+        elif outcome[0] == "timeout": self.result_var.set("Timeout"); self.expression = ""
+        else: self.result_var.set("Overflow" if outcome[1] == "ResultTooLargeError" else "Error"); self.expression = ""
+
+    def instrument(self, instrumentation):
+        """Time INSTRUMENTED_METHODS into ``instrumentation`` from now on."""
+        # Wrappers are installed on this instance only, so an uninstrumented calculator pays nothing
+        self.instrumentation = instrumentation
+        instrumentation.instrument(self, self.INSTRUMENTED_METHODS)
+        instrumentation.add_counters("settings", lambda: {"writes": self.settings_store.writes, "bytes_written": self.settings_store.bytes_written})
+        instrumentation.add_counters("registers", lambda: {"writes": self.memory_slots.writes, "bytes_written": self.memory_slots.bytes_written})
+        instrumentation.add_counters("history", lambda: {"writes": self.history_store.writes, "bytes_written": self.history_store.bytes_written})
+        instrumentation.add_counters("engine_cache", lambda: self.engine.cache_info()._asdict())
+        instrumentation.add_counters("preview", lambda: {"tokens_evaluated": self.preview.steps})
+        instrumentation.add_counters("definitions", lambda: dict(self.definitions.cache_info()._asdict(), recomputed=self.definitions.recomputed))
+
+    def process_pending_input(self):
+        """Apply queued keys and pastes now instead of on the next idle cycle (for scripted input)."""
+        if self._pending_input: self._drain_input()
+
+    def finish_evaluation(self):
+        """Block until a background evaluation has finished (for scripted input)."""
+        while self._pending_evaluation is not None:
+            outcome = self.evaluator.poll()
+            if outcome is None: time.sleep(CalculatorCore.EVAL_POLL_MS / 1000)
+            else: self._deliver_outcome(outcome) # The event loop's next poll finds nothing pending
+
+    def cancel_evaluation(self):
+        if self._pending_evaluation is not None:
+            self.evaluator.cancel(); self._pending_evaluation = None
+
+    def _show_result(self, expression, value, result):
+        self.expression = result; self.result_var.set(result)
+
+    def apply_math_func(self, name):
+        # Domain, overflow and degree handling live in calc_engine.UNARY_FUNCTIONS
+        self._evaluate(self._show_result, function=name)
+
+    def apply_tan(self):
+        self.apply_math_func("tan") # Errors near the poles (|cos| < 1e-12)
+
+    def apply_power(self, power):
+        self._evaluate(self._show_result, power=power)
+
+    def calculate(self):
+        if "Error" in self.expression: self.result_var.set("Error"); self.expression = ""; return
+        if self.buffer.last_kind == "op": self.result_var.set("Error"); return
+        self._evaluate(self._finish_calculate)
+
+    def _finish_calculate(self, original_expression, value, result):
+        record = HistoryRecord(original_expression, value, self.degree_mode)
+        self.history_store.add(record)
+        self.history.append(record)
+        self.update_history_display(record)
+        self.result_var.set(result); self.expression = result
+
+    def delete(self):
+        if self.buffer:
+            self.buffer.pop() # The whole last token, so "**" goes in one press
+            self._refresh_display(); self._schedule_preview()
+        elif self._display_text() not in ["0", "Error"] and not self._display_text().startswith("Mode:"):
+            self.expression = ""; self.result_var.set("0")
+
+    def clear(self):
+        self.cancel_evaluation()
+        self.expression = ""; self.result_var.set("0")
@@ -0,0 +1,79 @@
+"""Static result-size estimation for calculator expressions.
+
+Walks a ``calc_engine`` AST and bounds ``log2|value|`` for every integer-valued
+node, so power towers such as ``9**9**9`` are rejected before Python starts
+building a multi-megabyte int. Float-valued nodes are cheap (they overflow
+with an exception instead of growing) and are not bounded.
+"""
+import math
+import sys
+
+LOG2_10 = math.log2(10)
+# Anything longer cannot be converted to a display string anyway
+MAX_RESULT_BITS = int((getattr(sys, "get_int_max_str_digits", lambda: 4300)() or 4300) * LOG2_10)
+
+class ResultTooLargeError(OverflowError):
+    pass
+
+def _literal_magnitude(text):
+    if "." in text or "e" in text or "E" in text: return None # Float literal
+    if len(text) > 15: return len(text) * LOG2_10
+    value = int(text)
+    return math.log2(value) if value > 1 else 0.0
+
+def _combine(op, left, right, right_node):
+    if left is None or right is None or op == "/": return None
+    if op in ("+", "-"): return max(left, right) + 1
+    if op == "*": return left + right
+    if right_node[0] == "neg": return None # int ** -n is a float
+    if left <= 0: return 0.0 # 0, 1 and -1 stay small whatever the exponent
+    return left * (2.0 ** right if right < 1024 else math.inf)
+
+def _walk(node, magnitude=None):
+    # Returns (magnitude, peak): magnitude bounds log2|value| for int nodes and is None for
+    # float nodes; peak is the largest integer magnitude seen anywhere in the subtree.
+    # ``magnitude(name)`` gives the same bound for a variable's current value.
+    kind = node[0]
+    if kind == "num":
+        bound = _literal_magnitude(node[1])
+        return bound, bound or 0.0
+    if kind == "const": return None, 0.0
+    if kind == "var":
+        bound = magnitude(node[1]) if magnitude else None
+        return bound, bound or 0.0
+    if kind in ("neg", "pos"): return _walk(node[1], magnitude)
+    if kind == "call": return None, _walk(node[2], magnitude)[1]
+    if kind == "ucall": return None, max((_walk(arg, magnitude)[1] for arg in node[2]), default=0.0) # The body is checked per call
+    if node[1] == "**":
+        left, left_peak = _walk(node[2], magnitude); right, right_peak = _walk(node[3], magnitude)
+        bound = _combine("**", left, right, node[3])
+        return bound, max(left_peak, right_peak, bound or 0.0)
+    chain = [] # Left-associative chains (1+1+...+1) are walked iteratively
+    while node[0] == "bin" and node[1] != "**":
+        chain.append(node); node = node[2]
+    bound, peak = _walk(node, magnitude)
+    for link in reversed(chain):
+        right, right_peak = _walk(link[3], magnitude)
+        bound = _combine(link[1], bound, right, link[3])
+        peak = max(peak, right_peak, bound or 0.0)
+    return bound, peak
+
+def value_magnitude(value):
+    """``log2|value|`` for an int (as ``_walk`` bounds it), None for anything else."""
+    if type(value) is not int: return None
+    return math.log2(abs(value)) if abs(value) > 1 else 0.0
+
+def estimate_bits(tree, magnitude=None):
+    """Upper bound on the bit length of the largest integer built while evaluating ``tree``.
+
+    ``magnitude(name)`` bounds ``log2|value|`` of variable ``name`` (see ``value_magnitude``); without it variables count as floats.
+    """
+    peak = _walk(tree, magnitude)[1]
+    return math.floor(peak + 1e-9) + 1 if peak < math.inf else math.inf # Absorbs log2 rounding
+
+def check_bits(bits, limit=MAX_RESULT_BITS):
+    if bits > limit: raise ResultTooLargeError(f"result would need about {bits:.3g} bits")
+
+def check_power(value, power, limit=MAX_RESULT_BITS):
+    """Guard for repeated x²/x³: refuse before squaring an integer past the limit."""
+    if isinstance(value, int) and power > 0: check_bits(value.bit_length() * power, limit)
@@ -0,0 +1,240 @@
+"""Named variables and user-defined functions for the calculator.
+
+``Definitions`` holds lines such as ``r = 3``, ``d = 2*r`` and
+``area(r) = π*r^2`` in the calculator's grammar (``calc_engine``), with the
+keypad's functions, constants, angle mode and size limits. Each definition
+is parsed and compiled once. A dependency graph links every name to the
+definitions that use it, so redefining a variable recomputes only its
+dependents, in dependency order; cycles and undefined names are refused.
+Function results are memoised in one LRU cache of ``memo_size`` entries;
+redefining anything a function uses gives it a new generation, and the
+entries of the old one age out. ``sources()`` gives the definitions as
+compact text in an order ``load()`` accepts, for the settings file and for
+the evaluation worker, which rebuilds them to evaluate the keypad's "=".
+"""
+import collections
+import keyword
+import re
+from calc_cost import ResultTooLargeError, check_bits, estimate_bits, value_magnitude
+from calc_engine import CONSTANTS, FUNCTION_ALIASES, UNARY_FUNCTIONS, CacheInfo, ExpressionSyntaxError, apply_function, namespace, parse, to_source, tokenize
+
+MEMO_SIZE = 4096
+
+_DEFINITION_RE = re.compile(r"\s*([A-Za-z][A-Za-z_0-9]*)\s*(?:\(([^()]*)\))?\s*=(?!=)(.*)\Z", re.DOTALL)
+_NAME_RE = re.compile(r"[A-Za-z][A-Za-z_0-9]*\Z")
+_MISSING = object()
+
+# params is None for a variable; text is the compact source that sources() saves; uses are the defined names it refers to
+Definition = collections.namedtuple("Definition", "name params text tree code uses")
+
+def is_definition(text):
+    """Whether ``text`` has the ``name = …`` or ``name(a, b) = …`` form."""
+    return _DEFINITION_RE.match(text) is not None
+
+def _check_name(name):
+    if not _NAME_RE.match(name): raise ExpressionSyntaxError(f"invalid name '{name}'")
+    if name in CONSTANTS or FUNCTION_ALIASES.get(name, name) in UNARY_FUNCTIONS or keyword.iskeyword(name):
+        raise ValueError(f"'{name}' is a reserved name")
+
+def _uses(tree, params=()):
+    uses = set(); stack = [tree] # Iterative: long chains such as 1+1+...+1 are deep
+    while stack:
+        node = stack.pop(); kind = node[0]
+        if kind == "var":
+            if node[1] not in params: uses.add(node[1])
+        elif kind == "ucall": uses.add(node[1]); stack.extend(node[2])
+        elif kind == "bin": stack.append(node[2]); stack.append(node[3])
+        elif kind in ("neg", "pos"): stack.append(node[1])
+        elif kind == "call": stack.append(node[2])
+    return frozenset(uses)
+
+class Definitions:
+    def __init__(self, memo_size=MEMO_SIZE, degree_mode=False):
+        self.memo_size = memo_size; self.degree_mode = bool(degree_mode)
+        self.definitions = {} # name -> Definition, in the order they were first defined
+        self.values = {} # Variable name -> value, or the exception evaluating it raised
+        self.users = {} # name -> names of the definitions that use it (the reverse dependency graph)
+        self.namespace = namespace(self.degree_mode) # Variable values and memoised functions, by name
+        self._arity = {} # Function name -> number of parameters, for the parser
+        self._generation = {}
+        self._memo = collections.OrderedDict() # (name, generation, args, arg types) -> result
+        self._sources = None
+        self.hits = 0; self.misses = 0
+        self.recomputed = 0 # Definitions (re)evaluated so far
+
+    def __len__(self):
+        return len(self.definitions)
+
+    def __contains__(self, name):
+        return name in self.definitions
+
+    def define(self, text):
+        """Add or replace the definition ``text`` and recompute what depends on it; returns its name.
+
+        Raises SyntaxError or NameError if it does not parse, ValueError for reserved names, cycles
+        and changes of kind or parameter count that would break definitions using it.
+        """
+        match = _DEFINITION_RE.match(text)
+        if not match: raise ExpressionSyntaxError("expected name = expression or name(a, b) = expression")
+        name, params, body = match.group(1), match.group(2), "".join(match.group(3).split())
+        _check_name(name)
+        if params is not None:
+            params = tuple(param.strip() for param in params.split(","))
+            for param in params: _check_name(param)
+            if len(set(params)) != len(params): raise ValueError("duplicate parameter")
+        old = self.definitions.get(name)
+        if old is not None and self.users.get(name) and (old.params and len(old.params)) != (params and len(params)):
+            raise ValueError(f"'{name}' is used by {', '.join(sorted(self.users[name]))}")
+        scope = self.values if params is None else collections.ChainMap(dict.fromkeys(params), self.values)
+        tree = parse(body, scope, self._arity)
+        uses = _uses(tree, params or ())
+        affected = self._dependents(name)
+        if uses & affected: raise ValueError(f"circular definition of '{name}'")
+        source = to_source(tree)
+        code = compile(source if params is None else f"lambda {', '.join(params)}: {source}", "<calc>", "eval")
+        text = f"{name}={body}" if params is None else f"{name}({','.join(params)})={body}"
+
+        if old is not None:
+            for used in old.uses: self.users[used].discard(name)
+        for used in uses: self.users.setdefault(used, set()).add(name)
+        self.definitions[name] = Definition(name, params, text, tree, code, uses)
+        if params is None: self._arity.pop(name, None)
+        else: self._arity[name] = len(params); self.values.pop(name, None)
+        self._sources = None
+        self._recompute(affected)
+        return name
+
+    def remove(self, name):
+        """Forget ``name``; raises ValueError while other definitions use it, KeyError if it is not defined."""
+        if self.users.get(name): raise ValueError(f"'{name}' is used by {', '.join(sorted(self.users[name]))}")
+        definition = self.definitions.pop(name)
+        for used in definition.uses: self.users[used].discard(name)
+        self.users.pop(name, None); self.values.pop(name, None); self._arity.pop(name, None); self.namespace.pop(name, None)
+        self._sources = None
+
+    def load(self, sources):
+        """Define each of ``sources`` (as saved by ``sources()``), skipping any that no longer parse; returns how many were loaded."""
+        loaded = 0
+        for text in sources:
+            try: self.define(text); loaded += 1
+            except (SyntaxError, NameError, ValueError, TypeError): pass
+        return loaded
+
+    def sources(self):
+        """Every definition as compact text, each after the definitions it uses."""
+        if self._sources is None:
+            emitted = set(); order = []
+            for root in self.definitions:
+                stack = [(root, False)]
+                while stack:
+                    name, ready = stack.pop()
+                    if name in emitted: continue
+                    if ready: emitted.add(name); order.append(self.definitions[name].text); continue
+                    stack.append((name, True)); stack.extend((used, False) for used in self.definitions[name].uses if used not in emitted)
+            self._sources = order
+        return list(self._sources)
+
+    def value(self, name):
+        """The current value of variable ``name``; raises what evaluating it raised."""
+        value = self.values[name]
+        if isinstance(value, Exception): raise value
+        return value
+
+    def result_text(self, name):
+        """What the display would show for variable ``name``: its value, "Overflow" or "Error"."""
+        value = self.values[name]
+        if isinstance(value, ResultTooLargeError): return "Overflow"
+        return "Error" if isinstance(value, Exception) else str(value)
+
+    def mentions(self, expression):
+        """Whether ``expression`` mentions a defined name (False if it does not tokenize)."""
+        try: return any(kind == "name" and text in self.definitions for kind, text in tokenize(expression))
+        except SyntaxError: return False
+
+    def estimate_bits(self, expression):
+        """``calc_cost.estimate_bits`` of ``expression`` over the current values; raises what evaluating it would raise first."""
+        return self._compile(expression)[1]
+
+    def evaluate(self, expression, degree_mode=None):
+        """The value of ``expression`` over the defined names; raises where the keypad's "=" would fail.
+
+        With ``degree_mode`` the angle mode is switched first, so ``calc_engine.evaluate_job`` can use this as its engine.
+        """
+        if degree_mode is not None: self.set_degree_mode(degree_mode)
+        code, bits = self._compile(expression)
+        check_bits(bits)
+        return eval(code, self.namespace)
+
+    def apply_function(self, name, value, degree_mode=False):
+        return apply_function(name, value, degree_mode)
+
+    def set_degree_mode(self, degree_mode):
+        """Switch the angle mode of trigonometric functions, recomputing every definition if it changed."""
+        if bool(degree_mode) == self.degree_mode: return
+        self.degree_mode = bool(degree_mode); self.namespace.update(namespace(self.degree_mode))
+        self._memo.clear(); self._recompute(set(self.definitions))
+
+    def cache_info(self):
+        return CacheInfo(self.hits, self.misses, self.memo_size, len(self._memo))
+
+    def _compile(self, expression):
+        tree = parse(expression, self.values, self._arity)
+        for name in _uses(tree):
+            value = self.values.get(name)
+            if isinstance(value, Exception): raise value
+        return compile(to_source(tree), "<calc>", "eval"), estimate_bits(tree, self._magnitude)
+
+    def _dependents(self, name):
+        # ``name`` and every definition that uses it, directly or through others
+        affected = {name}; stack = [name]
+        while stack:
+            for user in self.users.get(stack.pop(), ()):
+                if user not in affected: affected.add(user); stack.append(user)
+        return affected
+
+    def _recompute(self, names):
+        # Kahn's algorithm over the affected definitions only: each is updated after everything it uses
+        names = {name for name in names if name in self.definitions}
+        waiting = {name: sum(1 for used in self.definitions[name].uses if used in names) for name in names}
+        ready = [name for name, count in waiting.items() if not count]
+        while ready:
+            name = ready.pop(); self._update(name)
+            for user in self.users.get(name, ()):
+                waiting[user] -= 1
+                if not waiting[user]: ready.append(user)
+        self.recomputed += len(names)
+
+    def _update(self, name):
+        definition = self.definitions[name]
+        if definition.params is not None:
+            self._generation[name] = self._generation.get(name, 0) + 1 # Memoised results of the old body go stale
+            self.namespace[name] = self._function(definition); return
+        value = next((self.values[used] for used in definition.uses if isinstance(self.values.get(used), Exception)), None)
+        if value is None:
+            try:
+                check_bits(estimate_bits(definition.tree, self._magnitude))
+                value = eval(definition.code, self.namespace)
+            except Exception as e: value = e
+        self.values[name] = value
+        if isinstance(value, Exception): self.namespace.pop(name, None)
+        else: self.namespace[name] = value
+
+    def _magnitude(self, name):
+        return value_magnitude(self.values.get(name))
+
+    def _function(self, definition):
+        name = definition.name; params = definition.params; tree = definition.tree
+        body = eval(definition.code, self.namespace); generation = self._generation[name]; memo = self._memo
+        def call(*args):
+            key = (name, generation, args, tuple(map(type, args))) # 2 and 2.0 are equal keys but give different results
+            value = memo.get(key, _MISSING)
+            if value is not _MISSING:
+                self.hits += 1; memo.move_to_end(key); return value
+            self.misses += 1
+            bounds = dict(zip(params, map(value_magnitude, args)))
+            check_bits(estimate_bits(tree, lambda used: bounds[used] if used in bounds else self._magnitude(used)))
+            value = body(*args)
+            memo[key] = value
+            if len(memo) > self.memo_size: memo.popitem(last=False)
+            return value
+        return call
@@ -0,0 +1,236 @@
+"""Headless expression engine for the calculator.
+
+Parses the calculator grammar (numbers, ``+ - * / **``, parentheses, the
+keypad's math functions and constants) into a small AST, compiles it once to
+a code object that runs against a restricted namespace, and keeps an LRU
+cache of compiled expressions so repeated or recalled input skips parsing.
+"""
+import collections
+import math
+import re
+from calc_cost import check_bits, check_power, estimate_bits
+
+class ExpressionSyntaxError(SyntaxError):
+    pass
+
+_TOKEN_RE = re.compile(r"""
+    \s*(?:
+        (?P<num>(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?)
+      | (?P<pow>\*\*|\^)
+      | (?P<op>[-+*/(),])
+      | (?P<name>[A-Za-z_][A-Za-z_0-9]*|π|√)
+    )""", re.VERBOSE)
+
+CONSTANTS = {"pi": math.pi, "π": math.pi, "e": math.e}
+PASTE_SYMBOLS = str.maketrans({"^": "**", "×": "*", "÷": "/", "−": "-"}) # Typed or pasted symbols -> the grammar's operators
+
+# name -> (function, is_trig, domain_check, overflow_check); mirrors the keypad semantics.
+UNARY_FUNCTIONS = {
+    "sin": (math.sin, True, None, None),
+    "cos": (math.cos, True, None, None),
+    "tan": (math.tan, True, None, None),
+    "log": (math.log10, False, lambda x: x > 0, None),
+    "ln": (math.log, False, lambda x: x > 0, None),
+    "exp": (math.exp, False, None, lambda x: x > 709),
+    "sqrt": (math.sqrt, False, lambda x: x >= 0, None),
+}
+FUNCTION_ALIASES = {"√": "sqrt"}
+
+def apply_function(name, value, degree_mode=False):
+    """Apply a keypad function with the calculator's domain, overflow and tan-pole rules."""
+    func, is_trig, domain_check, overflow_check = UNARY_FUNCTIONS[FUNCTION_ALIASES.get(name, name)]
+    if domain_check and not domain_check(value): raise ValueError("math domain error")
+    if overflow_check and overflow_check(value): raise OverflowError("math range error")
+    if is_trig and degree_mode: value = math.radians(value)
+    if func is math.tan and abs(math.cos(value)) < 1e-12: raise ValueError("tan undefined")
+    return func(value)
+
+def known_name(text):
+    """Whether ``text`` is a constant or keypad function the parser accepts."""
+    return text in CONSTANTS or FUNCTION_ALIASES.get(text, text) in UNARY_FUNCTIONS
+
+def tokenize(expression):
+    tokens = []; pos = 0; end = len(expression.rstrip())
+    while pos < end:
+        match = _TOKEN_RE.match(expression, pos)
+        if not match or match.end() == pos:
+            raise ExpressionSyntaxError(f"invalid character at position {pos}")
+        kind = match.lastgroup; text = match.group(kind)
+        if kind == "num" and len(text) > 1 and text[0] == "0" and text.isdigit() and text.strip("0"):
+            raise ExpressionSyntaxError("leading zeros in decimal integer literals are not permitted")
+        if kind == "pow": kind, text = "op", "**"
+        tokens.append((kind, text)); pos = match.end()
+    return tokens
+
+class _Parser:
+    # Recursive descent with Python's precedence: unary minus binds looser than
+    # '**' on its left but may prefix the exponent, e.g. -2**-1 == -(2**(-1)).
+    def __init__(self, tokens, variables=(), functions=None):
+        self.tokens = tokens; self.pos = 0; self.variables = variables; self.functions = functions or {}
+
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else (None, None)
+
+    def take(self):
+        token = self.peek(); self.pos += 1; return token
+
+    def expect(self, text):
+        if self.take()[1] != text: raise ExpressionSyntaxError(f"expected '{text}'")
+
+    def parse(self):
+        if not self.tokens: raise ExpressionSyntaxError("empty expression")
+        node = self.expr()
+        if self.pos != len(self.tokens): raise ExpressionSyntaxError(f"unexpected '{self.peek()[1]}'")
+        return node
+
+    def expr(self):
+        node = self.term()
+        while self.peek()[1] in ("+", "-"):
+            node = ("bin", self.take()[1], node, self.term())
+        return node
+
+    def term(self):
+        node = self.unary()
+        while self.peek()[1] in ("*", "/"):
+            node = ("bin", self.take()[1], node, self.unary())
+        return node
+
+    def unary(self):
+        kind, text = self.peek()
+        if text in ("+", "-"):
+            self.take(); return ("neg" if text == "-" else "pos", self.unary())
+        if text == "√":
+            self.take(); return ("call", "sqrt", self.unary())
+        return self.power()
+
+    def power(self):
+        node = self.atom()
+        if self.peek()[1] == "**":
+            self.take(); node = ("bin", "**", node, self.unary())
+        return node
+
+    def atom(self):
+        kind, text = self.take()
+        if kind == "num":
+            return ("num", text)
+        if text == "(":
+            node = self.expr(); self.expect(")"); return node
+        if kind == "name":
+            if self.peek()[1] == "(":
+                if text in self.functions: return self.user_call(text)
+                name = FUNCTION_ALIASES.get(text, text)
+                if name not in UNARY_FUNCTIONS: raise NameError(f"name '{text}' is not defined")
+                self.take(); arg = self.expr(); self.expect(")")
+                return ("call", name, arg)
+            if text in self.variables: return ("var", text)
+            if text in CONSTANTS: return ("const", text)
+            raise NameError(f"name '{text}' is not defined")
+        raise ExpressionSyntaxError("unexpected end of expression" if kind is None else f"unexpected '{text}'")
+
+    def user_call(self, name):
+        self.take(); args = [self.expr()]
+        while self.peek()[1] == ",":
+            self.take(); args.append(self.expr())
+        self.expect(")")
+        arity = self.functions[name]
+        if len(args) != arity: raise ExpressionSyntaxError(f"{name}() takes {arity} argument{'s' if arity > 1 else ''}")
+        return ("ucall", name, tuple(args))
+
+def parse(expression, variables=(), functions=None):
+    """The AST of ``expression``; names in ``variables`` become ``("var", name)`` nodes and calls to
+    ``functions`` (a name -> argument count mapping) ``("ucall", name, args)`` nodes."""
+    return _Parser(tokenize(expression), variables, functions).parse()
+
+_PRECEDENCE = {"+": 1, "-": 1, "*": 2, "/": 2, "neg": 3, "pos": 3, "**": 4}
+
+def _precedence(node):
+    return _PRECEDENCE[node[1]] if node[0] == "bin" else _PRECEDENCE.get(node[0], 5)
+
+def to_source(node):
+    # Parenthesises only where precedence requires it: Python refuses more than 200 nested
+    # parentheses, and long left-associative chains such as 1+1+...+1 are common.
+    kind = node[0]
+    if kind in ("num", "var"): return node[1]
+    if kind == "const": return repr(CONSTANTS[node[1]])
+    if kind == "call": return f"_{node[1]}({to_source(node[2])})"
+    if kind == "ucall": return f"{node[1]}({', '.join(to_source(arg) for arg in node[2])})"
+    if kind in ("neg", "pos"):
+        operand = to_source(node[1])
+        return ("-" if kind == "neg" else "+") + (f"({operand})" if _precedence(node[1]) < 3 else operand)
+    if node[1] == "**":
+        left, right = to_source(node[2]), to_source(node[3])
+        if _precedence(node[2]) <= 4: left = f"({left})"
+        if _precedence(node[3]) < 3: right = f"({right})"
+        return f"{left}**{right}"
+    level = _precedence(node); chain = [] # Walk the left spine iteratively so long chains do not hit the recursion limit
+    while node[0] == "bin" and _precedence(node) == level:
+        chain.append(node); node = node[2]
+    parts = [f"({to_source(node)})" if _precedence(node) < level else to_source(node)]
+    for link in reversed(chain):
+        right = to_source(link[3])
+        parts.append(link[1] + (f"({right})" if _precedence(link[3]) <= level else right))
+    return "".join(parts)
+
+def _make_namespace(degree_mode):
+    namespace = {"__builtins__": {}}
+    for name in UNARY_FUNCTIONS:
+        namespace["_" + name] = lambda value, _name=name: apply_function(_name, value, degree_mode)
+    return namespace
+
+_NAMESPACES = {False: _make_namespace(False), True: _make_namespace(True)}
+
+def namespace(degree_mode=False):
+    """A new evaluation namespace holding the keypad functions for ``degree_mode``, for callers that add names to it."""
+    return dict(_NAMESPACES[bool(degree_mode)])
+
+class CompiledExpression:
+    __slots__ = ("source", "tree", "code", "bits")
+
+    def __init__(self, source, tree):
+        self.source = source; self.tree = tree
+        self.code = compile(to_source(tree), "<calc>", "eval")
+        self.bits = estimate_bits(tree) # See calc_cost; checked before every evaluation
+
+    def evaluate(self, degree_mode=False):
+        check_bits(self.bits)
+        return eval(self.code, _NAMESPACES[bool(degree_mode)])
+
+def compile_function(expression, degree_mode=False, variable="x"):
+    """``expression`` as a Python function of ``variable``; raises where evaluating it on the keypad would fail."""
+    source = to_source(parse(expression, (variable,)))
+    return eval(compile(f"lambda {variable}: {source}", "<calc>", "eval"), _NAMESPACES[bool(degree_mode)])
+
+CacheInfo = collections.namedtuple("CacheInfo", "hits misses maxsize currsize")
+
+class ExpressionEngine:
+    def __init__(self, cache_size=512):
+        self.cache_size = cache_size
+        self._cache = collections.OrderedDict()
+        self._hits = 0; self._misses = 0
+
+    def compile(self, expression):
+        compiled = self._cache.get(expression)
+        if compiled is not None:
+            self._hits += 1; self._cache.move_to_end(expression); return compiled
+        self._misses += 1
+        compiled = CompiledExpression(expression, parse(expression))
+        self._cache[expression] = compiled
+        if len(self._cache) > self.cache_size: self._cache.popitem(last=False)
+        return compiled
+
+    def evaluate(self, expression, degree_mode=False):
+        return self.compile(expression).evaluate(degree_mode)
+
+    def apply_function(self, name, value, degree_mode=False):
+        return apply_function(name, value, degree_mode)
+
+    def cache_info(self):
+        return CacheInfo(self._hits, self._misses, self.cache_size, len(self._cache))
+
+def evaluate_job(engine, job):
+    """Run ``(expression, degree_mode, function, power)`` and return ``(value, text)``."""
+    expression, degree_mode, function, power = job
+    value = engine.evaluate(expression, degree_mode)
+    if function is not None: value = engine.apply_function(function, value, degree_mode)
+    if power is not None: check_power(value, power); value = value ** power
+    return value, str(value)
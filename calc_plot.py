@@ -0,0 +1,208 @@
+"""Function tables and plots: an expression in ``x`` over a range of inputs.
+
+``FunctionOfX(expression, degree_mode)`` reads the calculator's grammar plus
+the variable ``x``, so it takes the same functions, constants and powers as
+the keypad, with the same angle mode, domain, overflow and tan-pole rules.
+Calling it with many x values evaluates them in one pass: as NumPy array
+operations when NumPy is installed, otherwise through one compiled Python
+function (``calc_engine.compile_function``) mapped over the values. Where the
+calculator would show "Error" or "Overflow" the result is NaN. ``check_range``
+refuses, before any sampling, expressions whose integers would grow past what
+the calculator would show (``9**9**7`` in ``x+9**9**7``).
+
+``adaptive_samples`` spends a point budget where the curve bends,
+``Viewport`` maps data to canvas coordinates, and ``polylines`` turns samples
+into canvas line coordinates, broken at gaps and poles. ``TableSource`` pages
+``TableRow``s for the virtual table.
+"""
+import collections
+import math
+from array import array
+from calc_cost import check_bits, estimate_bits, value_magnitude
+from calc_engine import UNARY_FUNCTIONS, compile_function, parse, to_source
+
+try:
+    import numpy # Optional; without it values are evaluated by the compiled Python function
+except ImportError:
+    numpy = None
+
+VARIABLE = "x"
+NAN = math.nan
+
+def _numpy_namespace(degree_mode):
+    # Array versions of calc_engine.UNARY_FUNCTIONS; invalid inputs give NaN instead of raising
+    np = numpy
+    angle = (lambda v: np.radians(v)) if degree_mode else (lambda v: v)
+    def tan(v):
+        v = angle(v); return np.where(np.abs(np.cos(v)) < 1e-12, NAN, np.tan(v))
+    functions = {
+        "sin": lambda v: np.sin(angle(v)), "cos": lambda v: np.cos(angle(v)), "tan": tan,
+        "log": lambda v: np.where(v > 0, np.log10(np.where(v > 0, v, 1.0)), NAN),
+        "ln": lambda v: np.where(v > 0, np.log(np.where(v > 0, v, 1.0)), NAN),
+        "exp": lambda v: np.where(v > 709, NAN, np.exp(np.minimum(v, 709))),
+        "sqrt": lambda v: np.where(v >= 0, np.sqrt(np.abs(v)), NAN),
+    }
+    assert set(functions) == set(UNARY_FUNCTIONS)
+    namespace = {"__builtins__": {}}
+    for name, func in functions.items(): namespace["_" + name] = func
+    return namespace
+
+class FunctionOfX:
+    """``expression`` as a function of x; raises SyntaxError or NameError if it does not parse."""
+
+    def __init__(self, expression, degree_mode=False, use_numpy=True):
+        self.expression = expression; self.degree_mode = degree_mode
+        self.tree = parse(expression, (VARIABLE,)); self.source = to_source(self.tree)
+        self.scalar = compile_function(expression, degree_mode, VARIABLE)
+        self._vector = None
+        if use_numpy and numpy is not None:
+            self._vector = eval(compile(f"lambda {VARIABLE}: {self.source}", "<calc>", "eval"), _numpy_namespace(degree_mode))
+
+    def check_range(self, start, stop):
+        """Raise ``calc_cost.ResultTooLargeError`` if f would build an integer past ``MAX_RESULT_BITS`` for an x between ``start`` and ``stop``."""
+        bound = max(value_magnitude(start) or 0.0, value_magnitude(stop) or 0.0) if type(start) is type(stop) is int else None # Float x never builds integers
+        check_bits(estimate_bits(self.tree, lambda name: bound))
+
+    def value(self, x):
+        """f(x) as a float, NaN where the calculator would show an error."""
+        try: y = self.scalar(x)
+        except Exception: return NAN
+        if isinstance(y, complex): return NAN # A negative number to a fractional power
+        try: y = float(y)
+        except OverflowError: return NAN
+        return y if math.isfinite(y) else NAN
+
+    def __call__(self, xs):
+        """f at every x in ``xs``: a NumPy array with NumPy, else ``array('d')``."""
+        if self._vector is not None:
+            xs = numpy.asarray(xs, dtype=float)
+            try:
+                with numpy.errstate(all="ignore"):
+                    ys = numpy.broadcast_to(numpy.asarray(self._vector(xs), dtype=float), xs.shape).copy()
+                ys[~numpy.isfinite(ys)] = NAN
+                return ys
+            except Exception: pass # e.g. a literal too big for a float, or 1/0 between constants; go point by point
+        value = self.value
+        return array("d", [value(x) for x in xs])
+
+def linspace(start, stop, count):
+    if count < 2: return [float(start)]
+    step = (stop - start) / (count - 1)
+    return [start + i * step for i in range(count - 1)] + [float(stop)]
+
+def adaptive_samples(func, start, stop, budget=2000, tolerance=None):
+    """``(xs, ys)`` lists with at most ``budget`` points: a quarter of them evenly spaced, the rest where the curve bends.
+
+    Each round evaluates one midpoint in every interval that needs it, all in one ``func`` call. An
+    interval needs one when a neighbouring point bends by more than ``tolerance`` (in y units;
+    default 1/500 of the sampled y range) or when exactly one of its ends is undefined.
+    """
+    xs = linspace(start, stop, max(2, budget // 4))
+    ys = list(func(xs))
+    if tolerance is None:
+        finite = [y for y in ys if y == y]
+        tolerance = (max(finite) - min(finite)) / 500 if finite else 0.0
+        if not tolerance: tolerance = 1e-9
+    while len(xs) < budget:
+        count = len(xs); bends = [0.0] * count
+        for i in range(1, count - 1):
+            bend = abs(ys[i - 1] - 2 * ys[i] + ys[i + 1])
+            bends[i] = bend if bend == bend else math.inf # NaN next to a number: an edge of the domain
+        scores = []
+        for i in range(count - 1):
+            score = max(bends[i], bends[i + 1])
+            if (ys[i] == ys[i]) != (ys[i + 1] == ys[i + 1]): score = math.inf
+            if score > tolerance and xs[i + 1] - xs[i] > abs(xs[i]) * 1e-12: scores.append((score, i))
+        if not scores: break
+        room = budget - count
+        if len(scores) > room: scores.sort(reverse=True); del scores[room:]
+        chosen = sorted(i for _, i in scores)
+        mids = [(xs[i] + xs[i + 1]) / 2 for i in chosen]
+        new_ys = list(func(mids))
+        merged_xs = []; merged_ys = []; last = 0
+        for i, x, y in zip(chosen, mids, new_ys):
+            merged_xs.extend(xs[last:i + 1]); merged_ys.extend(ys[last:i + 1])
+            merged_xs.append(x); merged_ys.append(y); last = i + 1
+        merged_xs.extend(xs[last:]); merged_ys.extend(ys[last:])
+        xs, ys = merged_xs, merged_ys
+    return xs, ys
+
+def y_range(ys, fraction=0.02):
+    """A y range for the samples that leaves out the top and bottom ``fraction`` (so poles do not flatten the plot)."""
+    finite = sorted(y for y in ys if y == y)
+    if not finite: return -1.0, 1.0
+    cut = int(len(finite) * fraction)
+    low, high = finite[cut], finite[len(finite) - 1 - cut]
+    if high - low < 1e-12: low, high = low - 1.0, high + 1.0
+    margin = (high - low) * 0.05
+    return low - margin, high + margin
+
+class Viewport:
+    """The visible data rectangle and the canvas size it is drawn into."""
+    __slots__ = ("x_min", "x_max", "y_min", "y_max", "width", "height")
+
+    def __init__(self, x_min, x_max, y_min, y_max, width, height):
+        self.x_min = x_min; self.x_max = x_max; self.y_min = y_min; self.y_max = y_max
+        self.width = max(1, width); self.height = max(1, height)
+
+    def to_canvas(self, x, y):
+        return ((x - self.x_min) / (self.x_max - self.x_min) * self.width,
+                (self.y_max - y) / (self.y_max - self.y_min) * self.height)
+
+    def to_data(self, px, py):
+        return (self.x_min + px / self.width * (self.x_max - self.x_min),
+                self.y_max - py / self.height * (self.y_max - self.y_min))
+
+    def pan(self, dx_pixels, dy_pixels):
+        dx = dx_pixels / self.width * (self.x_max - self.x_min); dy = dy_pixels / self.height * (self.y_max - self.y_min)
+        self.x_min -= dx; self.x_max -= dx; self.y_min += dy; self.y_max += dy
+
+    def zoom(self, factor, px, py):
+        """Scale the view by ``factor`` (< 1 zooms in) around canvas point ``(px, py)``."""
+        cx, cy = self.to_data(px, py)
+        self.x_min = cx + (self.x_min - cx) * factor; self.x_max = cx + (self.x_max - cx) * factor
+        self.y_min = cy + (self.y_min - cy) * factor; self.y_max = cy + (self.y_max - cy) * factor
+
+def polylines(xs, ys, viewport):
+    """Flat canvas coordinate lists ``[x0, y0, x1, y1, ...]``, one per unbroken piece of the curve.
+
+    Pieces break at undefined points and at jumps of more than the canvas height
+    between points on opposite sides of the view (poles, such as tan's).
+    """
+    lines = []; current = []
+    limit = viewport.height * 10 # Keeps Tk's coordinates sane far off-screen
+    middle = (viewport.y_min + viewport.y_max) / 2
+    x_scale = viewport.width / (viewport.x_max - viewport.x_min); y_scale = viewport.height / (viewport.y_max - viewport.y_min)
+    previous_py = previous_y = None
+    for x, y in zip(xs, ys):
+        if y != y: # NaN
+            if len(current) >= 4: lines.append(current)
+            current = []; previous_py = None; continue
+        px = (x - viewport.x_min) * x_scale; py = min(limit, max(-limit, (viewport.y_max - y) * y_scale))
+        if previous_py is not None and abs(py - previous_py) > viewport.height and (y - middle) * (previous_y - middle) < 0:
+            if len(current) >= 4: lines.append(current)
+            current = []
+        current.append(px); current.append(py); previous_py = py; previous_y = y
+    if len(current) >= 4: lines.append(current)
+    return lines
+
+class TableRow(collections.namedtuple("TableRow", "x y")):
+    __slots__ = ()
+
+    def __str__(self):
+        return f"{self.x:>14.10g}   {'Error' if self.y != self.y else format(self.y, '.12g')}"
+
+class TableSource:
+    """Rows x = start, start + step, ... up to stop, for ``history_view.VirtualHistoryList`` (``count``/``fetch``); each page is one vectorised call."""
+
+    def __init__(self, func, start, stop, step):
+        if step <= 0 or stop < start: raise ValueError("the step must be positive and the range not empty")
+        self.func = func; self.start = start; self.step = step
+        self.rows = int(math.floor((stop - start) / step + 1e-9)) + 1
+
+    def count(self):
+        return self.rows
+
+    def fetch(self, offset, limit):
+        xs = [self.start + i * self.step for i in range(offset, min(self.rows, offset + limit))]
+        return [TableRow(x, y) for x, y in zip(xs, self.func(xs))]
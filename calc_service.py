@@ -0,0 +1,279 @@
+"""Local calculator service: evaluation, unit conversion and history over a socket.
+
+For tools that want the calculator's semantics without its window. The
+protocol is JSON lines on persistent connections (localhost TCP or a Unix
+socket). Requests may be pipelined, and responses come back in request order::
+
+    {"id": 1, "op": "evaluate", "expression": "sin(30)", "degrees": true, "record": true}
+    {"id": 2, "op": "convert", "category": "Length", "from": "ft", "to": "m", "value": "12"}
+    {"id": 3, "op": "history_append", "expression": "2+2", "result": "4"}
+    {"id": 4, "op": "ping"}
+
+Each response is ``{"id": ..., "ok": true, "result": ...}`` or ``{"id": ...,
+"ok": false, "error": ...}``. The error is what the calculator would show:
+"Error", "Overflow", "Unknown unit", and so on. Evaluations follow "=" exactly
+(``calc_batch.evaluate_expression``), and conversions follow the Units window
+(``calc_core.convert_units``).
+
+Evaluations arriving within ``BATCH_WINDOW_MS`` of each other are sent to the
+worker pool as one task, up to ``BATCH_SIZE`` at a time. History appends from
+the same window are written in one transaction. At most ``MAX_IN_FLIGHT``
+requests are admitted at once. Beyond that the server stops reading, so
+clients are slowed by socket flow control instead of growing its queues::
+
+    python -m calc_service serve --port 8765 --workers 4
+    python -m calc_service load --port 8765 --connections 16 --requests 50000
+"""
+import argparse
+import asyncio
+import collections
+import json
+import os
+import sys
+import time
+from concurrent.futures import BrokenExecutor
+import calc_batch
+from calc_core import CalculatorCore, convert_units
+from instrumentation import LatencyHistogram
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+class MicroBatcher:
+    """Collects submitted items for up to ``window`` seconds or ``size`` items, then runs ``process(items)`` once for all of them.
+
+    ``process`` is a coroutine function returning one result per item. ``submit`` returns a future for the item's result.
+    """
+    def __init__(self, process, size, window):
+        self.process = process; self.size = size; self.window = window
+        self.batches = 0 # Batches run, for statistics
+        self._items = []; self._futures = []; self._timer = None; self._tasks = set()
+
+    def submit(self, item):
+        future = asyncio.get_running_loop().create_future()
+        self._items.append(item); self._futures.append(future)
+        if len(self._items) >= self.size: self.flush()
+        elif self._timer is None: self._timer = asyncio.get_running_loop().call_later(self.window, self.flush)
+        return future
+
+    def flush(self):
+        if self._timer is not None: self._timer.cancel(); self._timer = None
+        if not self._items: return
+        items, futures = self._items, self._futures
+        self._items = []; self._futures = []; self.batches += 1
+        task = asyncio.ensure_future(self._run(items, futures))
+        self._tasks.add(task); task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, items, futures):
+        try: results = await self.process(items)
+        except Exception as e:
+            for future in futures:
+                if not future.done(): future.set_exception(e)
+            return
+        for future, result in zip(futures, results):
+            if not future.done(): future.set_result(result)
+
+    async def drain(self):
+        self.flush()
+        while self._tasks: await asyncio.gather(*self._tasks, return_exceptions=True)
+
+class CalculatorService:
+    BATCH_SIZE = 64 # Evaluations per worker task
+    BATCH_WINDOW_MS = 1 # How long the first request of a batch waits for company
+    MAX_IN_FLIGHT = 1024 # Requests admitted server-wide before connections stop being read
+    MAX_LINE_BYTES = 64 * 1024
+
+    def __init__(self, workers=None, history_file=None):
+        """``workers`` processes evaluate batches (None: one per CPU, 0: in the event loop thread)."""
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.history_file = history_file or CalculatorCore.HISTORY_FILE
+        self.history_store = None; self.unit_catalog = None
+        self.requests = 0
+        self._pool = None; self._server = None; self._admission = None; self._connections = set()
+        self.evaluations = MicroBatcher(self._evaluate_batch, self.BATCH_SIZE, self.BATCH_WINDOW_MS / 1000)
+        self.history = MicroBatcher(self._append_batch, self.BATCH_SIZE, self.BATCH_WINDOW_MS / 1000)
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT, unix_path=None):
+        """Listen on ``unix_path`` if given, else on ``host:port`` (port 0 picks a free one); returns the asyncio server."""
+        self._admission = asyncio.Semaphore(self.MAX_IN_FLIGHT)
+        if self.workers:
+            from concurrent.futures import ProcessPoolExecutor
+            self._pool = ProcessPoolExecutor(self.workers)
+        if unix_path: self._server = await asyncio.start_unix_server(self._serve_connection, unix_path, limit=self.MAX_LINE_BYTES)
+        else: self._server = await asyncio.start_server(self._serve_connection, host, port, limit=self.MAX_LINE_BYTES)
+        return self._server
+
+    @property
+    def address(self):
+        return self._server.sockets[0].getsockname()
+
+    async def close(self):
+        self._server.close()
+        for task in list(self._connections): task.cancel()
+        await asyncio.gather(*self._connections, return_exceptions=True)
+        await self._server.wait_closed()
+        await self.evaluations.drain(); await self.history.drain()
+        if self._pool is not None: self._pool.shutdown()
+        if self.history_store is not None: self.history_store.close()
+
+    def statistics(self):
+        return {"requests": self.requests, "evaluation_batches": self.evaluations.batches, "history_batches": self.history.batches}
+
+    async def _evaluate_batch(self, jobs):
+        if self._pool is None: return calc_batch.evaluate_expressions(jobs)
+        pool = self._pool
+        try: return await asyncio.get_running_loop().run_in_executor(pool, calc_batch.evaluate_expressions, jobs)
+        except BrokenExecutor:
+            if self._pool is pool: # A worker died: this batch fails, later ones get a new pool
+                from concurrent.futures import ProcessPoolExecutor
+                pool.shutdown(wait=False); self._pool = ProcessPoolExecutor(self.workers)
+            raise
+
+    async def _append_batch(self, entries):
+        if self.history_store is None:
+            from history_store import HistoryStore
+            self.history_store = HistoryStore(self.history_file)
+        self.history_store.extend(entries)
+        return [None] * len(entries)
+
+    async def _serve_connection(self, reader, writer):
+        self._connections.add(asyncio.current_task())
+        responses = asyncio.Queue(self.MAX_IN_FLIGHT) # Response tasks in request order
+        sender = asyncio.ensure_future(self._send_responses(responses, writer))
+        try:
+            while True:
+                try: line = await reader.readline()
+                except (ValueError, ConnectionError) as e: # ValueError: a line longer than MAX_LINE_BYTES
+                    if isinstance(e, ValueError): await responses.put(_finished({"id": None, "ok": False, "error": "request too long"}))
+                    break
+                if not line: break
+                await self._admission.acquire() # Blocks reading while the server is saturated
+                task = asyncio.ensure_future(self._handle(line))
+                task.add_done_callback(lambda _: self._admission.release())
+                await responses.put(task)
+            await responses.put(None); await sender # Answer everything read so far
+        except asyncio.CancelledError: # Shutting down: the client may have stopped reading, so do not wait for it
+            sender.cancel(); await asyncio.gather(sender, return_exceptions=True)
+        finally:
+            writer.close()
+            self._connections.discard(asyncio.current_task())
+
+    async def _send_responses(self, responses, writer):
+        broken = False
+        while True:
+            task = await responses.get()
+            if task is None: return
+            response = await task
+            if broken: continue # Keep consuming so the reader never blocks on a full queue
+            try:
+                writer.write(json.dumps(response, ensure_ascii=False).encode() + b"\n")
+                # Returns at once unless the transport buffer is over its high-water mark. A client that stops
+                # reading blocks this, then the full response queue blocks the reader, so it stops being read too
+                await writer.drain()
+            except ConnectionError: broken = True
+
+    async def _handle(self, line):
+        self.requests += 1; request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get("id"); op = request["op"]
+            if op == "evaluate":
+                expression = calc_batch.clean_expression(str(request["expression"])); degree_mode = bool(request.get("degrees"))
+                result, error = await self.evaluations.submit((expression, degree_mode))
+                if error is None and request.get("record"): await self.history.submit((expression, result, time.time(), degree_mode))
+            elif op == "convert":
+                if self.unit_catalog is None:
+                    from units import default_catalog
+                    self.unit_catalog = default_catalog()
+                result, error = convert_units(self.unit_catalog, request["category"], request["from"], request["to"], str(request["value"]))
+            elif op == "history_append":
+                await self.history.submit((str(request["expression"]), str(request["result"]), time.time(), bool(request.get("degrees"))))
+                result, error = None, None
+            elif op == "ping": result, error = "pong", None
+            else: result, error = None, f"unknown op {op!r}"
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            result, error = None, f"bad request: {type(e).__name__}: {e}"
+        except Exception as e: # A broken worker pool, a history database error, ...: fail this request, not the connection
+            result, error = None, f"internal error: {type(e).__name__}: {e}"
+        if error is not None: return {"id": request_id, "ok": False, "error": error}
+        return {"id": request_id, "ok": True, "result": result}
+
+def _finished(response):
+    future = asyncio.get_running_loop().create_future(); future.set_result(response)
+    return future
+
+LOAD_MIXES = {
+    "evaluate": [{"op": "evaluate", "expression": f"{i}*{i % 7 + 1}+sqrt({i})-sin({i})/3"} for i in range(1, 257)],
+    "convert": [{"op": "convert", "category": "Length", "from": "ft", "to": "m", "value": str(i / 4)} for i in range(1, 257)],
+}
+LOAD_MIXES["mixed"] = [request for pair in zip(LOAD_MIXES["evaluate"], LOAD_MIXES["convert"]) for request in pair]
+
+async def load_test(open_connection, connections=8, requests=10000, depth=32, mix="mixed"):
+    """Drive a running service with ``connections`` persistent clients, each keeping up to ``depth`` requests in flight.
+
+    ``open_connection`` is a coroutine function returning ``(reader, writer)``. Returns throughput and latency percentiles.
+    """
+    payloads = [json.dumps(request).encode() + b"\n" for request in LOAD_MIXES[mix]]
+    histogram = LatencyHistogram(); errors = 0
+    async def client(count):
+        nonlocal errors
+        reader, writer = await open_connection()
+        sent = collections.deque(); window = asyncio.Semaphore(depth)
+        async def send():
+            for i in range(count):
+                await window.acquire()
+                sent.append(time.perf_counter_ns()); writer.write(payloads[i % len(payloads)])
+                await writer.drain()
+        sender = asyncio.ensure_future(send())
+        try:
+            for _ in range(count):
+                line = await reader.readline()
+                if not line: raise ConnectionError("the service closed the connection")
+                histogram.add(time.perf_counter_ns() - sent.popleft()); window.release()
+                if not json.loads(line)["ok"]: errors += 1
+            await sender
+        finally:
+            sender.cancel(); writer.close()
+    shares = [requests // connections + (i < requests % connections) for i in range(connections)]
+    start = time.perf_counter()
+    await asyncio.gather(*(client(share) for share in shares if share))
+    seconds = time.perf_counter() - start
+    summary = histogram.summary()
+    return {"requests": requests, "connections": connections, "depth": depth, "errors": errors, "seconds": seconds,
+            "requests_per_s": requests / seconds, **{key: summary[key] for key in ("mean_us", "p50_us", "p95_us", "p99_us", "max_us")}}
+
+def _connector(args):
+    if args.unix: return lambda: asyncio.open_unix_connection(args.unix)
+    return lambda: asyncio.open_connection(args.host, args.port)
+
+async def _serve(args):
+    service = CalculatorService(None if args.workers < 0 else args.workers, args.history)
+    await service.start(args.host, args.port, args.unix)
+    print(f"calculator service on {args.unix or '%s:%d' % service.address[:2]} with {service.workers or 'no'} worker processes", file=sys.stderr)
+    try: await asyncio.Event().wait() # Until interrupted
+    finally: await service.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="calc_service", description="Serve calculator evaluation over a local socket, or load-test a running service.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve = commands.add_parser("serve", help="run the service")
+    load = commands.add_parser("load", help="load-test a running service and report throughput and tail latency")
+    for command in (serve, load):
+        command.add_argument("--host", default=DEFAULT_HOST); command.add_argument("--port", type=int, default=DEFAULT_PORT)
+        command.add_argument("--unix", metavar="PATH", help="Unix socket path instead of TCP")
+    serve.add_argument("--workers", type=int, default=-1, help="evaluation processes; 0 evaluates in the server process (default: one per CPU)")
+    serve.add_argument("--history", metavar="FILE", help="history database for appends (default: the calculator's)")
+    load.add_argument("--connections", type=int, default=8); load.add_argument("--requests", type=int, default=10000, help="total requests")
+    load.add_argument("--depth", type=int, default=32, help="pipelined requests per connection")
+    load.add_argument("--mix", choices=sorted(LOAD_MIXES), default="mixed")
+    args = parser.parse_args(argv)
+    if args.command == "serve":
+        try: asyncio.run(_serve(args))
+        except KeyboardInterrupt: pass
+        return 0
+    report = asyncio.run(load_test(_connector(args), args.connections, args.requests, args.depth, args.mix))
+    for key, value in report.items(): print(f"{key:>16}: {value:,.1f}" if isinstance(value, float) else f"{key:>16}: {value}")
+    return 1 if report["errors"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+"""Out-of-process evaluation with a time and memory budget.
+
+Big-integer arithmetic holds the GIL, so a thread cannot keep the Tk loop
+responsive while ``9**9**9`` is being built; jobs run in a child process that
+can be killed on cancel or when the budget is exceeded. ``poll()`` never
+blocks and is meant to be driven from ``root.after``. Jobs that use the
+user's definitions carry ``Definitions.sources()``; the worker rebuilds them
+only when they change.
+"""
+import multiprocessing
+import time
+from calc_engine import ExpressionEngine, evaluate_job
+
+try:
+    import resource # POSIX only; without it the memory budget is not enforced
+except ImportError:
+    resource = None
+
+def _worker_main(conn, memory_budget):
+    if resource is not None and memory_budget:
+        try: resource.setrlimit(resource.RLIMIT_AS, (memory_budget, memory_budget))
+        except (ValueError, OSError): pass
+    engine = ExpressionEngine(); definitions = None; loaded = None
+    while True:
+        try: job, sources = conn.recv()
+        except (EOFError, OSError): return
+        if sources is not None and sources != loaded:
+            from calc_definitions import Definitions
+            definitions = Definitions(); definitions.load(sources); loaded = sources
+        try: conn.send(("ok",) + evaluate_job(engine if sources is None else definitions, job))
+        except MemoryError: conn.send(("error", "MemoryError"))
+        except Exception as e: conn.send(("error", type(e).__name__))
+
+class EvaluationWorker:
+    def __init__(self, time_budget=5.0, memory_budget=512 * 1024 * 1024):
+        self.time_budget = time_budget
+        self.memory_budget = memory_budget
+        self._context = multiprocessing.get_context("spawn")
+        self._process = None; self._conn = None
+        self._started_at = None
+
+    @property
+    def busy(self):
+        return self._started_at is not None
+
+    def _ensure_process(self):
+        if self._process is None or not self._process.is_alive():
+            self._conn, child_conn = self._context.Pipe()
+            self._process = self._context.Process(target=_worker_main, args=(child_conn, self.memory_budget), daemon=True)
+            self._process.start(); child_conn.close()
+
+    def submit(self, job, definitions=None):
+        """Start ``job`` (see ``calc_engine.evaluate_job``), over ``definitions`` (``Definitions.sources()``) if given."""
+        if self.busy: self.cancel()
+        self._ensure_process()
+        self._conn.send((job, definitions)); self._started_at = time.monotonic()
+
+    def poll(self):
+        """Return ``("ok", value, text)``, ``("error", name)``, ``("timeout",)`` or None if still running."""
+        if not self.busy: return None
+        try:
+            if self._conn.poll():
+                self._started_at = None; return self._conn.recv()
+        except (EOFError, OSError): # Killed by the memory limit or the OS
+            self._kill(); return ("error", "MemoryError")
+        if time.monotonic() - self._started_at > self.time_budget:
+            self._kill(); return ("timeout",)
+        return None
+
+    def cancel(self):
+        if self.busy: self._kill()
+
+    def _kill(self):
+        self._started_at = None
+        if self._process is not None: self._process.terminate()
+        if self._conn is not None: self._conn.close()
+        self._process = None; self._conn = None
+        multiprocessing.active_children() # Reaps terminated workers without blocking
+
+    def shutdown(self):
+        self._kill()
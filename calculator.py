@@ -1,140 +1,122 @@
 import tkinter as tk
 from tkinter import ttk
-import math
-import collections # Added for history
-import json # For settings
-import os   # For settings
+from calc_core import CalculatorCore
+from calc_engine import PASTE_SYMBOLS
+from history_view import VirtualHistoryList
+from theme_styles import THEMES, button_style, theme_table
+# calc_worker (multiprocessing), unit_batch (csv, argparse) and history_search (datetime) are imported
+# when first needed; see benchmarks/bench_startup.py
 
-class Calculator:
-    SETTINGS_FILE = "calc_settings.json" 
-    NUM_MEMORY_SLOTS = 5 
+class TkView:
+    """The view interface of calc_core.CalculatorCore on a Tk root."""
 
     def __init__(self, root):
         self.root = root
+
+    def variable(self, value=""):
+        return tk.StringVar(self.root, value)
+
+    def after(self, ms, callback):
+        return self.root.after(ms, callback)
+
+    def after_idle(self, callback):
+        return self.root.after_idle(callback)
+
+    def after_cancel(self, job):
+        self.root.after_cancel(job)
+
+    def bell(self):
+        self.root.bell()
+
+    def clipboard_text(self):
+        try: return self.root.clipboard_get()
+        except tk.TclError: return "" # Empty clipboard
+
+class Calculator(CalculatorCore):
+    # State and keypad logic live in CalculatorCore; this class adds the widgets and secondary windows
+    HISTORY_FILTER_DEBOUNCE_MS = 150 # Filtering waits for a pause in typing
+    UNIT_PICKER_MAX_MATCHES = 200 # Type-ahead matches listed in a unit picker's dropdown
+    INSTRUMENTED_METHODS = CalculatorCore.INSTRUMENTED_METHODS + ("perform_batch_conversion",)
+    STATS_REFRESH_MS = 1000
+    PLOT_POINT_BUDGET = 4000 # Most samples per plot redraw
+    PLOT_POINTS_PER_PIXEL = 2
+    PLOT_ZOOM_STEP = 1.25 # View scale per mouse wheel notch
+
+    def __init__(self, root, settings_file=None, history_file=None):
+        self.root = root
         self.root.title("Calculator")
-        self.root.geometry("300x610") 
+        self.root.geometry("300x650") 
         self.root.resizable(True, True) # Changed to True for main window responsiveness
         
         # Configure minimum size for the root window
         self.root.minsize(300, 500) # Example minimum size
 
-        self.expression = ""
-        self.result_var = tk.StringVar()
-        self.result_var.set("0")
-        
-        self.memory_slots = [0.0] * Calculator.NUM_MEMORY_SLOTS
-        self.active_memory_slot_index = 0
-        self.memory_slot_display_var = tk.StringVar()
-        
-        self.degree_mode = False 
+        self.stats_window = None
+        self.stats_text = None
+        self.plot_window = None
+        self.plot_canvas = None
+        self.plot_table = None # history_view.VirtualHistoryList over a calc_plot.TableSource
+        self.plot_body = None
+        self.plot_function = None # calc_plot.FunctionOfX being shown
+        self.plot_viewport = None
+        self.plot_lines = [] # Canvas line items, reused across redraws
+        self.plot_expression_var = None # Created with the window
+        self._plot_drag = None
+        self._plot_redraw_job = None
+        self.preview_label = None
         self.deg_rad_button = None 
-        self.initial_deg_rad_text = "Rad" 
 
-        self.history = collections.deque(maxlen=10)
         self.history_window = None
         self.history_listbox = None
+        self.history_view = None
+        self.history_filter_var = None
+        self._history_filter_ids = None # Matching row ids while the history filter is active
+        self._history_filter_job = None
         self.memory_slot_display_label = None 
 
         self.unit_conversion_window = None
-        self.conversion_factors = {
-            "Length": {
-                "Meter (m)": 1.0, "Kilometer (km)": 1000.0, "Mile (mi)": 1609.34,
-                "Foot (ft)": 0.3048, "Inch (in)": 0.0254, "Centimeter (cm)": 0.01,
-                "Millimeter (mm)": 0.001,
-            },
-            "Weight": {
-                "Kilogram (kg)": 1.0, "Gram (g)": 0.001,
-                "Pound (lb)": 0.453592, "Ounce (oz)": 0.0283495,
-            },
-            "Temperature": { 
-                "Celsius (°C)": "Celsius", "Fahrenheit (°F)": "Fahrenheit", "Kelvin (K)": "Kelvin",
-            }
-        }
-        self.unit_categories = list(self.conversion_factors.keys())
-        
-        self.uc_category_var = tk.StringVar()
-        self.uc_from_unit_var = tk.StringVar()
-        self.uc_to_unit_var = tk.StringVar()
-        self.uc_input_var = tk.StringVar()
-        self.uc_result_var = tk.StringVar()
-        
         self.uc_category_menu = None
-        self.uc_from_unit_menu = None
-        self.uc_to_unit_menu = None
+        self.uc_from_unit_picker = None
+        self.uc_to_unit_picker = None
         self.uc_input_entry = None
         self.uc_result_label = None
+        self.uc_batch_window = None
+        self.uc_batch_input = None
+        self.uc_batch_output = None
+
+        self.definitions_window = None
+        self.definitions_listbox = None
+        self.definitions_entry_var = None # Created with the window
+        self.definitions_status_var = None
+        self._definition_names = [] # Name on each listbox row
 
-        self.themes = {
-            "Light": {
-                "bg": "#F0F0F0", "fg": "Black",
-                "display_bg": "#FFFFFF", "display_fg": "Black", "mem_slot_fg": "Black", "uc_label_fg": "Black",
-                "button_bg": "#E1E1E1", "button_fg": "Black", "button_active_bg": "#CFCFCF",
-                "operator_button_bg": "#D3D3D3", "operator_button_fg": "Black", "operator_button_active_bg": "#BEBEBE",
-                "memory_button_bg": "#CFCFCF", "memory_button_fg": "Black", "memory_button_active_bg": "#BDBDBD",
-                "equals_button_bg": "#ADD8E6", "equals_button_fg": "Black", "equals_button_active_bg": "#9CCCE0",
-                "special_button_bg": "#E1E1E1", "special_button_fg": "Black", "special_button_active_bg": "#CFCFCF",
-                "listbox_bg": "#FFFFFF", "listbox_fg": "Black", "listbox_select_bg": "#0078D7", "listbox_select_fg": "White",
-                "entry_bg": "#FFFFFF", "entry_fg": "Black",
-            },
-            "Dark": {
-                "bg": "#2E2E2E", "fg": "White",
-                "display_bg": "#1C1C1C", "display_fg": "White", "mem_slot_fg": "#A9A9A9", "uc_label_fg": "White",
-                "button_bg": "#505050", "button_fg": "White", "button_active_bg": "#6A6A6A",
-                "operator_button_bg": "#606060", "operator_button_fg": "White", "operator_button_active_bg": "#7A7A7A",
-                "memory_button_bg": "#5A5A5A", "memory_button_fg": "White", "memory_button_active_bg": "#707070",
-                "equals_button_bg": "#005A9C", "equals_button_fg": "White", "equals_button_active_bg": "#007ACC",
-                "special_button_bg": "#505050", "special_button_fg": "White", "special_button_active_bg": "#6A6A6A",
-                "listbox_bg": "#1C1C1C", "listbox_fg": "White", "listbox_select_bg": "#005A9C", "listbox_select_fg": "White",
-                "entry_bg": "#3C3C3C", "entry_fg": "White",
-            }
-        }
-        self.current_theme_name = "Light" 
+        self.themes = THEMES
         self.style = ttk.Style()
+        self._applied_theme = None # theme_styles.ThemeTable last pushed to self.style
         
         self.all_button_widgets = [] 
         self.display_frame = None
         self.buttons_frame = None
         self.display_label = None
 
-        self.load_settings() 
-        self.memory_slot_display_var.set(f"M{self.active_memory_slot_index + 1}")
+        super().__init__(TkView(root), settings_file, history_file) # Loads the settings and the history tail
 
         self.create_widgets() 
         self.apply_theme()    
 
         self.root.bind('<Key>', self.handle_keypress)
+        for sequence in ('<Control-v>', '<Control-V>'): self.root.bind(sequence, self.on_paste) # More specific than <Key>
+        for sequence, command in (('<Control-s>', "STO"), ('<Control-r>', "RCL")): self.root.bind(sequence, lambda event, c=command: self.button_click(c))
+        self.root.bind('<Destroy>', self.on_root_destroy, add="+")
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
         self.root.focus_set()
 
-    def load_settings(self):
-        try:
-            if os.path.exists(Calculator.SETTINGS_FILE):
-                with open(Calculator.SETTINGS_FILE, "r") as f:
-                    loaded_settings = json.load(f)
-                    self.current_theme_name = loaded_settings.get("theme", "Light")
-                    loaded_history = loaded_settings.get("history", [])
-                    if isinstance(loaded_history, list):
-                        self.history.clear(); [self.history.append(item) for item in loaded_history]
-                    
-                    loaded_memory_slots = loaded_settings.get("memory_slots", [0.0] * Calculator.NUM_MEMORY_SLOTS)
-                    if isinstance(loaded_memory_slots, list) and len(loaded_memory_slots) == Calculator.NUM_MEMORY_SLOTS:
-                        self.memory_slots = loaded_memory_slots
-                    else: self.memory_slots = [0.0] * Calculator.NUM_MEMORY_SLOTS
-                    self.active_memory_slot_index = loaded_settings.get("active_memory_slot_index", 0)
-                    if not (0 <= self.active_memory_slot_index < Calculator.NUM_MEMORY_SLOTS): self.active_memory_slot_index = 0
-            else: pass
-        except (json.JSONDecodeError, IOError) as e:
-            print(f"Error loading settings: {e}. Using default settings.")
-            self.current_theme_name = "Light"; self.history.clear()
-            self.memory_slots = [0.0] * Calculator.NUM_MEMORY_SLOTS; self.active_memory_slot_index = 0
-    
-    def save_settings(self):
-        settings_to_save = {
-            "theme": self.current_theme_name, "history": list(self.history),
-            "memory_slots": self.memory_slots, "active_memory_slot_index": self.active_memory_slot_index
-        }
-        try:
-            with open(Calculator.SETTINGS_FILE, "w") as f: json.dump(settings_to_save, f, indent=4)
-        except IOError as e: print(f"Error saving settings: {e}")
+    def on_close(self):
+        self.root.destroy() # on_root_destroy flushes pending settings
+
+    def on_root_destroy(self, event):
+        if event.widget is not self.root: return # <Destroy> on the root also fires for every child widget
+        self.close()
 
     def create_widgets(self):
         # Configure root window's grid to make the display and button frames responsive
@@ -142,7 +124,7 @@ class Calculator:
         self.root.grid_rowconfigure(1, weight=4) # Button frame row (give more weight to buttons area)
         self.root.grid_columnconfigure(0, weight=1)
 
-        self.display_frame = ttk.Frame(self.root, padding="10 5 10 0")
+        self.display_frame = ttk.Frame(self.root, padding="10 5 10 0", style="TFrame")
         self.display_frame.grid(row=0, column=0, sticky="nsew") # Use grid for display_frame
         
         # Configure display_frame's grid
@@ -150,29 +132,33 @@ class Calculator:
         self.display_frame.grid_columnconfigure(1, weight=0) # Memory slot label (fixed width)
         self.display_frame.grid_rowconfigure(0, weight=1)
 
-        self.display_label = ttk.Label(self.display_frame, textvariable=self.result_var, font=("Arial", 30), anchor="e")
+        self.display_label = ttk.Label(self.display_frame, textvariable=self.result_var, font=("Arial", 30), anchor="e", style="Display.TLabel")
         self.display_label.grid(row=0, column=0, sticky="nsew", pady=(0,5))
         
-        self.memory_slot_display_label = ttk.Label(self.display_frame, textvariable=self.memory_slot_display_var, font=("Arial", 12), anchor="w")
+        self.memory_slot_display_label = ttk.Label(self.display_frame, textvariable=self.memory_slot_display_var, font=("Arial", 12), anchor="w", style="MemorySlot.TLabel")
         self.memory_slot_display_label.grid(row=0, column=1, sticky="ns", padx=(5,0), pady=(0,5))
 
-        self.buttons_frame = ttk.Frame(self.root, padding="10 10 10 10")
+        self.preview_label = ttk.Label(self.display_frame, textvariable=self.preview_var, font=("Arial", 12), anchor="e", style="Preview.TLabel")
+        self.preview_label.grid(row=1, column=0, columnspan=2, sticky="ew", pady=(0,5))
+        if not self.live_preview: self.preview_label.grid_remove()
+
+        self.buttons_frame = ttk.Frame(self.root, padding="10 10 10 10", style="TFrame")
         self.buttons_frame.grid(row=1, column=0, sticky="nsew") # Use grid for buttons_frame
 
         buttons = [
-            ("History", 0, 0), ("Theme", 0, 1), ("MNext", 0, 2), 
+            ("History", 0, 0), ("Theme", 0, 1), ("MNext", 0, 2), ("Preview", 0, 3),
             ("MS", 1, 0), ("MR", 1, 1), ("MC", 1, 2), ("M+", 1, 3),
-            ("M-", 2, 0), ("MAC", 2, 1), ("Units", 2, 2), 
-            (self.initial_deg_rad_text, 3, 0), ("π", 3, 1), ("e", 3, 2), ("Del", 3, 3),
+            ("M-", 2, 0), ("MAC", 2, 1), ("Units", 2, 2), ("Plot", 2, 3),
+            (self.angle_mode_text, 3, 0), ("π", 3, 1), ("e", 3, 2), ("Del", 3, 3),
             ("sin", 4, 0), ("cos", 4, 1), ("tan", 4, 2), ("^", 4, 3), 
             ("log", 5, 0), ("ln", 5, 1), ("exp", 5, 2), ("√", 5, 3),
             ("x²", 6, 0), ("x³", 6, 1), ("C", 6, 2), ("/", 6, 3),
             ("7", 7, 0), ("8", 7, 1), ("9", 7, 2), ("*", 7, 3),
             ("4", 8, 0), ("5", 8, 1), ("6", 8, 2), ("-", 8, 3),
             ("1", 9, 0), ("2", 9, 1), ("3", 9, 2), ("+", 9, 3),
-            ("0", 10, 0, 2), (".", 10, 2), ("=", 10, 3)
+            ("0", 10, 0, 2), (".", 10, 2), ("=", 10, 3),
+            ("Vars", 11, 0, 4)
         ]
-        buttons.insert(3, (None, 0, 3)) # Placeholder for empty cell in row 0, col 3
 
         self.all_button_widgets.clear() 
         for button_spec in buttons:
@@ -183,111 +169,143 @@ class Calculator:
             if text == "History": command = self.toggle_history_window
             elif text == "Theme": command = self.toggle_theme
             elif text == "Units": command = self.toggle_unit_conversion_window
+            elif text == "Plot": command = self.toggle_plot_window
+            elif text == "Vars": command = self.toggle_definitions_window
+            elif text == "Preview": command = self.toggle_live_preview
+            elif text == self.angle_mode_text: command = lambda: self.button_click(self.angle_mode_text) # Sends its current label
 
-            button = ttk.Button(self.buttons_frame, text=text, command=command)
+            button = ttk.Button(self.buttons_frame, text=text, command=command, style=button_style(text)) # Styled once; themes only change the style classes
             button.grid(row=row, column=col, columnspan=colspan, sticky="nsew", padx=1, pady=1)
             self.all_button_widgets.append(button)
-            if text == self.initial_deg_rad_text: self.deg_rad_button = button
+            if text == self.angle_mode_text: self.deg_rad_button = button
         
         for i in range(4): self.buttons_frame.grid_columnconfigure(i, weight=1)
-        for i in range(11): self.buttons_frame.grid_rowconfigure(i, weight=1)
-            
-    def apply_theme(self):
-        if not hasattr(self, 'style'): self.style = ttk.Style()
-        theme_colors = self.themes.get(self.current_theme_name, self.themes["Light"]) 
-        self.style.theme_use('default') 
-        self.root.config(bg=theme_colors["bg"])
-
-        self.style.configure("TFrame", background=theme_colors["bg"])
-        if self.display_frame: self.display_frame.config(style="TFrame")
-        if self.buttons_frame: self.buttons_frame.config(style="TFrame")
-
-        self.style.configure("Display.TLabel", background=theme_colors["display_bg"], foreground=theme_colors["display_fg"], font=("Arial", 30), anchor="e", padding=(0,0,5,0))
-        if self.display_label: self.display_label.config(style="Display.TLabel")
-        self.style.configure("MemorySlot.TLabel", background=theme_colors["display_bg"], foreground=theme_colors["mem_slot_fg"], font=("Arial", 12), anchor="w", padding=(2,0,2,0))
-        if self.memory_slot_display_label: self.memory_slot_display_label.config(style="MemorySlot.TLabel")
-        
-        if self.unit_conversion_window and self.unit_conversion_window.winfo_exists():
-            self.unit_conversion_window.config(bg=theme_colors["bg"])
-            self.style.configure("UC.TLabel", background=theme_colors["bg"], foreground=theme_colors["uc_label_fg"])
-            self.style.configure("UC.TEntry", fieldbackground=theme_colors["entry_bg"], foreground=theme_colors["entry_fg"])
-            if hasattr(self.unit_conversion_window, 'uc_frame_ref'): 
-                for child in self.unit_conversion_window.uc_frame_ref.winfo_children(): 
-                    if isinstance(child, ttk.Label): child.configure(style="UC.TLabel")
-                    elif isinstance(child, ttk.Button): child.configure(style="Spec.TButton") 
-                    elif isinstance(child, ttk.Entry): child.configure(style="UC.TEntry")
-                    elif isinstance(child, ttk.OptionMenu): child.configure(style="TButton")
-
-        self.style.configure("TButton", font=('Arial', 10), padding=(3,3,3,3), background=theme_colors["button_bg"], foreground=theme_colors["button_fg"])
-        self.style.map("TButton", background=[('active', theme_colors["button_active_bg"]), ('pressed', theme_colors["button_active_bg"])])
-        # ... (rest of button style configurations) ...
-        self.style.configure("Num.TButton", background=theme_colors["button_bg"], foreground=theme_colors["button_fg"])
-        self.style.map("Num.TButton", background=[('active', theme_colors["button_active_bg"])])
-        self.style.configure("Op.TButton", background=theme_colors["operator_button_bg"], foreground=theme_colors["operator_button_fg"])
-        self.style.map("Op.TButton", background=[('active', theme_colors["operator_button_active_bg"])])
-        self.style.configure("Mem.TButton", background=theme_colors["memory_button_bg"], foreground=theme_colors["memory_button_fg"])
-        self.style.map("Mem.TButton", background=[('active', theme_colors["memory_button_active_bg"])])
-        self.style.configure("Eq.TButton", background=theme_colors["equals_button_bg"], foreground=theme_colors["equals_button_fg"])
-        self.style.map("Eq.TButton", background=[('active', theme_colors["equals_button_active_bg"])])
-        self.style.configure("Spec.TButton", background=theme_colors["special_button_bg"], foreground=theme_colors["special_button_fg"])
-        self.style.map("Spec.TButton", background=[('active', theme_colors["special_button_active_bg"])])
-        
-        for btn_widget in self.all_button_widgets:
-            text = btn_widget.cget("text")
-            style_to_apply = "TButton" 
-            if text.isdigit() or text == ".": style_to_apply = "Num.TButton"
-            elif text in ["+", "-", "*", "/", "^"]: style_to_apply = "Op.TButton"
-            elif text in ["MS", "MR", "MC", "M+", "M-", "MNext", "MAC"]: style_to_apply = "Mem.TButton"
-            elif text == "=": style_to_apply = "Eq.TButton"
-            elif text in ["C", "Del", "History", "Theme", "Units", "π", "e", "sin", "cos", "tan", "log", "ln", "exp", "√", "x²", "x³"] \
-                 or (self.deg_rad_button and btn_widget == self.deg_rad_button): 
-                style_to_apply = "Spec.TButton"
-            btn_widget.config(style=style_to_apply)
-            
-        if self.history_window and self.history_listbox and self.history_listbox.winfo_exists():
-            self.history_listbox.config(bg=theme_colors["listbox_bg"], fg=theme_colors["listbox_fg"], selectbackground=theme_colors["listbox_select_bg"], selectforeground=theme_colors["listbox_select_fg"])
-            self.history_window.config(bg=theme_colors["bg"])
+        for i in range(12): self.buttons_frame.grid_rowconfigure(i, weight=1)
+
+    def show_angle_mode(self):
+        if self.deg_rad_button: self.deg_rad_button.config(text=self.angle_mode_text)
+        self.refresh_definitions_list() # Definitions using trigonometry were recomputed
 
-    def toggle_theme(self):
-        self.current_theme_name = "Dark" if self.current_theme_name == "Light" else "Light"
-        self.apply_theme(); self.save_settings() 
+    def show_live_preview(self):
+        if not self.preview_label: return
+        if self.live_preview: self.preview_label.grid()
+        else: self.preview_label.grid_remove()
+
+    def apply_theme(self):
+        # Widgets got their style class at creation; a theme switch only pushes the options that changed
+        table = theme_table(self.current_theme_name)
+        if self._applied_theme is None: self.style.theme_use('default')
+        delta = table.changes_from(self._applied_theme)
+        for style, options in delta.styles.items(): self.style.configure(style, **options)
+        for style, options in delta.maps.items(): self.style.map(style, **options)
+        if "root" in delta.widgets: self.root.config(**delta.widgets["root"])
+        self._applied_theme = table
+        self.theme_history_window(delta.widgets); self.theme_uc_window(delta.widgets); self.theme_uc_batch_window(delta.widgets)
+        self.theme_stats_window(delta.widgets); self.theme_plot_window(delta.widgets); self.theme_definitions_window(delta.widgets)
+
+    # Secondary windows: ``widgets`` defaults to the whole current table, for a window that has just opened
+    def theme_history_window(self, widgets=None):
+        if not (self.history_window and self.history_listbox and self.history_listbox.winfo_exists()): return
+        widgets = self._applied_theme.widgets if widgets is None else widgets
+        if "window" in widgets: self.history_window.config(**widgets["window"])
+        if "listbox" in widgets: self.history_listbox.config(**widgets["listbox"])
+
+    def theme_uc_window(self, widgets=None):
+        if not (self.unit_conversion_window and self.unit_conversion_window.winfo_exists()): return
+        widgets = self._applied_theme.widgets if widgets is None else widgets
+        if "window" in widgets: self.unit_conversion_window.config(**widgets["window"])
+
+    def theme_uc_batch_window(self, widgets=None):
+        if not (self.uc_batch_window and self.uc_batch_window.winfo_exists()): return
+        widgets = self._applied_theme.widgets if widgets is None else widgets
+        if "window" in widgets: self.uc_batch_window.config(**widgets["window"])
+        if "text" in widgets:
+            for text_widget in (self.uc_batch_input, self.uc_batch_output): text_widget.config(**widgets["text"])
+
+    def theme_stats_window(self, widgets=None):
+        if not (self.stats_window and self.stats_window.winfo_exists()): return
+        widgets = self._applied_theme.widgets if widgets is None else widgets
+        if "window" in widgets: self.stats_window.config(**widgets["window"])
+        if "text" in widgets: self.stats_text.config(**widgets["text"])
+
+    def theme_plot_window(self, widgets=None):
+        if not (self.plot_window and self.plot_window.winfo_exists()): return
+        widgets = self._applied_theme.widgets if widgets is None else widgets
+        if "window" in widgets: self.plot_window.config(**widgets["window"])
+        if "canvas" in widgets: self.plot_canvas.config(**widgets["canvas"])
+        if "plot" in widgets:
+            for tag, color in widgets["plot"].items(): self.plot_canvas.itemconfig(tag, fill=color)
+        if "listbox" in widgets and self.plot_table: self.plot_table.listbox.config(**widgets["listbox"])
+
+    def theme_definitions_window(self, widgets=None):
+        if not (self.definitions_window and self.definitions_window.winfo_exists()): return
+        widgets = self._applied_theme.widgets if widgets is None else widgets
+        if "window" in widgets: self.definitions_window.config(**widgets["window"])
+        if "listbox" in widgets: self.definitions_listbox.config(**widgets["listbox"])
 
     def toggle_history_window(self):
         if self.history_window is None or not self.history_window.winfo_exists():
             self.history_window = tk.Toplevel(self.root) 
             self.history_window.title("Calculation History"); self.history_window.geometry("250x300"); self.history_window.transient(self.root)
-            self.history_listbox = tk.Listbox(self.history_window); self.history_listbox.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
-            self.update_history_display(); self.history_listbox.bind("<Double-1>", self.recall_history_item)
+            self.history_filter_var = tk.StringVar()
+            filter_entry = ttk.Entry(self.history_window, textvariable=self.history_filter_var)
+            filter_entry.pack(fill=tk.X, padx=5, pady=(5, 0))
+            self.history_filter_var.trace_add("write", self._schedule_history_filter)
+            # Only the visible rows are materialised; older ones are paged in from history_store on scroll
+            self.history_view = VirtualHistoryList(self.history_window, self._history_row_count, self._fetch_history_rows)
+            self.history_view.frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+            self.history_listbox = self.history_view.listbox
+            self.history_listbox.bind("<Double-1>", self.recall_history_item)
             self.history_window.protocol("WM_DELETE_WINDOW", self.on_close_history_window)
-            self.apply_theme() 
+            self.theme_history_window()
         else: self.on_close_history_window()
 
     def on_close_history_window(self): 
+        if self._history_filter_job is not None: self.root.after_cancel(self._history_filter_job)
         if self.history_window: self.history_window.destroy()
-        self.history_window = None; self.history_listbox = None
-        
-    def update_history_display(self): 
-        if self.history_window and self.history_listbox and self.history_listbox.winfo_exists():
-            self.history_listbox.delete(0, tk.END)
-            for item in self.history: self.history_listbox.insert(tk.END, item)
+        self.history_window = None; self.history_listbox = None; self.history_view = None
+        self.history_filter_var = None; self._history_filter_ids = None; self._history_filter_job = None
+
+    def _history_row_count(self):
+        if self._history_filter_ids is None: return self.history_store.position_count()
+        return len(self._history_filter_ids)
+
+    def _fetch_history_rows(self, offset, limit):
+        if self._history_filter_ids is None: return self.history_store.page_records(offset, limit)
+        return self.history_store.records_by_ids(self._history_filter_ids[offset:offset + limit])
+
+    def _schedule_history_filter(self, *args):
+        if self._history_filter_job is not None: self.root.after_cancel(self._history_filter_job)
+        self._history_filter_job = self.root.after(Calculator.HISTORY_FILTER_DEBOUNCE_MS, self.apply_history_filter)
+
+    def apply_history_filter(self):
+        # Text, "=value", "=low..high" or "YYYY-MM-DD[..YYYY-MM-DD]"; see history_search
+        self._history_filter_job = None
+        if not self.history_view: return
+        import history_search # Only needed once the filter is used
+        self._history_filter_ids = history_search.search(self.history_store, self.history_filter_var.get())
+        self.history_view.reload()
+
+    def update_history_display(self, new_entry=None): 
+        if self.history_window and self.history_view and self.history_listbox.winfo_exists():
+            if self._history_filter_ids is not None: self._schedule_history_filter() # The new entry may or may not match
+            elif new_entry is None: self.history_view.reload()
+            else: self.history_view.append(new_entry) # Slides the visible window, no rebuild
 
     def recall_history_item(self, event): 
         if not self.history_listbox: return
         selection_indices = self.history_listbox.curselection()
         if not selection_indices: return
-        history_item_string = self.history_listbox.get(selection_indices[0])
-        try:
-            parts = history_item_string.split("=")
-            recalled_value = parts[-1] if len(parts) > 1 else ""
-            if recalled_value == "Error": self.expression = ""; self.result_var.set("Error")
-            else: self.expression = recalled_value; self.result_var.set(self.expression)
-        except Exception: self.expression = ""; self.result_var.set("Error")
+        record = self.history_view.item_at(selection_indices[0]) # The HistoryRecord behind the row; no string parsing
+        if record is None or record.value is None: self.expression = ""; self.result_var.set("Error")
+        else: self.expression = str(record.value); self.result_var.set(self.expression)
 
     def toggle_unit_conversion_window(self):
         if self.unit_conversion_window is None or not self.unit_conversion_window.winfo_exists():
+            self.load_unit_catalog()
             self.unit_conversion_window = tk.Toplevel(self.root)
             self.unit_conversion_window.title("Unit Converter")
-            self.unit_conversion_window.geometry("350x250")
+            self.unit_conversion_window.geometry("350x290")
             self.unit_conversion_window.minsize(300, 220) # Min size for UC window
             self.unit_conversion_window.transient(self.root) 
 
@@ -297,43 +315,49 @@ class Calculator:
 
             # Configure grid columns for uc_frame
             uc_frame.grid_columnconfigure(0, weight=0)  # Label column
-            uc_frame.grid_columnconfigure(1, weight=1)  # Widget column (OptionMenu, Entry)
+            uc_frame.grid_columnconfigure(1, weight=1)  # Widget column (OptionMenu, Combobox, Entry)
             # Row configurations (optional, but good for consistent spacing or specific row expansion)
             for i in range(6): uc_frame.grid_rowconfigure(i, weight=0) # Default no expansion
             uc_frame.grid_rowconfigure(3, weight=0) # Input entry row - no specific expansion needed
             uc_frame.grid_rowconfigure(5, weight=1) # Result label row can expand if needed
 
-            ttk.Label(uc_frame, text="Category:").grid(row=0, column=0, padx=5, pady=5, sticky="w")
+            ttk.Label(uc_frame, text="Category:", style="UC.TLabel").grid(row=0, column=0, padx=5, pady=5, sticky="w")
             self.uc_category_var.set(self.unit_categories[0] if self.unit_categories else "")
             self.uc_category_menu = ttk.OptionMenu(uc_frame, self.uc_category_var, self.uc_category_var.get(), *self.unit_categories, command=self.update_unit_menus, style="TButton")
             self.uc_category_menu.grid(row=0, column=1, padx=5, pady=5, sticky="ew")
             
-            ttk.Label(uc_frame, text="From:").grid(row=1, column=0, padx=5, pady=5, sticky="w")
-            self.uc_from_unit_menu = ttk.OptionMenu(uc_frame, self.uc_from_unit_var, "", style="TButton")
-            self.uc_from_unit_menu.grid(row=1, column=1, padx=5, pady=5, sticky="ew")
-
-            ttk.Label(uc_frame, text="To:").grid(row=2, column=0, padx=5, pady=5, sticky="w")
-            self.uc_to_unit_menu = ttk.OptionMenu(uc_frame, self.uc_to_unit_var, "", style="TButton")
-            self.uc_to_unit_menu.grid(row=2, column=1, padx=5, pady=5, sticky="ew")
-
-            ttk.Label(uc_frame, text="Value:").grid(row=3, column=0, padx=5, pady=5, sticky="w")
-            self.uc_input_entry = ttk.Entry(uc_frame, textvariable=self.uc_input_var)
+            ttk.Label(uc_frame, text="From:", style="UC.TLabel").grid(row=1, column=0, padx=5, pady=5, sticky="w")
+            self.uc_from_unit_picker = ttk.Combobox(uc_frame, textvariable=self.uc_from_unit_var, height=15)
+            self.uc_from_unit_picker.grid(row=1, column=1, padx=5, pady=5, sticky="ew")
+
+            ttk.Label(uc_frame, text="To:", style="UC.TLabel").grid(row=2, column=0, padx=5, pady=5, sticky="w")
+            self.uc_to_unit_picker = ttk.Combobox(uc_frame, textvariable=self.uc_to_unit_var, height=15)
+            self.uc_to_unit_picker.grid(row=2, column=1, padx=5, pady=5, sticky="ew")
+            for picker in (self.uc_from_unit_picker, self.uc_to_unit_picker):
+                picker.bind("<KeyRelease>", lambda event, p=picker: self.on_unit_picker_key(event, p))
+
+            ttk.Label(uc_frame, text="Value:", style="UC.TLabel").grid(row=3, column=0, padx=5, pady=5, sticky="w")
+            self.uc_input_entry = ttk.Entry(uc_frame, textvariable=self.uc_input_var, style="UC.TEntry")
             self.uc_input_entry.grid(row=3, column=1, padx=5, pady=5, sticky="ew")
 
             convert_button = ttk.Button(uc_frame, text="Convert", command=self.perform_unit_conversion, style="Spec.TButton")
             convert_button.grid(row=4, column=0, columnspan=2, padx=5, pady=10, sticky="ew") # columnspan=2 to fill
 
-            ttk.Label(uc_frame, text="Result:").grid(row=5, column=0, padx=5, pady=5, sticky="w")
-            self.uc_result_label = ttk.Label(uc_frame, textvariable=self.uc_result_var, font=("Arial", 12))
+            ttk.Label(uc_frame, text="Result:", style="UC.TLabel").grid(row=5, column=0, padx=5, pady=5, sticky="w")
+            self.uc_result_label = ttk.Label(uc_frame, textvariable=self.uc_result_var, font=("Arial", 12), style="UC.TLabel")
             self.uc_result_label.grid(row=5, column=1, padx=5, pady=5, sticky="ew")
+
+            batch_button = ttk.Button(uc_frame, text="Batch...", command=self.toggle_uc_batch_window, style="Spec.TButton")
+            batch_button.grid(row=6, column=0, columnspan=2, padx=5, pady=5, sticky="ew")
             
             self.update_unit_menus() 
             self.unit_conversion_window.protocol("WM_DELETE_WINDOW", self.on_close_uc_window)
-            self.apply_theme() 
+            self.theme_uc_window()
         else:
             self.on_close_uc_window()
 
     def on_close_uc_window(self):
+        if self.uc_batch_window: self.on_close_uc_batch_window()
         if self.unit_conversion_window: self.unit_conversion_window.destroy()
         self.unit_conversion_window = None
         if self.unit_categories: self.uc_category_var.set(self.unit_categories[0])
@@ -341,187 +365,269 @@ class Calculator:
 
     def update_unit_menus(self, *args):
         category = self.uc_category_var.get()
-        units = list(self.conversion_factors.get(category, {}).keys())
-        # ... (rest of update_unit_menus logic remains the same) ...
-        if self.uc_from_unit_menu:
-            menu = self.uc_from_unit_menu["menu"]; menu.delete(0, "end")
-            for unit in units: menu.add_command(label=unit, command=lambda u=unit, var=self.uc_from_unit_var: var.set(u))
-            if units: self.uc_from_unit_var.set(units[0])
-            else: self.uc_from_unit_var.set("")
-        if self.uc_to_unit_menu:
-            menu = self.uc_to_unit_menu["menu"]; menu.delete(0, "end")
-            for unit in units: menu.add_command(label=unit, command=lambda u=unit, var=self.uc_to_unit_var: var.set(u))
-            if units: self.uc_to_unit_var.set(units[0]) 
-            else: self.uc_to_unit_var.set("")
+        units = self.unit_catalog[category].labels if self.unit_catalog and category in self.unit_catalog else []
+        for picker, var in ((self.uc_from_unit_picker, self.uc_from_unit_var), (self.uc_to_unit_picker, self.uc_to_unit_var)):
+            if picker: picker["values"] = units # One list per picker, not one menu entry per unit
+            var.set(units[0] if units else "")
         self.uc_input_var.set(""); self.uc_result_var.set("")
 
+    def on_unit_picker_key(self, event, picker):
+        if event.keysym == "Return": self.perform_unit_conversion(); return
+        if event.keysym in ("Up", "Down", "Escape", "Tab"): return # Navigating the dropdown, not typing
+        self.filter_unit_picker(picker, picker.get())
 
-    def perform_unit_conversion(self):
-        # ... (existing perform_unit_conversion logic remains the same) ...
-        value_str = self.uc_input_var.get()
-        from_unit = self.uc_from_unit_var.get()
-        to_unit = self.uc_to_unit_var.get()
+    def filter_unit_picker(self, picker, text):
+        # Type-ahead: matches the typed prefix against unit names, symbols and aliases
         category = self.uc_category_var.get()
-
-        if not all([value_str, from_unit, to_unit, category]):
-            self.uc_result_var.set("Missing input"); return
-        try: value_float = float(value_str)
-        except ValueError: self.uc_result_var.set("Invalid input value"); return
-
-        if category == "Temperature":
-            result = None
-            if from_unit == to_unit: result = value_float
-            elif from_unit == "Celsius (°C)":
-                if to_unit == "Fahrenheit (°F)": result = (value_float * 9/5) + 32
-                elif to_unit == "Kelvin (K)": result = value_float + 273.15
-            elif from_unit == "Fahrenheit (°F)":
-                if to_unit == "Celsius (°C)": result = (value_float - 32) * 5/9
-                elif to_unit == "Kelvin (K)": result = ((value_float - 32) * 5/9) + 273.15
-            elif from_unit == "Kelvin (K)":
-                if to_unit == "Celsius (°C)": result = value_float - 273.15
-                elif to_unit == "Fahrenheit (°F)": result = ((value_float - 273.15) * 9/5) + 32
-            
-            if result is not None: self.uc_result_var.set(f"{result:.2f}") 
-            else: self.uc_result_var.set("Select units")
-            return
-        else: 
-            try:
-                category_factors = self.conversion_factors[category]
-                from_factor = category_factors[from_unit]
-                to_factor = category_factors[to_unit]
-            except KeyError: self.uc_result_var.set("Unit factor error"); return
-            if to_factor == 0: self.uc_result_var.set("Conversion error"); return
-            value_in_base = value_float * from_factor
-            result = value_in_base / to_factor
-            self.uc_result_var.set(f"{result:.5g}")
-            
-    def handle_keypress(self, event):
-        # ... (existing keypress logic) ...
-        char = event.char; keysym = event.keysym
-        if keysym == "Return": self.button_click("=")
-        elif keysym == "BackSpace": self.button_click("Del")
-        elif keysym == "Escape": self.button_click("C")
-        elif char in "0123456789": self.button_click(char)
-        elif char in "+-*/.": self.button_click(char)
-        elif char == "^": self.button_click("^")
-
-    def button_click(self, text):
-        # ... (existing button_click logic) ...
-        if text == "Theme" or text == "Units": return 
-
-        if self.deg_rad_button and text == self.deg_rad_button.cget('text'):
-            self.degree_mode = not self.degree_mode
-            new_button_text = "Deg" if self.degree_mode else "Rad"
-            if self.deg_rad_button: self.deg_rad_button.config(text=new_button_text)
-            self.result_var.set("Mode: " + new_button_text); self.expression = ""; return
-
-        active_slot = self.active_memory_slot_index
-        if text == "MS": 
-            try:
-                value_to_store = eval(self.expression) if self.expression else float(self.result_var.get())
-                self.memory_slots[active_slot] = value_to_store
-                self.result_var.set(str(value_to_store)); self.expression = ""; self.save_settings()
-            except Exception: self.result_var.set("Error"); self.expression = ""
-            return
-        elif text == "MR": self.expression = str(self.memory_slots[active_slot]); self.result_var.set(self.expression); return
-        elif text == "MC": self.memory_slots[active_slot] = 0.0; self.save_settings(); return
-        elif text == "M+" or text == "M-": 
-            try:
-                value = eval(self.expression) if self.expression else float(self.result_var.get())
-                if text == "M+": self.memory_slots[active_slot] += value
-                else: self.memory_slots[active_slot] -= value
-                self.result_var.set(str(value)); self.expression = ""; self.save_settings()
-            except Exception: self.result_var.set("Error"); self.expression = ""
-            return
-        elif text == "MNext": 
-            self.active_memory_slot_index = (self.active_memory_slot_index + 1) % Calculator.NUM_MEMORY_SLOTS
-            self.memory_slot_display_var.set(f"M{self.active_memory_slot_index + 1}"); self.save_settings(); return
-        elif text == "MAC": self.memory_slots = [0.0] * Calculator.NUM_MEMORY_SLOTS; self.save_settings(); return
-
-        if text == "=": self.calculate()
-        elif text == "C": self.clear()
-        elif text == "Del":
-            if self.result_var.get().startswith("Mode:"): self.clear()
-            else: self.delete()
-        elif text == "sin": self.apply_math_func(math.sin, is_trig=True)
-        elif text == "cos": self.apply_math_func(math.cos, is_trig=True)
-        elif text == "tan": self.apply_tan()
-        elif text == "log": self.apply_math_func(math.log10, domain_check=lambda x: x > 0)
-        elif text == "ln": self.apply_math_func(math.log, domain_check=lambda x: x > 0)
-        elif text == "exp": self.apply_math_func(math.exp, overflow_check=lambda x: x > 709)
-        elif text == "√": self.apply_math_func(math.sqrt, domain_check=lambda x: x >= 0)
-        elif text == "x²": self.apply_power(2)
-        elif text == "x³": self.apply_power(3)
-        elif text == "^":
-            if self.expression and (self.expression[-1].isdigit() or self.expression[-1] == ')'): self.expression += "**"
-            elif not self.expression and self.result_var.get() not in ["0", "Error", "Mode: Rad", "Mode: Deg"]: self.expression = self.result_var.get() + "**"
-            else: pass 
-            self.result_var.set(self.expression)
-        elif text == "π": self.expression = str(math.pi); self.result_var.set(self.expression)
-        elif text == "e": self.expression = str(math.e); self.result_var.set(self.expression)
-        else: 
-            if self.result_var.get().startswith("Mode:"): self.expression = ""; self.result_var.set("0")
-            if not text.isdigit() and not text == ".": 
-                if not self.expression and text in ["*", "/", "+", "%"]: return
-                if self.expression and self.expression[-1] in ["+", "-", "*", "/", ".", "**"]: 
-                    if text == self.expression[-1] and text == "*": pass 
-                    elif text in ["+", "-", "*", "/","."]: return 
-            self.expression += text
-            self.result_var.set(self.expression)
-
-    def apply_math_func(self, func, is_trig=False, domain_check=None, overflow_check=None):
+        if not self.unit_catalog or category not in self.unit_catalog: return
+        picker["values"] = [unit.label for unit in self.unit_catalog[category].search(text, Calculator.UNIT_PICKER_MAX_MATCHES)]
+
+    def toggle_uc_batch_window(self):
+        # Converts a pasted column with the Units window's category and units; files go through unit_batch's CLI
+        if self.uc_batch_window is None or not self.uc_batch_window.winfo_exists():
+            self.uc_batch_window = tk.Toplevel(self.unit_conversion_window or self.root)
+            self.uc_batch_window.title("Batch Conversion"); self.uc_batch_window.geometry("300x360")
+            batch_frame = ttk.Frame(self.uc_batch_window, padding=10, style="TFrame")
+            batch_frame.pack(fill=tk.BOTH, expand=True)
+            batch_frame.grid_columnconfigure(0, weight=1); batch_frame.grid_columnconfigure(1, weight=1)
+            batch_frame.grid_rowconfigure(1, weight=1)
+            ttk.Label(batch_frame, text="Values (one per line):").grid(row=0, column=0, padx=5, pady=5, sticky="w")
+            ttk.Label(batch_frame, text="Results:").grid(row=0, column=1, padx=5, pady=5, sticky="w")
+            self.uc_batch_input = tk.Text(batch_frame, width=14, height=15, undo=True)
+            self.uc_batch_input.grid(row=1, column=0, padx=5, pady=5, sticky="nsew")
+            self.uc_batch_output = tk.Text(batch_frame, width=14, height=15, state=tk.DISABLED)
+            self.uc_batch_output.grid(row=1, column=1, padx=5, pady=5, sticky="nsew")
+            ttk.Button(batch_frame, text="Convert All", command=self.perform_batch_conversion, style="Spec.TButton").grid(
+                row=2, column=0, columnspan=2, padx=5, pady=5, sticky="ew")
+            self.uc_batch_window.protocol("WM_DELETE_WINDOW", self.on_close_uc_batch_window)
+            self.theme_uc_batch_window()
+        else: self.on_close_uc_batch_window()
+
+    def on_close_uc_batch_window(self):
+        if self.uc_batch_window and self.uc_batch_window.winfo_exists(): self.uc_batch_window.destroy()
+        self.uc_batch_window = None; self.uc_batch_input = None; self.uc_batch_output = None
+
+    def perform_batch_conversion(self):
+        if not self.uc_batch_output: return
+        self.uc_batch_output.config(state=tk.NORMAL); self.uc_batch_output.delete("1.0", tk.END)
+        import unit_batch # Only the batch window needs it
+        lines = self.uc_batch_input.get("1.0", "end-1c").splitlines() # Without the newline Tk adds at the end
         try:
-            value = eval(self.expression)
-            if domain_check and not domain_check(value): self.result_var.set("Error"); self.expression = ""; return
-            if overflow_check and overflow_check(value): self.result_var.set("Error"); self.expression = ""; return
-            if is_trig and self.degree_mode: value = math.radians(value)
-            result = func(value)
-            self.expression = str(result); self.result_var.set(self.expression)
-        except Exception: self.result_var.set("Error"); self.expression = ""
-            
-    def apply_tan(self):
-        try:
-            value = eval(self.expression)
-            angle_rad = math.radians(value) if self.degree_mode else value
-            if abs(math.cos(angle_rad)) < 1e-12: self.result_var.set("Error"); self.expression = ""
-            else:
-                result = math.tan(angle_rad)
-                self.expression = str(result); self.result_var.set(self.expression)
-        except Exception: self.result_var.set("Error"); self.expression = ""
-
-    def apply_power(self, power):
+            for chunk in unit_batch.convert_stream(lines, self.uc_category_var.get(), self.uc_from_unit_var.get(), self.uc_to_unit_var.get(),
+                                                   invalid="Invalid", catalog=self.load_unit_catalog()):
+                self.uc_batch_output.insert(tk.END, "\n".join(chunk) + "\n") # One insert per chunk, not per value
+        except KeyError: self.uc_batch_output.delete("1.0", tk.END); self.uc_batch_output.insert(tk.END, "Unknown unit")
+        self.uc_batch_output.config(state=tk.DISABLED)
+
+    def toggle_plot_window(self):
+        # f(x) over a range, as a virtual table or a Canvas plot that pans (drag) and zooms (mouse wheel)
+        if self.plot_window is not None and self.plot_window.winfo_exists(): self.on_close_plot_window(); return
+        if self.plot_expression_var is None:
+            self.plot_expression_var = tk.StringVar(self.root, "sin(x)"); self.plot_mode_var = tk.StringVar(self.root, "Plot")
+            self.plot_start_var = tk.StringVar(self.root, "-10"); self.plot_stop_var = tk.StringVar(self.root, "10")
+            self.plot_step_var = tk.StringVar(self.root, "0.5"); self.plot_status_var = tk.StringVar(self.root, "")
+        self.plot_window = tk.Toplevel(self.root)
+        self.plot_window.title("Table / Plot"); self.plot_window.geometry("460x480"); self.plot_window.transient(self.root)
+        self.plot_window.grid_columnconfigure(0, weight=1); self.plot_window.grid_rowconfigure(1, weight=1)
+        controls = ttk.Frame(self.plot_window, padding=5, style="TFrame")
+        controls.grid(row=0, column=0, sticky="ew")
+        for column in (1, 3, 5): controls.grid_columnconfigure(column, weight=1)
+        ttk.Label(controls, text="f(x) =", style="UC.TLabel").grid(row=0, column=0, padx=2, pady=2, sticky="w")
+        ttk.Entry(controls, textvariable=self.plot_expression_var, style="UC.TEntry").grid(row=0, column=1, columnspan=5, padx=2, pady=2, sticky="ew")
+        for index, (label, variable) in enumerate((("From", self.plot_start_var), ("To", self.plot_stop_var), ("Step", self.plot_step_var))):
+            ttk.Label(controls, text=label, style="UC.TLabel").grid(row=1, column=2 * index, padx=2, pady=2, sticky="w")
+            ttk.Entry(controls, textvariable=variable, width=7, style="UC.TEntry").grid(row=1, column=2 * index + 1, padx=2, pady=2, sticky="ew")
+        for index, mode in enumerate(("Table", "Plot")):
+            ttk.Radiobutton(controls, text=mode, value=mode, variable=self.plot_mode_var, command=self.update_plot).grid(row=2, column=index, padx=2, pady=2, sticky="w")
+        ttk.Button(controls, text="Go", command=self.update_plot, style="Spec.TButton").grid(row=2, column=5, padx=2, pady=2, sticky="ew")
+        self.plot_body = ttk.Frame(self.plot_window, style="TFrame")
+        self.plot_body.grid(row=1, column=0, sticky="nsew", padx=5)
+        self.plot_body.grid_columnconfigure(0, weight=1); self.plot_body.grid_rowconfigure(0, weight=1)
+        self.plot_canvas = tk.Canvas(self.plot_body, highlightthickness=0)
+        for tag in ("grid_x", "grid_y"): self.plot_canvas.create_line(0, 0, 0, 0, tags=("axis", tag))
+        self.plot_canvas.create_text(4, 4, anchor="nw", tags=("label", "range_label"))
+        self.plot_canvas.bind("<ButtonPress-1>", self.on_plot_press); self.plot_canvas.bind("<B1-Motion>", self.on_plot_drag)
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"): self.plot_canvas.bind(sequence, self.on_plot_wheel)
+        self.plot_canvas.bind("<Configure>", lambda event: self.schedule_plot_redraw())
+        ttk.Label(self.plot_window, textvariable=self.plot_status_var, style="UC.TLabel").grid(row=2, column=0, padx=5, pady=2, sticky="w")
+        self.plot_window.bind("<Return>", lambda event: self.update_plot())
+        self.plot_window.protocol("WM_DELETE_WINDOW", self.on_close_plot_window)
+        self.theme_plot_window(); self.update_plot()
+
+    def on_close_plot_window(self):
+        if self._plot_redraw_job is not None: self.root.after_cancel(self._plot_redraw_job); self._plot_redraw_job = None
+        if self.plot_window and self.plot_window.winfo_exists(): self.plot_window.destroy()
+        self.plot_window = None; self.plot_canvas = None; self.plot_table = None; self.plot_body = None; self.plot_lines = []
+
+    def update_plot(self):
+        """Re-read the expression and range and show them as a table or a plot, in the current angle mode."""
+        from calc_plot import FunctionOfX, TableSource, Viewport, linspace, y_range
         try:
-            value = eval(self.expression)
-            result = value ** power
-            self.expression = str(result); self.result_var.set(self.expression)
-        except Exception: self.result_var.set("Error"); self.expression = ""
+            function = FunctionOfX("".join(self.plot_expression_var.get().split()).translate(PASTE_SYMBOLS), self.degree_mode)
+            start, stop = float(self.plot_start_var.get()), float(self.plot_stop_var.get())
+            if not start < stop: raise ValueError("empty range")
+            function.check_range(start, stop) # Before sampling: refuse results past calc_cost.MAX_RESULT_BITS as the keypad does
+            source = TableSource(function, start, stop, float(self.plot_step_var.get())) if self.plot_mode_var.get() == "Table" else None
+            y_low, y_high = y_range(function(linspace(start, stop, 256))) if source is None else (None, None)
+        except (SyntaxError, NameError, ValueError) as e:
+            self.plot_status_var.set(f"Error: {e}"); return
+        except OverflowError:
+            self.plot_status_var.set("Overflow"); return
+        except Exception: # E.g. RecursionError from deeply nested parentheses; as the keypad shows it
+            self.plot_status_var.set("Error"); return
+        self.plot_function = function
+        if self.plot_table: self.plot_table.frame.destroy(); self.plot_table = None
+        if source is not None:
+            self.plot_canvas.grid_remove()
+            self.plot_table = VirtualHistoryList(self.plot_body, source.count, source.fetch)
+            self.plot_table.listbox.config(font=("Courier", 10))
+            self.plot_table.frame.grid(row=0, column=0, sticky="nsew"); self.plot_table.scroll_to(0)
+            self.theme_plot_window({"listbox": self._applied_theme.widgets["listbox"]})
+            self.plot_status_var.set(f"{source.count():,} rows ({'degrees' if self.degree_mode else 'radians'})")
+            return
+        self.plot_canvas.grid(row=0, column=0, sticky="nsew")
+        self.plot_viewport = Viewport(start, stop, y_low, y_high, self.plot_canvas.winfo_width(), self.plot_canvas.winfo_height())
+        self.draw_plot()
+
+    def schedule_plot_redraw(self):
+        # Drag and wheel events arrive faster than frames; redraw once per idle cycle
+        if self._plot_redraw_job is None and self.plot_viewport is not None: self._plot_redraw_job = self.root.after_idle(self.draw_plot)
+
+    def draw_plot(self):
+        from calc_plot import adaptive_samples, polylines
+        self._plot_redraw_job = None
+        canvas = self.plot_canvas; viewport = self.plot_viewport
+        if canvas is None or viewport is None or self.plot_mode_var.get() != "Plot": return
+        viewport.width = max(1, canvas.winfo_width()); viewport.height = max(1, canvas.winfo_height())
+        budget = min(Calculator.PLOT_POINT_BUDGET, Calculator.PLOT_POINTS_PER_PIXEL * viewport.width)
+        tolerance = (viewport.y_max - viewport.y_min) / viewport.height / 2 # Half a pixel
+        xs, ys = adaptive_samples(self.plot_function, viewport.x_min, viewport.x_max, budget, tolerance)
+        lines = polylines(xs, ys, viewport)
+        origin_x, origin_y = viewport.to_canvas(0.0, 0.0)
+        canvas.coords("grid_x", 0, origin_y, viewport.width, origin_y); canvas.coords("grid_y", origin_x, 0, origin_x, viewport.height)
+        curve_color = self._applied_theme.widgets["plot"]["curve"]
+        while len(self.plot_lines) < len(lines): self.plot_lines.append(canvas.create_line(0, 0, 0, 0, width=2, fill=curve_color, tags="curve"))
+        for item, coords in zip(self.plot_lines, lines): canvas.coords(item, *coords); canvas.itemconfig(item, state=tk.NORMAL)
+        for item in self.plot_lines[len(lines):]: canvas.itemconfig(item, state=tk.HIDDEN)
+        canvas.itemconfig("range_label", text=f"x {viewport.x_min:.4g} … {viewport.x_max:.4g}   y {viewport.y_min:.4g} … {viewport.y_max:.4g}")
+        self.plot_status_var.set(f"{len(xs):,} points ({'degrees' if self.degree_mode else 'radians'})")
+
+    def on_plot_press(self, event):
+        self._plot_drag = (event.x, event.y)
+
+    def on_plot_drag(self, event):
+        if self._plot_drag is None or self.plot_viewport is None: return
+        self.plot_viewport.pan(event.x - self._plot_drag[0], event.y - self._plot_drag[1])
+        self._plot_drag = (event.x, event.y); self.schedule_plot_redraw()
+
+    def on_plot_wheel(self, event):
+        if self.plot_viewport is None: return "break"
+        zoom_in = getattr(event, "num", None) == 4 or getattr(event, "delta", 0) > 0
+        self.plot_viewport.zoom(1 / Calculator.PLOT_ZOOM_STEP if zoom_in else Calculator.PLOT_ZOOM_STEP, event.x, event.y)
+        self.schedule_plot_redraw()
+        return "break"
+
+    def toggle_definitions_window(self):
+        # "r = 3" and "area(r) = π*r^2" define; anything else is evaluated with the definitions
+        if self.definitions_window is not None and self.definitions_window.winfo_exists(): self.on_close_definitions_window(); return
+        if self.definitions_entry_var is None:
+            self.definitions_entry_var = tk.StringVar(self.root, ""); self.definitions_status_var = tk.StringVar(self.root, "")
+        self.definitions_window = tk.Toplevel(self.root)
+        self.definitions_window.title("Variables & Functions"); self.definitions_window.geometry("320x380"); self.definitions_window.transient(self.root)
+        frame = ttk.Frame(self.definitions_window, padding=5, style="TFrame")
+        frame.pack(fill=tk.BOTH, expand=True)
+        frame.grid_columnconfigure(0, weight=1); frame.grid_columnconfigure(1, weight=1); frame.grid_rowconfigure(2, weight=1)
+        entry = ttk.Entry(frame, textvariable=self.definitions_entry_var, style="UC.TEntry")
+        entry.grid(row=0, column=0, columnspan=2, padx=2, pady=2, sticky="ew")
+        entry.bind("<Return>", lambda event: self.submit_definition()); entry.focus_set()
+        ttk.Label(frame, textvariable=self.definitions_status_var, style="UC.TLabel").grid(row=1, column=0, columnspan=2, padx=2, pady=2, sticky="w")
+        list_frame = ttk.Frame(frame, style="TFrame")
+        list_frame.grid(row=2, column=0, columnspan=2, sticky="nsew")
+        scrollbar = ttk.Scrollbar(list_frame, orient=tk.VERTICAL)
+        self.definitions_listbox = tk.Listbox(list_frame, yscrollcommand=scrollbar.set, font=("Courier", 10), exportselection=False)
+        scrollbar.config(command=self.definitions_listbox.yview)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y); self.definitions_listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.definitions_listbox.bind("<Double-Button-1>", lambda event: self.use_selected_definition())
+        ttk.Button(frame, text="Use", command=self.use_selected_definition, style="Spec.TButton").grid(row=3, column=0, padx=2, pady=2, sticky="ew")
+        ttk.Button(frame, text="Delete", command=self.delete_selected_definition, style="Spec.TButton").grid(row=3, column=1, padx=2, pady=2, sticky="ew")
+        self.definitions_window.protocol("WM_DELETE_WINDOW", self.on_close_definitions_window)
+        self.theme_definitions_window(); self.refresh_definitions_list()
+
+    def on_close_definitions_window(self):
+        if self.definitions_window and self.definitions_window.winfo_exists(): self.definitions_window.destroy()
+        self.definitions_window = None; self.definitions_listbox = None; self._definition_names = []
+
+    def refresh_definitions_list(self):
+        if not self.definitions_listbox: return
+        rows = self.definition_rows()
+        self._definition_names = [name for name, _ in rows]
+        self.definitions_listbox.delete(0, tk.END)
+        if rows: self.definitions_listbox.insert(tk.END, *(text for _, text in rows)) # One call, however many definitions
+
+    def submit_definition(self):
+        self.definitions_status_var.set(self.enter_definition(self.definitions_entry_var.get()))
+        if not self.definitions_status_var.get().startswith("Error"): self.definitions_entry_var.set("")
+        self.refresh_definitions_list()
+
+    def _selected_definition(self):
+        selection = self.definitions_listbox.curselection() if self.definitions_listbox else ()
+        return self._definition_names[selection[0]] if selection else None
+
+    def use_selected_definition(self):
+        name = self._selected_definition()
+        if name is not None: self.use_definition(name)
+
+    def delete_selected_definition(self):
+        name = self._selected_definition()
+        if name is None: return
+        self.definitions_status_var.set(self.remove_definition(name) or f"Deleted {name}")
+        self.refresh_definitions_list()
+
+    def instrument(self, instrumentation):
+        """Time INSTRUMENTED_METHODS into ``instrumentation`` from now on; F12 shows the statistics."""
+        super().instrument(instrumentation)
+        self.root.bind('<F12>', lambda event: self.toggle_stats_window())
+
+    def toggle_stats_window(self):
+        if self.instrumentation is None: return
+        if self.stats_window is None or not self.stats_window.winfo_exists():
+            self.stats_window = tk.Toplevel(self.root)
+            self.stats_window.title("Performance Statistics"); self.stats_window.transient(self.root)
+            self.stats_text = tk.Text(self.stats_window, width=76, height=24, font=("Courier", 10), wrap=tk.NONE)
+            self.stats_text.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+            self.stats_window.protocol("WM_DELETE_WINDOW", self.toggle_stats_window)
+            self.theme_stats_window()
+            self.refresh_stats_window()
+        else:
+            self.stats_window.destroy(); self.stats_window = None; self.stats_text = None
 
-    def calculate(self):
-        try:
-            if "Error" in self.expression: self.result_var.set("Error"); self.expression = ""; return
-            if self.expression.endswith("**") or self.expression.endswith(("+", "-", "*", "/")): self.result_var.set("Error"); return
-            original_expression = self.expression 
-            result = str(eval(self.expression))
-            history_entry = f"{original_expression}={result}"
-            self.history.append(history_entry)
-            self.update_history_display() 
-            self.save_settings() 
-            self.result_var.set(result); self.expression = result
-        except ZeroDivisionError: self.result_var.set("Error"); self.expression = ""
-        except (SyntaxError, NameError, TypeError): self.result_var.set("Error"); self.expression = ""
-        except Exception: self.result_var.set("Error"); self.expression = ""
-
-    def delete(self):
-        if self.expression:
-            self.expression = self.expression[:-1]
-            self.result_var.set(self.expression if self.expression else "0")
-        elif self.result_var.get() not in ["0", "Error"] and not self.result_var.get().startswith("Mode:"):
-            self.expression = ""; self.result_var.set("0")
-
-    def clear(self):
-        self.expression = ""; self.result_var.set("0")
+    def refresh_stats_window(self):
+        if not (self.stats_window and self.stats_window.winfo_exists()): return
+        self.stats_text.config(state=tk.NORMAL); self.stats_text.delete("1.0", tk.END)
+        self.stats_text.insert(tk.END, self.instrumentation.format()); self.stats_text.config(state=tk.DISABLED)
+        self.root.after(Calculator.STATS_REFRESH_MS, self.refresh_stats_window)
 
 if __name__ == "__main__":
+    import argparse
+    import os
+    parser = argparse.ArgumentParser(description="Tkinter calculator")
+    parser.add_argument("--record", metavar="FILE", help="record button, key and paste input to a macro file (see macro.py)")
+    parser.add_argument("--instrument", metavar="FILE", nargs="?", const="",
+                        help="time the hot paths (F12 shows them) and write the statistics to FILE as JSON on exit; also CALC_INSTRUMENT=1 or =FILE")
+    args = parser.parse_args()
+    instrumentation = None
+    if args.instrument is not None:
+        from instrumentation import Instrumentation
+        instrumentation = Instrumentation(args.instrument or None)
+    elif os.environ.get("CALC_INSTRUMENT"):
+        from instrumentation import from_environment
+        instrumentation = from_environment()
     root = tk.Tk()
     app = Calculator(root)
+    if instrumentation is not None: app.instrument(instrumentation)
+    if args.record:
+        from macro import MacroRecorder
+        recorder = MacroRecorder(); recorder.attach(app)
     root.mainloop()
+    if args.record: recorder.save(args.record)
+    if instrumentation is not None: print(f"Statistics written to {instrumentation.dump()}")
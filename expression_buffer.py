@@ -0,0 +1,97 @@
+"""The calculator's input line as a list of tokens.
+
+Each keypad entry is one piece: a digit or ".", an operator ("**" is a single
+piece), a parenthesis or a name. Appending and deleting the last piece are
+amortised O(1) list operations, the last piece and its kind are available in
+constant time for input validation, and the display text is rendered
+incrementally: a read joins only the pieces added since the previous read
+onto the cached text (after trimming any that were deleted).
+"""
+import re
+
+# Longest first, so "**" and whole names stay single pieces
+_PIECE_RE = re.compile(r"\*\*|[A-Za-z_][A-Za-z_0-9]*|.", re.DOTALL)
+
+OPERATORS = ("+", "-", "*", "/", "**")
+
+def piece_kind(piece):
+    """"num" (digit or "."), "op", "lparen", "rparen", "name" or "other"."""
+    if piece.isdigit() or piece == ".": return "num"
+    if piece in OPERATORS: return "op"
+    if piece == "(": return "lparen"
+    if piece == ")": return "rparen"
+    if piece[0].isalpha() or piece[0] == "_" or piece in ("π", "√"): return "name"
+    return "other"
+
+class ExpressionBuffer:
+    __slots__ = ("_pieces", "_length", "_text", "_rendered", "_rendered_length", "_stable")
+
+    def __init__(self, text=""):
+        self._pieces = []; self._length = 0
+        self._text = ""; self._rendered = 0; self._rendered_length = 0 # _text starts with the first _rendered pieces
+        self._stable = 0 # Leading pieces untouched since the last unchanged_prefix() call
+        if text: self.extend(text)
+
+    def append(self, piece):
+        self._pieces.append(piece); self._length += len(piece)
+
+    def extend(self, text):
+        """Append ``text`` split into pieces (e.g. a result or a pasted expression)."""
+        self._pieces.extend(_PIECE_RE.findall(text)); self._length += len(text)
+
+    def pop(self):
+        """Remove and return the last piece ("" when empty)."""
+        if not self._pieces: return ""
+        piece = self._pieces.pop(); self._length -= len(piece)
+        if self._stable > len(self._pieces): self._stable = len(self._pieces)
+        if self._rendered > len(self._pieces): # Trimmed from _text on the next read
+            self._rendered -= 1; self._rendered_length -= len(piece)
+        return piece
+
+    def clear(self):
+        self._pieces.clear(); self._length = 0; self._text = ""; self._rendered = 0; self._rendered_length = 0; self._stable = 0
+
+    def set(self, text):
+        self.clear(); self.extend(text)
+
+    def pieces(self, start=0):
+        return self._pieces[start:]
+
+    def unchanged_prefix(self):
+        """How many leading pieces are unchanged since the previous call, for an incremental consumer (see live_preview)."""
+        stable, self._stable = self._stable, len(self._pieces)
+        return stable
+
+    @property
+    def last(self):
+        return self._pieces[-1] if self._pieces else ""
+
+    @property
+    def last_kind(self):
+        return piece_kind(self._pieces[-1]) if self._pieces else None
+
+    @property
+    def text(self):
+        text, self._text = self._text, "" # Held only locally, so CPython can grow it in place
+        if len(text) != self._rendered_length: text = text[:self._rendered_length]
+        if self._rendered < len(self._pieces):
+            pieces = self._pieces
+            text += pieces[-1] if self._rendered == len(pieces) - 1 else "".join(pieces[self._rendered:])
+            self._rendered = len(pieces); self._rendered_length = self._length
+        self._text = text
+        return text
+
+    def __len__(self):
+        return self._length # Characters, without rendering
+
+    def __bool__(self):
+        return bool(self._pieces)
+
+    def __iter__(self):
+        return iter(self._pieces)
+
+    def __str__(self):
+        return self.text
+
+    def __repr__(self):
+        return f"ExpressionBuffer({self.text!r})"
@@ -0,0 +1,53 @@
+"""Query parsing and lookup for the History window's filter box.
+
+    2+3                  expressions containing "2+3" (trigram index)
+    =42                  result exactly 42
+    =10..20              result between 10 and 20
+    2026-10-18           calculations made on that day
+    2026-10-01..2026-10-18   calculations made in that date range
+
+Every form maps to an indexed HistoryStore lookup that returns the ids of the
+newest ``limit`` matches.
+"""
+import datetime
+import re
+import time
+
+MAX_MATCHES = 10000 # Newest matches kept for the filtered view
+SHORT_TEXT_MAX_MATCHES = 1000 # One- and two-character text is below trigram size and needs a scan
+
+_NUMBER = r"[-+]?(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][-+]?\d+)?"
+_VALUE_RE = re.compile(rf"^=\s*({_NUMBER})(?:\s*\.\.\s*({_NUMBER}))?$")
+_DATE = r"\d{4}-\d{2}-\d{2}"
+_DATE_RE = re.compile(rf"^({_DATE})(?:\s*\.\.\s*({_DATE}))?$")
+
+def _day_start(text):
+    day = datetime.datetime.strptime(text, "%Y-%m-%d")
+    return time.mktime(day.timetuple())
+
+def parse_query(text):
+    """Return ``("text", s)``, ``("value", low, high)``, ``("time", start_ts, end_ts)`` or None for no filter."""
+    text = text.strip()
+    if not text: return None
+    match = _VALUE_RE.match(text)
+    if match:
+        low = float(match.group(1)); high = float(match.group(2)) if match.group(2) else low
+        return ("value", min(low, high), max(low, high))
+    match = _DATE_RE.match(text)
+    if match:
+        try:
+            start = _day_start(match.group(1)); last = _day_start(match.group(2) or match.group(1))
+            return ("time", min(start, last), max(start, last) + 86400)
+        except ValueError: pass # Not a real date (e.g. 2026-13-40); search for the text instead
+    return ("text", text)
+
+def search(store, text, limit=MAX_MATCHES):
+    """Ids of matching rows in append order (oldest first), or None when ``text`` is not a filter."""
+    query = parse_query(text)
+    if query is None: return None
+    if query[0] == "value": ids = store.ids_with_value(query[1], query[2], limit)
+    elif query[0] == "time": ids = store.ids_between(query[1], query[2], limit)
+    elif len(query[1]) < 3: ids = store.ids_containing(query[1], min(limit, SHORT_TEXT_MAX_MATCHES))
+    else: ids = store.ids_containing(query[1], limit)
+    ids.reverse()
+    return ids
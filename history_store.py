@@ -0,0 +1,199 @@
+"""Append-only calculation history in a stdlib sqlite3 file.
+
+Every calculation is one INSERT, so appends stay O(1) however long the
+history grows and nothing is ever re-serialised. Timestamps, expressions and
+numeric results are indexed for range, prefix and value lookups. Retention
+deletes the oldest rows; deleted pages are reclaimed incrementally.
+
+In memory an entry is a ``HistoryRecord``. On disk the result is kept as its
+exact ``str()`` text (lossless for big integers) next to a REAL copy for the
+value index, plus the angle mode it was computed in.
+"""
+import math
+import sqlite3
+import time
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    expression TEXT NOT NULL,
+    result TEXT NOT NULL,
+    value REAL,
+    degree_mode INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS history_ts ON history (ts);
+CREATE INDEX IF NOT EXISTS history_expression ON history (expression);
+CREATE INDEX IF NOT EXISTS history_value ON history (value);
+"""
+
+# Version 2: trigram full-text index over expressions for substring search
+_SEARCH_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS history_fts USING fts5(expression, content='history', content_rowid='id', tokenize='trigram');
+CREATE TRIGGER IF NOT EXISTS history_fts_insert AFTER INSERT ON history BEGIN
+    INSERT INTO history_fts (rowid, expression) VALUES (new.id, new.expression);
+END;
+CREATE TRIGGER IF NOT EXISTS history_fts_delete AFTER DELETE ON history BEGIN
+    INSERT INTO history_fts (history_fts, rowid, expression) VALUES ('delete', old.id, old.expression);
+END;
+"""
+
+_RECORD_COLUMNS = "expression, result, degree_mode, ts" # HistoryRecord.from_row order
+
+def _numeric(result):
+    try: value = float(result)
+    except (TypeError, ValueError, OverflowError): return None
+    return value if math.isfinite(value) else None
+
+def decode_result(text):
+    """Number stored as ``text`` (int, float or complex), or None for "Error"."""
+    for kind in (int, float, complex):
+        try: return kind(text)
+        except (TypeError, ValueError): pass
+    return None
+
+class HistoryRecord:
+    """One calculation. ``str()`` gives the "expression=result" display form."""
+    __slots__ = ("expression", "value", "degree_mode", "timestamp")
+
+    def __init__(self, expression, value, degree_mode=False, timestamp=None):
+        self.expression = expression; self.value = value
+        self.degree_mode = degree_mode; self.timestamp = timestamp
+
+    @classmethod
+    def from_row(cls, row):
+        expression, result, degree_mode, ts = row
+        return cls(expression, decode_result(result), bool(degree_mode), ts)
+
+    @property
+    def result(self):
+        return "Error" if self.value is None else str(self.value)
+
+    def __str__(self):
+        return f"{self.expression}={self.result}"
+
+    def __repr__(self):
+        return f"HistoryRecord({self.expression!r}, {self.value!r}, degree_mode={self.degree_mode}, timestamp={self.timestamp})"
+
+class HistoryStore:
+    SCHEMA_VERSION = 3
+    RETENTION_CHECK_INTERVAL = 1000 # Appends between retention passes
+    COMPACT_FREE_PAGES = 1024 # Free pages tolerated before reclaiming them
+
+    def __init__(self, path, max_entries=None, max_age_days=None, retain_on_open=True):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA auto_vacuum = INCREMENTAL") # Only takes effect on a new file
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA synchronous = NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._migrate(self._conn.execute("PRAGMA user_version").fetchone()[0])
+        self._appends_since_retention = 0
+        self.writes = 0; self.bytes_written = 0 # Committed transactions and expression/result text bytes stored
+        if retain_on_open: self.apply_retention() # Otherwise the caller runs it when convenient
+
+    def _migrate(self, version):
+        # Version 3: angle mode per entry
+        if "degree_mode" not in {row[1] for row in self._conn.execute("PRAGMA table_info(history)")}:
+            self._conn.execute("ALTER TABLE history ADD COLUMN degree_mode INTEGER NOT NULL DEFAULT 0")
+        self.has_text_index = True
+        try:
+            self._conn.executescript(_SEARCH_SCHEMA)
+            if 0 < version < 2: self._conn.execute("INSERT INTO history_fts (history_fts) VALUES ('rebuild')")
+        except sqlite3.OperationalError: # SQLite built without FTS5; substring search falls back to scanning
+            self.has_text_index = False
+        if version < HistoryStore.SCHEMA_VERSION: self._conn.execute(f"PRAGMA user_version = {HistoryStore.SCHEMA_VERSION}")
+        self._conn.commit()
+
+    def append(self, expression, result, timestamp=None, degree_mode=False):
+        ts = time.time() if timestamp is None else timestamp
+        cursor = self._conn.execute("INSERT INTO history (ts, expression, result, value, degree_mode) VALUES (?, ?, ?, ?, ?)",
+                                    (ts, expression, result, _numeric(result), int(degree_mode)))
+        self._conn.commit()
+        self.writes += 1; self.bytes_written += len(expression.encode()) + len(result.encode())
+        self._appends_since_retention += 1
+        if self._appends_since_retention >= HistoryStore.RETENTION_CHECK_INTERVAL: self.apply_retention()
+        return cursor.lastrowid
+
+    def add(self, record):
+        if record.timestamp is None: record.timestamp = time.time()
+        return self.append(record.expression, record.result, record.timestamp, record.degree_mode)
+
+    def extend(self, entries):
+        """Bulk-append ``(expression, result, timestamp[, degree_mode])`` tuples in one transaction."""
+        rows = [(ts, expression, result, _numeric(result), int(bool(mode and mode[0]))) for expression, result, ts, *mode in entries]
+        self._conn.executemany("INSERT INTO history (ts, expression, result, value, degree_mode) VALUES (?, ?, ?, ?, ?)", rows)
+        self._conn.commit()
+        self.writes += 1; self.bytes_written += sum(len(row[1].encode()) + len(row[2].encode()) for row in rows)
+        self._appends_since_retention += len(rows)
+        if self._appends_since_retention >= HistoryStore.RETENTION_CHECK_INTERVAL: self.apply_retention()
+
+    def count(self):
+        return self._conn.execute("SELECT COUNT(*) FROM history").fetchone()[0]
+
+    def span(self):
+        """``(first_id, last_id)`` in O(log n); ``(None, None)`` when empty."""
+        return self._conn.execute("SELECT MIN(id), MAX(id) FROM history").fetchone()
+
+    def position_count(self):
+        # Rows are only ever removed from the old end, so ids are contiguous and the id span
+        # gives the row count without the full scan COUNT(*) needs
+        first, last = self.span()
+        return 0 if first is None else last - first + 1
+
+    def tail_records(self, n):
+        """The newest ``n`` entries, oldest first."""
+        rows = self._conn.execute(f"SELECT {_RECORD_COLUMNS} FROM history ORDER BY id DESC LIMIT ?", (n,)).fetchall()
+        return [HistoryRecord.from_row(row) for row in reversed(rows)]
+
+    def page_records(self, offset, limit):
+        """Entries ``offset .. offset+limit`` in append order, found through the primary key."""
+        first = self.span()[0]
+        if first is None: return []
+        return [HistoryRecord.from_row(row) for row in self._conn.execute(
+            f"SELECT {_RECORD_COLUMNS} FROM history WHERE id >= ? ORDER BY id LIMIT ?", (first + offset, limit))]
+
+    def ids_containing(self, text, limit=-1):
+        """Ids of the newest rows whose expression contains ``text``, newest first."""
+        if self.has_text_index and len(text) >= 3: # Trigrams need at least three characters
+            phrase = '"' + text.replace('"', '""') + '"'
+            return [row[0] for row in self._conn.execute("SELECT rowid FROM history_fts WHERE history_fts MATCH ? ORDER BY rowid DESC LIMIT ?", (phrase, limit))]
+        pattern = "%" + text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        return [row[0] for row in self._conn.execute("SELECT id FROM history WHERE expression LIKE ? ESCAPE '\\' ORDER BY id DESC LIMIT ?", (pattern, limit))]
+
+    def ids_with_value(self, low, high, limit=-1):
+        return [row[0] for row in self._conn.execute("SELECT id FROM history WHERE value >= ? AND value <= ? ORDER BY id DESC LIMIT ?", (low, high, limit))]
+
+    def ids_between(self, start_ts, end_ts, limit=-1):
+        return [row[0] for row in self._conn.execute("SELECT id FROM history WHERE ts >= ? AND ts < ? ORDER BY ts DESC LIMIT ?", (start_ts, end_ts, limit))]
+
+    def records_by_ids(self, ids):
+        if not ids: return []
+        by_id = {row[0]: HistoryRecord.from_row(row[1:]) for row in self._conn.execute(
+            f"SELECT id, {_RECORD_COLUMNS} FROM history WHERE id IN ({','.join('?' * len(ids))})", list(ids))}
+        return [by_id[i] for i in ids if i in by_id]
+
+    def apply_retention(self, now=None):
+        """Drop rows older than ``max_age_days`` or beyond the newest ``max_entries``; returns rows removed."""
+        self._appends_since_retention = 0
+        removed = 0
+        if self.max_age_days is not None:
+            cutoff = (time.time() if now is None else now) - self.max_age_days * 86400
+            # Everything up to the newest expired row goes, keeping ids contiguous for page_records()
+            removed += self._conn.execute("DELETE FROM history WHERE id <= (SELECT MAX(id) FROM history WHERE ts < ?)", (cutoff,)).rowcount
+        if self.max_entries is not None:
+            removed += self._conn.execute("DELETE FROM history WHERE id <= (SELECT id FROM history ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                                          (self.max_entries,)).rowcount
+        self._conn.commit()
+        if removed: self.compact()
+        return removed
+
+    def compact(self, force=False):
+        free_pages = self._conn.execute("PRAGMA freelist_count").fetchone()[0]
+        if force or free_pages > HistoryStore.COMPACT_FREE_PAGES:
+            self._conn.execute("PRAGMA incremental_vacuum"); self._conn.commit()
+
+    def close(self):
+        if self._conn is not None: self._conn.close(); self._conn = None
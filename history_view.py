@@ -0,0 +1,81 @@
+"""Virtualized list for the History window.
+
+Only the rows that fit in the window exist as Listbox items. Scrolling
+fetches the matching page from a data source (``count()`` and
+``fetch(offset, limit)``; rows are shown with ``str()`` and the fetched
+objects are kept for ``item_at()``), and ``append()`` slides the window by one row
+instead of rebuilding it, so opening and updating cost the same at 10 or
+500,000 entries.
+"""
+import tkinter as tk
+from tkinter import ttk
+import tkinter.font as tkfont
+
+class VirtualHistoryList:
+    def __init__(self, master, count, fetch, rows=12):
+        self._count = count; self._fetch = fetch
+        self.frame = ttk.Frame(master)
+        self.frame.grid_rowconfigure(0, weight=1); self.frame.grid_columnconfigure(0, weight=1)
+        self.listbox = tk.Listbox(self.frame, height=rows, activestyle="none")
+        self.listbox.grid(row=0, column=0, sticky="nsew")
+        self.scrollbar = ttk.Scrollbar(self.frame, orient=tk.VERTICAL, command=self.on_scrollbar)
+        self.scrollbar.grid(row=0, column=1, sticky="ns")
+        self.rows = rows
+        self.items = []
+        self.total = count()
+        self.first = max(0, self.total - rows) # Opens on the newest entries
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"): self.listbox.bind(sequence, self.on_mousewheel)
+        self.listbox.bind("<Configure>", self.on_configure)
+        self.refresh()
+
+    @property
+    def following_tail(self):
+        return self.first + self.rows >= self.total
+
+    def item_at(self, listbox_index):
+        """The fetched object behind a visible Listbox row, or None."""
+        return self.items[listbox_index] if 0 <= listbox_index < len(self.items) else None
+
+    def refresh(self):
+        self.listbox.delete(0, tk.END)
+        self.items = list(self._fetch(self.first, self.rows))
+        if self.items: self.listbox.insert(tk.END, *map(str, self.items))
+        self._update_scrollbar()
+
+    def reload(self):
+        # The data source changed wholesale (e.g. a new filter)
+        self.total = self._count(); self.first = max(0, self.total - self.rows); self.refresh()
+
+    def scroll_to(self, first):
+        first = max(0, min(int(first), self.total - self.rows))
+        if first != self.first: self.first = first; self.refresh()
+
+    def append(self, item):
+        at_tail = self.following_tail
+        self.total += 1
+        if at_tail:
+            if self.listbox.size() >= self.rows: self.listbox.delete(0); del self.items[0]; self.first += 1
+            self.listbox.insert(tk.END, str(item)); self.items.append(item)
+        self._update_scrollbar()
+
+    def _update_scrollbar(self):
+        if self.total <= self.rows: self.scrollbar.set(0.0, 1.0)
+        else: self.scrollbar.set(self.first / self.total, (self.first + self.rows) / self.total)
+
+    def on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto": self.scroll_to(float(amount) * self.total)
+        elif action == "scroll": self.scroll_to(self.first + int(amount) * (self.rows if unit == "pages" else 1))
+
+    def on_mousewheel(self, event):
+        if getattr(event, "num", None) == 4 or getattr(event, "delta", 0) > 0: self.scroll_to(self.first - 3)
+        else: self.scroll_to(self.first + 3)
+        return "break"
+
+    def on_configure(self, event):
+        line_height = tkfont.Font(font=self.listbox.cget("font")).metrics("linespace") + 1
+        rows = max(1, (event.height - 4) // line_height)
+        if rows != self.rows:
+            at_tail = self.following_tail
+            self.rows = rows
+            if at_tail: self.first = max(0, self.total - rows)
+            self.refresh()
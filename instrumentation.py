@@ -0,0 +1,108 @@
+"""Opt-in timing of the calculator's hot paths.
+
+Nothing here runs unless instrumentation is switched on (``CALC_INSTRUMENT``
+environment variable or ``--instrument`` on ``python calculator.py``): a
+disabled calculator has no wrappers at all. When enabled,
+``Instrumentation.instrument(obj, names)`` replaces those methods on the
+instance with wrappers that time each call with ``perf_counter_ns`` into a
+``LatencyHistogram``. Counters (disk writes, bytes persisted, cache hits) are
+read from registered sources when a snapshot is taken. ``snapshot()`` and
+``dump(path)`` give p50/p95/p99 per operation as JSON.
+"""
+import functools
+import json
+import os
+import time
+
+ENV_VAR = "CALC_INSTRUMENT" # "1" dumps to DEFAULT_DUMP_FILE on exit; any other value is the dump path
+DEFAULT_DUMP_FILE = "calc_instrumentation.json"
+
+class LatencyHistogram:
+    """Streaming histogram of durations in nanoseconds.
+
+    Eight buckets per power of two (at most 12.5% relative error), so memory
+    is constant however many samples are added.
+    """
+    __slots__ = ("counts", "count", "total_ns", "max_ns")
+
+    def __init__(self):
+        self.counts = [0] * (8 + 60 * 8) # Exact below 8 ns, then 8 per octave up to 2**64 ns
+        self.count = 0; self.total_ns = 0; self.max_ns = 0
+
+    def add(self, ns):
+        bits = ns.bit_length()
+        self.counts[ns if bits < 4 else (bits - 3) * 8 + (ns >> (bits - 4)) - 8] += 1
+        self.count += 1; self.total_ns += ns
+        if ns > self.max_ns: self.max_ns = ns
+
+    @staticmethod
+    def _bucket_middle(index):
+        if index < 8: return index
+        shift, sub = divmod(index - 8, 8)
+        return ((16 + 2 * sub + 1) << shift) // 2 # Between (8+sub) << shift and (9+sub) << shift
+
+    def percentile(self, fraction):
+        if not self.count: return 0
+        rank = max(1, round(fraction * self.count)); seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank: return min(LatencyHistogram._bucket_middle(index), self.max_ns)
+        return self.max_ns
+
+    def summary(self):
+        us = lambda ns: round(ns / 1000, 3)
+        return {"count": self.count, "total_ms": round(self.total_ns / 1e6, 3), "mean_us": us(self.total_ns / self.count) if self.count else 0.0,
+                "p50_us": us(self.percentile(0.5)), "p95_us": us(self.percentile(0.95)), "p99_us": us(self.percentile(0.99)), "max_us": us(self.max_ns)}
+
+class Instrumentation:
+    def __init__(self, dump_path=None):
+        self.dump_path = dump_path
+        self.histograms = {}
+        self._counter_sources = {} # name -> callable returning {counter: value}
+
+    def histogram(self, name):
+        histogram = self.histograms.get(name)
+        if histogram is None: histogram = self.histograms[name] = LatencyHistogram()
+        return histogram
+
+    def wrap(self, name, func):
+        add = self.histogram(name).add; clock = time.perf_counter_ns
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            start = clock()
+            try: return func(*args, **kwargs)
+            finally: add(clock() - start)
+        return timed
+
+    def instrument(self, obj, names, prefix=""):
+        """Time ``obj``'s methods ``names`` from now on (instance attributes shadow the class methods)."""
+        for name in names: setattr(obj, name, self.wrap(prefix + name, getattr(obj, name)))
+
+    def add_counters(self, name, source):
+        self._counter_sources[name] = source
+
+    def snapshot(self):
+        return {"operations": {name: histogram.summary() for name, histogram in sorted(self.histograms.items())},
+                "counters": {name: source() for name, source in self._counter_sources.items()}}
+
+    def dump(self, path=None):
+        path = path or self.dump_path or DEFAULT_DUMP_FILE
+        with open(path, "w") as f: json.dump(self.snapshot(), f, indent=2)
+        return path
+
+    def format(self):
+        """The snapshot as a fixed-width text table, for the debug window."""
+        snapshot = self.snapshot()
+        lines = [f"{'operation':<26}{'count':>8}{'p50 us':>10}{'p95 us':>10}{'p99 us':>10}{'max us':>11}"]
+        for name, stats in snapshot["operations"].items():
+            lines.append(f"{name:<26}{stats['count']:>8}{stats['p50_us']:>10.1f}{stats['p95_us']:>10.1f}{stats['p99_us']:>10.1f}{stats['max_us']:>11.1f}")
+        for group, counters in snapshot["counters"].items():
+            lines.append(""); lines.append(group)
+            lines.extend(f"  {name:<24}{value:>12,}" for name, value in counters.items())
+        return "\n".join(lines)
+
+def from_environment(environ=os.environ):
+    """An Instrumentation if ``CALC_INSTRUMENT`` asks for one, else None."""
+    value = environ.get(ENV_VAR, "").strip()
+    if value in ("", "0"): return None
+    return Instrumentation(DEFAULT_DUMP_FILE if value == "1" else value)
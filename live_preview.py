@@ -0,0 +1,174 @@
+"""Running result of a partly typed expression, re-evaluated incrementally.
+
+``PreviewEvaluator`` is an operator-precedence (shunting-yard) evaluator fed
+one ``ExpressionBuffer`` token at a time. Its operand and operator stacks are
+persistent linked tuples, so the state after a token shares everything with
+the state before it. States are checkpointed every ``CHECKPOINT_INTERVAL``
+tokens: appending resumes from the current state, and deleting resumes from
+the checkpoint before the edit, so only the changed tail is re-evaluated.
+The preview is the state folded as if the expression ended there (a trailing
+operator is ignored and open parentheses are closed), at a cost proportional
+to the pending stack depth. Semantics follow ``calc_engine``; input it would
+reject, and integers past ``max_bits``, give no preview. Variables and
+one-argument functions are looked up in ``names`` (the user's definitions,
+``Definitions.namespace``); call ``reset`` after they change.
+"""
+import re
+from calc_cost import check_bits, check_power
+from calc_engine import CONSTANTS, FUNCTION_ALIASES, UNARY_FUNCTIONS, apply_function
+from expression_buffer import piece_kind
+
+PREVIEW_MAX_BITS = 4096 # Larger integers are left for "="
+
+_LITERAL_RE = re.compile(r"(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?") # calc_engine's number token
+_EXPONENT_RE = re.compile(r"[eE]\d*") # "1e5" arrives as the pieces "1" and "e5"
+_BINARY_PRECEDENCE = {"+": 1, "-": 1, "*": 2, "/": 2, "**": 4}
+_PREFIX_PRECEDENCE = 3 # Unary minus and √: looser than ** on their left, tighter than * and /
+_PAREN = ("paren", "(", 0)
+
+# A state is (operands, operators, number, name, expect_operand): the stacks are (top, rest) pairs
+# or None, number/name hold a literal or name still being typed, and None is the error state.
+_START = (None, None, "", "", True)
+_MISSING = object()
+
+def _literal(text, operands, max_bits):
+    if not _LITERAL_RE.fullmatch(text): return None
+    if "." in text or "e" in text or "E" in text: return (float(text), operands)
+    if len(text) > 1 and text[0] == "0" and text.strip("0"): return None # Leading zeros, as in calc_engine
+    if len(text) * 10 > max_bits * 3: return None # Over about max_bits bits; skips converting huge literals
+    return (int(text), operands)
+
+def _binary(op, left, right, max_bits):
+    if op == "+": return left + right
+    if op == "-": return left - right
+    if op == "/": return left / right
+    if op == "*":
+        if isinstance(left, int) and isinstance(right, int): check_bits(left.bit_length() + right.bit_length(), max_bits)
+        return left * right
+    if isinstance(right, int): check_power(left, right, max_bits)
+    return left ** right
+
+def _user_value(names, name, max_bits):
+    # A defined variable's value, None if it is an integer past max_bits, or _MISSING; the "_sin"-style entries are the engine's
+    value = names.get(name, _MISSING) if names and name[0] != "_" else _MISSING
+    if callable(value): return _MISSING
+    return None if isinstance(value, int) and value.bit_length() > max_bits else value
+
+def _is_user_function(names, name):
+    return bool(names) and name[0] != "_" and callable(names.get(name))
+
+def _reduce(op, operands, degree_mode, max_bits, names):
+    kind, name, _ = op
+    try:
+        if kind == "ucall":
+            value, rest = operands; value = names[name](value)
+            if isinstance(value, int): check_bits(value.bit_length(), max_bits)
+            return (value, rest)
+        if kind == "bin":
+            right, (left, rest) = operands
+            return (_binary(name, left, right, max_bits), rest)
+        value, rest = operands
+        if name == "neg": return (-value, rest)
+        if name == "pos": return (+value, rest)
+        return (apply_function(name, value, degree_mode), rest)
+    except (ArithmeticError, ValueError, TypeError): return None
+
+def _step(state, piece, degree_mode, max_bits, names):
+    operands, ops, number, name, expect = state
+    if number:
+        if piece.isdigit() or piece == "." or (number[-1] in "eE" and piece in ("+", "-")) \
+           or (_EXPONENT_RE.fullmatch(piece) and "e" not in number and "E" not in number):
+            return (operands, ops, number + piece, "", False)
+        operands = _literal(number, operands, max_bits)
+        if operands is None: return None
+    elif name:
+        if piece == "(":
+            if _is_user_function(names, name): return (operands, (("ucall", name, 0), ops), "", "", True)
+            function = FUNCTION_ALIASES.get(name, name)
+            if function not in UNARY_FUNCTIONS: return None
+            return (operands, (("call", function, 0), ops), "", "", True)
+        value = _user_value(names, name, max_bits)
+        if value is _MISSING:
+            if name not in CONSTANTS: return None
+            value = CONSTANTS[name]
+        if value is None: return None
+        operands = (value, operands)
+    kind = piece_kind(piece)
+    if kind == "op":
+        if expect:
+            if piece not in ("+", "-"): return None
+            return (operands, (("prefix", "neg" if piece == "-" else "pos", _PREFIX_PRECEDENCE), ops), "", "", True)
+        precedence = _BINARY_PRECEDENCE[piece]
+        while ops is not None and ops[0][0] in ("bin", "prefix") and (ops[0][2] > precedence or (ops[0][2] == precedence and piece != "**")):
+            operands = _reduce(ops[0], operands, degree_mode, max_bits, names)
+            if operands is None: return None
+            ops = ops[1]
+        return (operands, (("bin", piece, precedence), ops), "", "", True)
+    if kind == "rparen":
+        if expect: return None
+        while ops is not None and ops[0][0] in ("bin", "prefix"):
+            operands = _reduce(ops[0], operands, degree_mode, max_bits, names)
+            if operands is None: return None
+            ops = ops[1]
+        if ops is None: return None # Unbalanced
+        if ops[0][0] in ("call", "ucall"):
+            operands = _reduce(ops[0], operands, degree_mode, max_bits, names)
+            if operands is None: return None
+        return (operands, ops[1], "", "", False)
+    if not expect: return None # An operand right after an operand, e.g. "2(" or ")3"
+    if kind == "num": return (operands, ops, piece, "", False)
+    if kind == "lparen": return (operands, (_PAREN, ops), "", "", True)
+    if piece == "√": return (operands, (("prefix", "sqrt", _PREFIX_PRECEDENCE), ops), "", "", True)
+    if kind == "name": return (operands, ops, "", piece, False)
+    return None
+
+def _fold(state, degree_mode, max_bits, names):
+    operands, ops, number, name, expect = state
+    if number:
+        operands = _literal(number, operands, max_bits)
+        if operands is None: return None
+    elif name:
+        value = _user_value(names, name, max_bits)
+        if value is None: return None
+        if value is not _MISSING: operands = (value, operands)
+        elif name in CONSTANTS: operands = (CONSTANTS[name], operands)
+        elif FUNCTION_ALIASES.get(name, name) in UNARY_FUNCTIONS or _is_user_function(names, name): expect = True # Still waiting for "("
+        else: return None
+    while expect: # Drop the unfinished tail back to the last complete operand
+        if ops is None: return None
+        expect = ops[0][0] != "bin"; ops = ops[1]
+    while ops is not None:
+        if ops[0][0] != "paren":
+            operands = _reduce(ops[0], operands, degree_mode, max_bits, names)
+            if operands is None: return None
+        ops = ops[1]
+    return operands[0]
+
+class PreviewEvaluator:
+    CHECKPOINT_INTERVAL = 16 # Tokens between saved states; a deletion replays at most this many
+
+    def __init__(self, degree_mode=False, max_bits=PREVIEW_MAX_BITS, names=None):
+        self.max_bits = max_bits; self.names = names
+        self.steps = 0 # Tokens evaluated so far
+        self.reset(degree_mode)
+
+    def reset(self, degree_mode=False):
+        self.degree_mode = degree_mode
+        self._checkpoints = [_START] # State after i * CHECKPOINT_INTERVAL tokens
+        self._state = _START; self._count = 0
+
+    def update(self, buffer, degree_mode=False):
+        """The value of ``buffer`` as typed so far, or None; only tokens changed since the last call are evaluated."""
+        if degree_mode != self.degree_mode: self.reset(degree_mode)
+        keep = min(buffer.unchanged_prefix(), self._count)
+        if keep < self._count:
+            index = keep // PreviewEvaluator.CHECKPOINT_INTERVAL
+            del self._checkpoints[index + 1:]
+            self._state = self._checkpoints[index]; self._count = index * PreviewEvaluator.CHECKPOINT_INTERVAL
+        state = self._state
+        for piece in buffer.pieces(self._count):
+            if state is not None: state = _step(state, piece, self.degree_mode, self.max_bits, self.names)
+            self._count += 1; self.steps += 1
+            if self._count % PreviewEvaluator.CHECKPOINT_INTERVAL == 0: self._checkpoints.append(state)
+        self._state = state
+        return None if state is None else _fold(state, self.degree_mode, self.max_bits, self.names)
@@ -0,0 +1,173 @@
+"""Record and replay calculator input, for bug reports and as a load generator.
+
+``MacroRecorder`` captures what reaches ``Calculator.button_click``,
+``handle_keypress`` and ``on_paste``, with timestamps (``python calculator.py
+--record FILE``). ``save``/``load`` use a compact text format: a header line,
+then one ``<ms since previous step> <kind> <JSON payload>`` line per step,
+gzip-compressed when the file name ends in ".gz". Kinds are "c" (button
+text), "k" (``[keysym, char]``) and "p" (pasted text).
+
+``replay`` drives a Calculator (or a headless ``CalculatorCore``) through the steps as fast as it can: queued
+keys are applied after every step and background evaluations are waited for,
+so the outcome does not depend on timing. It returns a ``ReplayReport`` with
+per-step latencies and the final state. From the command line::
+
+    python -m macro session.macro.gz
+"""
+import collections
+import gzip
+import itertools
+import json
+import time
+
+HEADER = "#calc-macro 1"
+
+Step = collections.namedtuple("Step", "delay_ms kind payload")
+KeyEvent = collections.namedtuple("KeyEvent", "keysym char") # Stands in for a Tk <Key> event
+
+class MacroRecorder:
+    def __init__(self):
+        self.steps = []
+        self._calculator = None; self._last = None
+
+    def attach(self, calculator):
+        calculator.recorder = self; self._calculator = calculator
+        self._last = time.monotonic()
+
+    def detach(self):
+        if self._calculator is not None: self._calculator.recorder = None; self._calculator = None
+
+    def record(self, kind, payload):
+        now = time.monotonic()
+        self.steps.append(Step(round((now - self._last) * 1000), kind, payload)); self._last = now
+
+    def save(self, path):
+        save(path, self.steps)
+
+class _Variable:
+    __slots__ = ("value",)
+
+    def __init__(self, value=""):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+    def set(self, value):
+        self.value = value
+
+class HeadlessView:
+    """The view for replaying into a ``CalculatorCore`` without a display.
+
+    Scheduled callbacks are dropped: ``replay`` applies queued input and waits for
+    background results itself. There is no clipboard; pastes are replayed as text.
+    """
+
+    def __init__(self):
+        self._jobs = itertools.count(1)
+
+    def variable(self, value=""):
+        return _Variable(value)
+
+    def after(self, ms, callback):
+        return next(self._jobs)
+
+    def after_idle(self, callback):
+        return next(self._jobs)
+
+    def after_cancel(self, job):
+        pass
+
+    def bell(self):
+        pass
+
+    def clipboard_text(self):
+        return ""
+
+def _open(path, mode):
+    if str(path).endswith(".gz"): return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+def save(path, steps):
+    with _open(path, "w") as f:
+        f.write(HEADER + "\n")
+        for step in steps: f.write(f"{step.delay_ms} {step.kind} {json.dumps(step.payload, ensure_ascii=False, separators=(',', ':'))}\n")
+
+def load(path):
+    with _open(path, "r") as f:
+        if f.readline().rstrip("\n") != HEADER: raise ValueError(f"{path} is not a calculator macro")
+        steps = []
+        for line in f:
+            delay_ms, kind, payload = line.rstrip("\n").split(" ", 2)
+            steps.append(Step(int(delay_ms), kind, json.loads(payload)))
+        return steps
+
+def _apply(calculator, step):
+    if step.kind == "c": calculator.button_click(step.payload)
+    elif step.kind == "k": calculator.handle_keypress(KeyEvent(*step.payload))
+    elif step.kind == "p": calculator.paste_expression(step.payload)
+    else: raise ValueError(f"unknown macro step kind {step.kind!r}")
+
+def final_state(calculator):
+    return {
+        "expression": calculator.expression, "display": calculator.result_var.get(), "preview": calculator.preview_var.get(),
+        "memory_slots": list(calculator.memory_slots), "active_memory_slot": calculator.active_memory_slot_index,
+        "degree_mode": calculator.degree_mode, "history_entries": calculator.history_store.position_count(),
+    }
+
+class ReplayReport:
+    __slots__ = ("latencies", "state", "seconds")
+
+    def __init__(self, latencies, state, seconds):
+        self.latencies = latencies # Seconds per step, in step order
+        self.state = state; self.seconds = seconds
+
+    def summary(self):
+        ordered = sorted(self.latencies); count = len(ordered)
+        pick = lambda fraction: ordered[min(count - 1, int(fraction * count))] * 1e6 if count else 0.0
+        slowest = max(range(count), key=self.latencies.__getitem__) if count else None
+        return {"steps": count, "seconds": self.seconds, "steps_per_s": count / self.seconds if self.seconds else 0.0,
+                "p50_us": pick(0.5), "p90_us": pick(0.9), "p99_us": pick(0.99), "max_us": pick(1.0), "slowest_step": slowest}
+
+def replay(calculator, steps, wait_for_results=True):
+    """Run ``steps`` against ``calculator`` at full speed; returns a ReplayReport."""
+    latencies = []; clock = time.perf_counter
+    started = clock()
+    for step in steps:
+        start = clock()
+        _apply(calculator, step)
+        calculator.process_pending_input()
+        if wait_for_results: calculator.finish_evaluation()
+        latencies.append(clock() - start)
+    return ReplayReport(latencies, final_state(calculator), clock() - started)
+
+def main(argv=None):
+    import argparse
+    import os
+    import tempfile
+    from calc_core import CalculatorCore
+    parser = argparse.ArgumentParser(prog="python -m macro", description="Replay a recorded calculator macro at full speed.")
+    parser.add_argument("path", help="macro file (.gz for compressed)")
+    parser.add_argument("--state-dir", help="directory for the settings and history files (default: a temporary one)")
+    parser.add_argument("--visible", action="store_true", help="replay into a Tk window instead of the headless core")
+    parser.add_argument("--no-wait", action="store_true", help="do not wait for background evaluations between steps")
+    args = parser.parse_args(argv)
+    steps = load(args.path)
+    with tempfile.TemporaryDirectory() as scratch:
+        directory = args.state_dir or scratch # Never the user's own files
+        files = (os.path.join(directory, "calc_settings.json"), os.path.join(directory, "calc_history.sqlite3"))
+        if args.visible:
+            import tkinter as tk
+            from calculator import Calculator
+            root = tk.Tk()
+            try: report = replay(Calculator(root, *files), steps, wait_for_results=not args.no_wait)
+            finally: root.destroy()
+        else:
+            calculator = CalculatorCore(HeadlessView(), *files)
+            try: report = replay(calculator, steps, wait_for_results=not args.no_wait)
+            finally: calculator.close()
+    for key, value in report.summary().items(): print(f"{key:>14}: {value:.1f}" if isinstance(value, float) else f"{key:>14}: {value}")
+    for key, value in report.state.items(): print(f"{key:>14}: {value}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""Memory registers: a bank of float registers in a typed array, patched in place on disk.
+
+``RegisterBank(size, path)`` keeps its registers in an ``array('d')`` (8 bytes
+each instead of a list of float objects) and behaves like a list of floats:
+indexing, slices, iteration and ``==`` against lists. The active register is
+part of the bank. The file is a 12-byte header (magic, register count,
+active register) followed by little-endian doubles. ``flush()`` writes only
+what changed since the last flush, at its own offset, so storing one register
+costs one 8-byte write however large the bank is. A file holding more
+registers than the bank keeps the extra ones, so shrinking the bank and
+growing it again loses nothing.
+"""
+import array
+import os
+import struct
+
+HEADER = struct.Struct("<4sII") # magic, registers in the file, active register
+MAGIC = b"CRG1"
+ITEM = 8
+
+class RegisterBank:
+    def __init__(self, size, path=None):
+        if size < 1: raise ValueError("a register bank needs at least one register")
+        self.values = array.array("d", bytes(ITEM * size))
+        self.path = path
+        self._active = 0
+        self._dirty = set(); self._header_dirty = False
+        self._file_count = None # Registers in the file; None while there is no valid file to patch
+        self.writes = 0; self.bytes_written = 0
+
+    def load(self):
+        """Read the registers (up to this bank's size) and the active register from ``path``; False if there is no valid file."""
+        try:
+            with open(self.path, "rb") as f: data = f.read()
+        except OSError: return False
+        if len(data) < HEADER.size: return False
+        magic, count, active = HEADER.unpack_from(data)
+        if magic != MAGIC or len(data) != HEADER.size + count * ITEM: return False
+        shown = min(count, len(self.values))
+        self.values[:shown] = array.array("d", struct.unpack_from(f"<{shown}d", data, HEADER.size))
+        self._active = active if active < len(self.values) else 0
+        self._file_count = count; self._dirty.clear(); self._header_dirty = False
+        return True
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice): return self.values[index].tolist()
+        return self.values[index]
+
+    def __setitem__(self, index, value):
+        # Raises TypeError for non-real values and OverflowError for ints too large for a float, like array does
+        if isinstance(index, slice):
+            indices = range(*index.indices(len(self.values))); value = list(value)
+            if len(value) != len(indices): raise ValueError("a register bank cannot change size by slice assignment")
+            for i, item in zip(indices, value): self[i] = item
+            return
+        self.values[index] = value
+        self._dirty.add(index % len(self.values))
+
+    def __iter__(self):
+        return iter(self.values)
+
+    def __eq__(self, other):
+        if isinstance(other, RegisterBank): other = other.values
+        try: return len(self.values) == len(other) and all(a == b for a, b in zip(self.values, other))
+        except TypeError: return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"RegisterBank({self.values.tolist()!r})"
+
+    def tolist(self):
+        return self.values.tolist()
+
+    @property
+    def active(self):
+        return self._active
+
+    @active.setter
+    def active(self, index):
+        if not 0 <= index < len(self.values): raise IndexError("register index out of range")
+        if index != self._active: self._active = index; self._header_dirty = True
+
+    def clear(self):
+        """Set every register to 0.0; only the ones that were not already zero are written."""
+        self._dirty.update(i for i, value in enumerate(self.values) if value)
+        self.values = array.array("d", bytes(ITEM * len(self.values)))
+
+    @property
+    def dirty(self):
+        return bool(self._dirty) or self._header_dirty
+
+    def flush(self):
+        """Write the changed registers (and the header if it changed); returns the bytes written."""
+        if self.path is None: self._dirty.clear(); self._header_dirty = False; return 0
+        if not self.dirty and (self._file_count is None or self._file_count >= len(self.values)): return 0 # Nothing new to write
+        if self._file_count is None: return self._write_all()
+        written = 0
+        try:
+            with open(self.path, "r+b") as f:
+                if self._file_count < len(self.values): # Grown since the file was written: append the new registers
+                    self._dirty.update(range(self._file_count, len(self.values)))
+                    self._file_count = len(self.values); self._header_dirty = True
+                if self._header_dirty:
+                    f.seek(0); f.write(HEADER.pack(MAGIC, self._file_count, self._active)); written += HEADER.size
+                for start, stop in self._runs():
+                    f.seek(HEADER.size + start * ITEM); data = struct.pack(f"<{stop - start}d", *self.values[start:stop])
+                    f.write(data); written += len(data)
+        except OSError: return self._write_all() # Removed or unreadable since: start a new file
+        self._dirty.clear(); self._header_dirty = False
+        self.writes += 1; self.bytes_written += written
+        return written
+
+    def _runs(self):
+        # Dirty indices as (start, stop) ranges, so neighbouring registers go out in one write
+        runs = []
+        for index in sorted(self._dirty):
+            if runs and runs[-1][1] == index: runs[-1][1] = index + 1
+            else: runs.append([index, index + 1])
+        return runs
+
+    def _write_all(self):
+        # A new file: written whole to a temporary file and renamed over the old one, as SettingsStore does
+        import tempfile
+        data = HEADER.pack(MAGIC, len(self.values), self._active) + struct.pack(f"<{len(self.values)}d", *self.values)
+        directory = os.path.dirname(os.path.abspath(self.path))
+        try:
+            fd, tmp_path = tempfile.mkstemp(prefix=".calc_registers.", suffix=".tmp", dir=directory)
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data); f.flush(); os.fsync(f.fileno())
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                os.unlink(tmp_path); raise
+        except OSError as e: print(f"Error saving memory registers: {e}"); return 0
+        self._file_count = len(self.values); self._dirty.clear(); self._header_dirty = False
+        self.writes += 1; self.bytes_written += len(data)
+        return len(data)
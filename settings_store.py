@@ -0,0 +1,80 @@
+"""Write-behind persistence for ``calc_settings.json``.
+
+``update()`` only records the latest settings and arms a timer; a background
+thread writes the newest snapshot once per ``delay`` to a temporary file,
+fsyncs it and atomically renames it over the real file, so a burst of
+keystrokes costs one write and a crash never leaves a half-written file.
+Stores are shared per path so every ``Calculator`` in the process reads its
+own pending writes.
+"""
+import atexit
+import copy
+import json
+import os
+import threading
+
+class SettingsStore:
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    @classmethod
+    def for_path(cls, path, delay=0.5):
+        key = os.path.abspath(path)
+        with cls._instances_lock:
+            store = cls._instances.get(key)
+            if store is None: store = cls._instances[key] = cls(path, delay)
+            return store
+
+    def __init__(self, path, delay=0.5):
+        self.path = path
+        self.delay = delay
+        self.writes = 0; self.bytes_written = 0
+        self._pending = None; self._timer = None
+        self._lock = threading.Lock() # Guards _pending and _timer; never held during I/O
+        self._write_lock = threading.Lock() # Serialises writes so they land in order
+
+    def load(self):
+        """Return the settings dict (pending changes first), or None if nothing was saved yet."""
+        with self._lock:
+            if self._pending is not None: return copy.deepcopy(self._pending)
+        if not os.path.exists(self.path): return None
+        with open(self.path, "r") as f: return json.load(f)
+
+    def update(self, settings):
+        with self._lock:
+            self._pending = dict(settings)
+            if self._timer is None:
+                self._timer = threading.Timer(self.delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    @property
+    def dirty(self):
+        return self._pending is not None
+
+    def flush(self):
+        with self._write_lock:
+            with self._lock:
+                settings, self._pending = self._pending, None
+                if self._timer is not None and self._timer is not threading.current_thread(): self._timer.cancel()
+                self._timer = None
+            if settings is not None: self._write(settings)
+
+    def _write(self, settings):
+        import tempfile # Deferred: costs several ms at startup and is only needed once a save happens
+        data = json.dumps(settings, separators=(",", ":")).encode("utf-8")
+        directory = os.path.dirname(os.path.abspath(self.path))
+        try:
+            fd, tmp_path = tempfile.mkstemp(prefix=".calc_settings.", suffix=".tmp", dir=directory)
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data); f.flush(); os.fsync(f.fileno())
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                os.unlink(tmp_path); raise
+            self.writes += 1; self.bytes_written += len(data)
+        except OSError as e: print(f"Error saving settings: {e}")
+
+@atexit.register
+def _flush_all():
+    for store in list(SettingsStore._instances.values()): store.flush()
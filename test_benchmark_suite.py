@@ -0,0 +1,32 @@
+import unittest
+from benchmarks import suite
+
+class TestBenchmarkComparison(unittest.TestCase):
+
+    def test_direction_of_metrics(self):
+        self.assertTrue(suite.higher_is_better("eval_per_s[trig]"))
+        self.assertTrue(suite.higher_is_better("button_click_per_s"))
+        self.assertFalse(suite.higher_is_better("update_history_display_us@1000"))
+        self.assertFalse(suite.higher_is_better("import_ms"))
+
+    def test_regressions_are_flagged_either_way(self):
+        baseline = {"metrics": {"eval_per_s[simple]": 1000.0, "import_ms": 20.0, "apply_theme_ms": 1.0, "construct_ms": 50.0}}
+        results = {"metrics": {"eval_per_s[simple]": 700.0, "import_ms": 21.0, "apply_theme_ms": 0.5, "first_idle_ms": 90.0}}
+        statuses = {row[0]: row[4] for row in suite.compare(results, baseline, tolerance=0.25)}
+        self.assertEqual(statuses, {"eval_per_s[simple]": "REGRESSED", "import_ms": "ok", "apply_theme_ms": "improved",
+                                    "construct_ms": "missing", "first_idle_ms": "new"})
+
+    def test_comparison_is_normalized_by_machine_speed(self):
+        baseline = {"metrics": {"calibration_per_s": 1000.0, "eval_per_s[simple]": 1000.0, "import_ms": 20.0}}
+        results = {"metrics": {"calibration_per_s": 500.0, "eval_per_s[simple]": 520.0, "import_ms": 41.0}} # Everything half as fast
+        self.assertEqual(suite.machine_speed(results, baseline), 0.5)
+        self.assertEqual({row[4] for row in suite.compare(results, baseline)}, {"ok", "reference"})
+        self.assertIn("REGRESSED", {row[4] for row in suite.compare(results, baseline, normalize=False)})
+
+    def test_baseline_covers_the_headless_cases(self):
+        import json
+        with open(suite.BASELINE_FILE) as f: baseline = json.load(f)
+        for metric in [f"eval_per_s[{name}]" for name in suite.EVAL_CASES] + ["import_ms", "calibration_per_s"]: self.assertIn(metric, baseline["metrics"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+import contextlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import calc_batch
+from calc_core import CalculatorCore
+from test_support import FakeView
+
+class TestCalcBatch(unittest.TestCase):
+
+    def test_results_match_the_calculator(self):
+        expressions = ["2+3*4", "1/0", "sqrt(0-4)", "log(0)", "exp(710)", "9**9**9", "tan(90)", "sin(30)", "2**5000*3", "(1+", "foo(2)"]
+        directory = tempfile.mkdtemp(); self.addCleanup(shutil.rmtree, directory, True)
+        for degree_mode in (False, True):
+            calc = CalculatorCore(FakeView(), os.path.join(directory, f"settings{degree_mode}.json"), os.path.join(directory, f"history{degree_mode}.sqlite3"))
+            self.addCleanup(calc.close)
+            calc.degree_mode = degree_mode; shown = []
+            for expression in expressions:
+                calc.clear(); calc.expression = expression; calc.calculate(); calc.finish_evaluation()
+                shown.append(calc.result_var.get())
+            batch = [result.result or result.error for results in calc_batch.evaluate_stream(expressions, degree_mode) for result in results]
+            self.assertEqual(batch, shown)
+
+    def test_order_is_kept_across_processes(self):
+        lines = [f"{i}*3" if i % 5 else "1/0" for i in range(1, 3001)]
+        single = [result for results in calc_batch.evaluate_stream(lines, chunk_size=100) for result in results]
+        pooled = [result for results in calc_batch.evaluate_stream(iter(lines), processes=2, chunk_size=100) for result in results]
+        self.assertEqual(pooled, single)
+        self.assertEqual((single[0], single[4]), (calc_batch.BatchResult(1, "1*3", "3", None), calc_batch.BatchResult(5, "1/0", None, "Error")))
+
+    def test_blank_lines_are_skipped_and_pasted_symbols_accepted(self):
+        results = [result for results in calc_batch.evaluate_stream(["2 × 3\n", "\n", "2^10 ÷ 4\n"]) for result in results]
+        self.assertEqual([(result.line, result.expression, result.result) for result in results], [(1, "2*3", "6"), (3, "2**10/4", "256.0")])
+
+    def test_output_formats(self):
+        out = io.StringIO()
+        self.assertEqual(calc_batch.evaluate_file(["1+1\n", "log(0)\n"], out), (2, 1))
+        self.assertEqual(out.getvalue(), "line,expression,result,error\n1,1+1,2,\n2,log(0),,Error\n")
+        out = io.StringIO(); calc_batch.evaluate_file(["1+1\n"], out, "jsonl", degree_mode=True)
+        self.assertEqual(json.loads(out.getvalue()), {"line": 1, "expression": "1+1", "result": "2", "error": None})
+
+    def test_command_line(self):
+        directory = tempfile.mkdtemp(); self.addCleanup(shutil.rmtree, directory, True)
+        source, target = os.path.join(directory, "in.txt"), os.path.join(directory, "out.jsonl")
+        with open(source, "w") as f: f.write("cos(60)\n2+2\n")
+        self.assertEqual(calc_batch.main([source, "-o", target, "--degrees", "--processes", "2"]), 0)
+        with open(target) as f: rows = [json.loads(line) for line in f]
+        self.assertEqual([(row["line"], row["result"]) for row in rows], [(1, str(0.5000000000000001)), (2, "4")])
+
+    def test_chunk_size_must_be_positive(self):
+        for chunk_size in ("0", "-5"):
+            with self.assertRaises(SystemExit), contextlib.redirect_stderr(io.StringIO()): calc_batch.main(["--chunk-size", chunk_size])
+        with self.assertRaises(ValueError): next(calc_batch.evaluate_stream(["1+1"], chunk_size=0))
+
+    def test_process_count_must_not_be_negative(self):
+        with self.assertRaises(SystemExit), contextlib.redirect_stderr(io.StringIO()): calc_batch.main(["--processes", "-1"])
+        with self.assertRaises(ValueError): next(calc_batch.evaluate_stream(["1+1"], processes=-1))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+from calc_cost import MAX_RESULT_BITS, ResultTooLargeError, check_power, estimate_bits, value_magnitude
+from calc_engine import ExpressionEngine, parse
+
+class TestCostEstimator(unittest.TestCase):
+
+    def assertBound(self, expression):
+        # The estimate must never be below the real size of the result
+        value = eval(expression)
+        bits = estimate_bits(parse(expression))
+        if isinstance(value, int): self.assertGreaterEqual(bits, value.bit_length(), expression)
+        return bits
+
+    def test_bounds_are_upper_bounds(self):
+        for expression in ["0", "7", "123456789*987654321", "2**64", "9**9", "(2**10)**3", "-3**5",
+                           "2**2**3", "99999999999999999999+1", "12-999", "(7+8)**(3*4)", "10**300"]:
+            self.assertBound(expression)
+
+    def test_power_towers_are_huge(self):
+        self.assertGreater(estimate_bits(parse("9**9**9")), 1e9)
+        self.assertEqual(estimate_bits(parse("9**9**9**9")), float("inf"))
+        self.assertGreater(estimate_bits(parse("(9**9**9)*0.5")), MAX_RESULT_BITS) # Intermediate ints count
+
+    def test_float_results_are_cheap(self):
+        # Only the integer literals themselves count
+        self.assertLessEqual(estimate_bits(parse("1.5**100000")), 17)
+        self.assertLessEqual(estimate_bits(parse("2**-99999")), 17)
+        self.assertLessEqual(estimate_bits(parse("sin(10**5)")), 17)
+        self.assertLessEqual(estimate_bits(parse("1**99999999999")), 37)
+
+    def test_engine_refuses_before_evaluating(self):
+        engine = ExpressionEngine()
+        self.assertRaises(ResultTooLargeError, engine.evaluate, "9**9**9")
+        self.assertRaises(OverflowError, engine.evaluate, "10**100000")
+        self.assertEqual(engine.evaluate("2**1000"), 2**1000)
+
+    def test_check_power(self):
+        check_power(2**1000, 3)
+        check_power(1.5, 10**6)
+        self.assertRaises(ResultTooLargeError, check_power, 2**(MAX_RESULT_BITS // 2), 3)
+
+    def test_variables_count_with_their_current_value(self):
+        tree = parse("r**r", ("r",))
+        self.assertLessEqual(estimate_bits(tree), 1) # Unknown variables count as floats
+        bounds = {"r": value_magnitude(2**64)}
+        self.assertGreater(estimate_bits(tree, bounds.get), MAX_RESULT_BITS)
+        self.assertIsNone(value_magnitude(2.5)); self.assertEqual(value_magnitude(-8), 3.0)
+
+if __name__ == '__main__':
+    unittest.main()
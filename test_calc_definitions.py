@@ -0,0 +1,91 @@
+import unittest
+import math
+from calc_cost import ResultTooLargeError
+from calc_definitions import Definitions, is_definition
+
+class TestCalcDefinitions(unittest.TestCase):
+
+    def setUp(self):
+        self.definitions = Definitions(memo_size=8)
+        for text in ["r = 3", "d = 2*r", "area(r) = π*r^2", "a = area(d)", "h(p, q) = √(p^2 + q^2)", "c = h(r, 4)", "k = 7"]:
+            self.definitions.define(text)
+
+    def test_values(self):
+        d = self.definitions
+        self.assertEqual((d.value("d"), d.value("c")), (6, 5.0))
+        self.assertAlmostEqual(d.value("a"), math.pi * 36)
+        self.assertEqual(d.evaluate("area(1)+k"), math.pi + 7)
+        self.assertTrue(is_definition("f(x)=x")); self.assertFalse(is_definition("2+3"))
+
+    def test_redefining_recomputes_only_dependents(self):
+        d = self.definitions; before = d.recomputed
+        d.define("r = 4")
+        self.assertEqual(d.recomputed - before, 4) # r, d, a and c; not k, nor the functions
+        self.assertEqual((d.value("d"), d.value("c")), (8, math.sqrt(32)))
+        before = d.recomputed; d.define("k = 1")
+        self.assertEqual(d.recomputed - before, 1)
+        d.define("area(s) = s^2") # A new body recomputes its callers
+        self.assertEqual(d.value("a"), 64)
+
+    def test_refused_definitions(self):
+        d = self.definitions
+        self.assertRaises(ValueError, d.define, "r = a") # a uses r
+        self.assertRaises(ValueError, d.define, "r(x) = x") # d uses r as a variable
+        self.assertRaises(ValueError, d.define, "sin = 1")
+        self.assertRaises(ValueError, d.define, "pi = 1")
+        self.assertRaises(NameError, d.define, "z = y + 1")
+        self.assertRaises(SyntaxError, d.define, "h(1, 2) = 3")
+        self.assertRaises(SyntaxError, d.define, "c = h(1)")
+        self.assertRaises(ValueError, d.remove, "r")
+        d.remove("c"); d.remove("h")
+        self.assertNotIn("h", d); self.assertRaises(NameError, d.evaluate, "h(1,2)")
+
+    def test_errors_propagate_to_dependents(self):
+        d = self.definitions
+        d.define("r = ln(-1)")
+        self.assertEqual((d.result_text("r"), d.result_text("a")), ("Error", "Error"))
+        self.assertRaises(ValueError, d.value, "d")
+        d.define("big = 2**10000"); d.define("bigger = big**big")
+        self.assertEqual(d.result_text("bigger"), "Overflow")
+        d.define("p(n) = n**n")
+        self.assertRaises(ResultTooLargeError, d.evaluate, "p(2**64)") # Checked with the argument's size
+        d.define("r = 1")
+        self.assertEqual(d.value("d"), 2)
+
+    def test_degree_mode_recomputes(self):
+        d = self.definitions
+        d.define("t = sin(90)")
+        self.assertAlmostEqual(d.value("t"), math.sin(90))
+        d.set_degree_mode(True)
+        self.assertAlmostEqual(d.value("t"), 1.0)
+        self.assertAlmostEqual(d.evaluate("sin(30)+r", False), math.sin(30) + 3) # As calc_engine.evaluate_job calls it
+        self.assertFalse(d.degree_mode)
+
+    def test_keypad_expressions(self):
+        d = self.definitions
+        self.assertTrue(d.mentions("area(2)*r")); self.assertFalse(d.mentions("sin(2)*pi")); self.assertFalse(d.mentions("2$r"))
+        self.assertEqual(d.estimate_bits("d*1000"), 13)
+        self.assertGreater(d.estimate_bits("d**9999"), 20000)
+        self.assertRaises(NameError, d.estimate_bits, "r*x")
+
+    def test_memo_is_bounded_and_invalidated(self):
+        d = self.definitions; d.misses = d.hits = 0
+        for _ in range(3): d.evaluate("area(2)+area(2.0)")
+        self.assertEqual((d.misses, d.hits), (2, 4)) # 2 and 2.0 are cached separately
+        self.assertEqual(d.evaluate("area(2)"), math.pi * 4)
+        for n in range(20): d.evaluate(f"area({n})")
+        self.assertEqual(d.cache_info().currsize, 8)
+        d.define("area(s) = s"); self.assertEqual(d.evaluate("area(2)"), 2)
+
+    def test_sources_round_trip(self):
+        d = self.definitions
+        d.define("r = k*2") # Now uses a later definition
+        sources = d.sources()
+        self.assertLess(sources.index("k=7"), sources.index("r=k*2"))
+        self.assertIn("h(p,q)=√(p^2+q^2)", sources)
+        loaded = Definitions()
+        self.assertEqual(loaded.load(sources + ["broken = (", "q = nothing"]), len(sources))
+        self.assertEqual((loaded.sources(), loaded.value("c")), (sources, d.value("c")))
+
+if __name__ == '__main__':
+    unittest.main()
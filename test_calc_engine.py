@@ -0,0 +1,70 @@
+import unittest
+import random
+from calc_engine import ExpressionEngine, ExpressionSyntaxError, apply_function, parse, to_source, tokenize
+
+class TestExpressionEngine(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = ExpressionEngine(cache_size=4)
+
+    def test_matches_python_eval_on_calculator_input(self):
+        rng = random.Random(1234)
+        for _ in range(2000):
+            parts = [str(rng.choice([rng.randint(0, 999), round(rng.uniform(0, 99), 3)]))]
+            for _ in range(rng.randint(0, 5)):
+                parts.append(rng.choice(["+", "-", "*", "/"] if "**" in parts else ["+", "-", "*", "/", "**"]))
+                parts.append(str(rng.randint(0, 3) if parts[-1] == "**" else rng.randint(0, 999)))
+            expression = ("-" if rng.random() < 0.2 else "") + "".join(parts)
+            try: expected = eval(expression)
+            except Exception as e: expected = type(e)
+            try: actual = self.engine.evaluate(expression)
+            except Exception as e: actual = type(e)
+            self.assertEqual(actual, expected, expression)
+
+    def test_precedence_and_associativity(self):
+        self.assertEqual(self.engine.evaluate("2**3**2"), 512)
+        self.assertEqual(self.engine.evaluate("-2**2"), -4)
+        self.assertEqual(self.engine.evaluate("2**-1"), 0.5)
+        self.assertEqual(self.engine.evaluate("(1+2)*3"), 9)
+        self.assertEqual(self.engine.evaluate("2^3"), 8)
+        self.assertEqual(self.engine.evaluate("10/4"), 2.5)
+
+    def test_functions_and_constants(self):
+        self.assertAlmostEqual(self.engine.evaluate("sin(pi/2)"), 1.0)
+        self.assertAlmostEqual(self.engine.evaluate("sin(30)", degree_mode=True), 0.5)
+        self.assertEqual(self.engine.evaluate("√16"), 4.0)
+        self.assertAlmostEqual(self.engine.evaluate("ln(e)"), 1.0)
+        self.assertEqual(self.engine.evaluate("log(1000)"), 3.0)
+        self.assertRaises(ValueError, self.engine.evaluate, "log(0)")
+        self.assertRaises(ValueError, self.engine.evaluate, "tan(90)", True)
+        self.assertRaises(OverflowError, apply_function, "exp", 710)
+
+    def test_errors(self):
+        for bad in ["", "2+", "1.2.3", "05", "(1", "2 3", "2$3"]:
+            self.assertRaises(SyntaxError, self.engine.evaluate, bad)
+        self.assertRaises(NameError, self.engine.evaluate, "foo+1")
+        self.assertRaises(NameError, self.engine.evaluate, "__import__(1)")
+        self.assertRaises(ZeroDivisionError, self.engine.evaluate, "1/0")
+        self.assertTrue(issubclass(ExpressionSyntaxError, SyntaxError))
+        self.assertRaises(SyntaxError, self.engine.evaluate, "1,5") # Commas only separate user function arguments
+
+    def test_user_function_calls(self):
+        self.assertEqual(parse("h(1, x+2)", ("x",), {"h": 2}), ("ucall", "h", (("num", "1"), ("bin", "+", ("var", "x"), ("num", "2")))))
+        self.assertEqual(to_source(parse("2*h(1,sin(3))", (), {"h": 2})), "2*h(1, _sin(3))")
+        self.assertRaises(SyntaxError, parse, "h(1)", (), {"h": 2})
+        self.assertRaises(NameError, parse, "h(1,2)")
+
+    def test_tokenize(self):
+        self.assertEqual(tokenize("1.5e3**2"), [("num", "1.5e3"), ("op", "**"), ("num", "2")])
+
+    def test_lru_cache(self):
+        for expression in ["1+1", "2+2", "3+3", "4+4"]: self.engine.evaluate(expression)
+        self.engine.evaluate("1+1")
+        self.assertEqual(self.engine.cache_info().hits, 1)
+        self.engine.evaluate("5+5") # Evicts "2+2", the least recently used
+        self.engine.evaluate("2+2")
+        info = self.engine.cache_info()
+        self.assertEqual((info.hits, info.misses, info.currsize), (1, 6, 4))
+
+if __name__ == '__main__':
+    unittest.main()
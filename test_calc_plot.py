@@ -0,0 +1,95 @@
+import unittest
+import math
+import re
+from array import array
+import calc_plot
+from calc_cost import ResultTooLargeError
+from calc_engine import ExpressionEngine
+from calc_plot import FunctionOfX, TableRow, TableSource, Viewport
+
+class TestCalcPlot(unittest.TestCase):
+
+    def keypad_value(self, expression, x, degree_mode):
+        try: value = ExpressionEngine().evaluate(re.sub(r"\bx\b", f"({x!r})", expression), degree_mode)
+        except Exception: return math.nan
+        return value if isinstance(value, float) and math.isfinite(value) or isinstance(value, int) else math.nan
+
+    def assertSameValues(self, actual, expected):
+        self.assertEqual(len(actual), len(expected))
+        for a, b in zip(actual, expected):
+            if math.isnan(b): self.assertTrue(math.isnan(a), (a, b))
+            else: self.assertAlmostEqual(a, b, delta=1e-9 * max(1.0, abs(b)))
+
+    def test_matches_the_keypad(self):
+        xs = [-3.0, -0.5, 0.0, 0.5, 1.0, 90.0, 270.0, 800.0]
+        for expression in ["sin(x)+cos(x)*tan(x)", "log(x)-ln(x)", "√x+exp(x)", "x^3-2*x^2+1/x", "x**0.5", "e^x*π"]:
+            for degree_mode in (False, True):
+                for use_numpy in (False, True):
+                    with self.subTest(expression=expression, degree_mode=degree_mode, use_numpy=use_numpy):
+                        f = FunctionOfX(expression, degree_mode, use_numpy)
+                        self.assertSameValues(list(f(xs)), [self.keypad_value(expression, x, degree_mode) for x in xs])
+
+    def test_pure_python_fallback(self):
+        ys = FunctionOfX("tan(x)", True, use_numpy=False)([45.0, 90.0])
+        self.assertIsInstance(ys, array)
+        self.assertAlmostEqual(ys[0], 1.0); self.assertTrue(math.isnan(ys[1])) # The calculator's pole rule
+
+    def test_only_x_and_keypad_names(self):
+        self.assertRaises(NameError, FunctionOfX, "y+1")
+        self.assertRaises(SyntaxError, FunctionOfX, "2x")
+        self.assertEqual(list(FunctionOfX("7")([1.0, 2.0])), [7.0, 7.0])
+
+    def test_results_too_large_are_refused_before_sampling(self):
+        self.assertRaises(ResultTooLargeError, FunctionOfX("x+9**9**7").check_range, -10.0, 10.0)
+        FunctionOfX("x**x").check_range(1.0, 1e6) # Float x overflows to NaN instead of growing
+        self.assertRaises(ResultTooLargeError, FunctionOfX("x**x").check_range, 1, 10**6)
+        FunctionOfX("x**x").check_range(1, 100)
+
+    @unittest.skipUnless(calc_plot.numpy, "NumPy is not installed")
+    def test_numpy_errors_fall_back_point_by_point(self):
+        for expression in ["x+1/0", "x*2**5000", "x+sqrt(0-1)"]:
+            with self.subTest(expression=expression):
+                ys = FunctionOfX(expression)([1.0, 2.0])
+                self.assertTrue(all(math.isnan(y) for y in ys))
+        self.assertEqual(list(FunctionOfX("x+1/2")([1.0, 2.0])), [1.5, 2.5])
+
+    def test_adaptive_samples_spend_the_budget_where_the_curve_bends(self):
+        xs, ys = calc_plot.adaptive_samples(FunctionOfX("tan(x)"), -3.0, 3.0, budget=400, tolerance=0.01)
+        self.assertLessEqual(len(xs), 400); self.assertEqual(xs, sorted(set(xs)))
+        near_poles = sum(1 for x in xs if abs(abs(x) - math.pi / 2) < 0.3)
+        self.assertGreater(near_poles, 400 * 1.2 / 6) # More than an even spread would put there
+        xs, ys = calc_plot.adaptive_samples(FunctionOfX("2*x+1"), 0.0, 1.0, budget=400)
+        self.assertEqual(len(xs), 100) # A straight line needs no refinement
+        xs, ys = calc_plot.adaptive_samples(FunctionOfX("ln(x)"), -1.0, 1.0, budget=400)
+        self.assertLess(min(x for x, y in zip(xs, ys) if y == y), 1e-3) # The domain edge is found
+
+    def test_polylines_break_at_poles_and_gaps(self):
+        f = FunctionOfX("tan(x)")
+        xs = calc_plot.linspace(-3.0, 3.0, 601); ys = list(f(xs))
+        viewport = Viewport(-3.0, 3.0, *calc_plot.y_range(ys), 600, 400)
+        self.assertEqual(len(calc_plot.polylines(xs, ys, viewport)), 3)
+        xs = calc_plot.linspace(-1.0, 1.0, 21)
+        lines = calc_plot.polylines(xs, list(FunctionOfX("√x")(xs)), Viewport(-1.0, 1.0, 0.0, 1.0, 200, 100))
+        self.assertEqual(len(lines), 1)
+        self.assertEqual((lines[0][:2], lines[0][-2:]), ([100.0, 100.0], [200.0, 0.0]))
+
+    def test_viewport_pan_and_zoom(self):
+        viewport = Viewport(-10.0, 10.0, -1.0, 1.0, 200, 100)
+        self.assertEqual(viewport.to_canvas(0.0, 0.0), (100.0, 50.0))
+        viewport.pan(20, 0); self.assertEqual((viewport.x_min, viewport.x_max), (-12.0, 8.0))
+        viewport.zoom(0.5, 200, 50)
+        self.assertEqual((viewport.x_min, viewport.x_max, viewport.y_min, viewport.y_max), (-2.0, 8.0, -0.5, 0.5))
+        self.assertEqual(viewport.to_data(*viewport.to_canvas(3.0, 0.25)), (3.0, 0.25))
+
+    def test_table_source_pages(self):
+        source = TableSource(FunctionOfX("ln(x)"), -1.0, 1000.0, 0.25)
+        self.assertEqual(source.count(), 4005)
+        self.assertEqual(source.fetch(0, 2)[0].x, -1.0)
+        row = source.fetch(8, 1)[0]
+        self.assertEqual((row.x, row.y, str(row).split()), (1.0, 0.0, ["1", "0"]))
+        self.assertEqual(str(TableRow(-1.0, math.nan)).split(), ["-1", "Error"])
+        self.assertEqual(len(source.fetch(4000, 50)), 5)
+        self.assertRaises(ValueError, TableSource, None, 1.0, 0.0, 1.0)
+
+if __name__ == '__main__':
+    unittest.main()
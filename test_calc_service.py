@@ -0,0 +1,118 @@
+import unittest
+import asyncio
+import json
+import os
+import shutil
+import socket
+import sqlite3
+import tempfile
+from concurrent.futures.process import BrokenProcessPool
+import calc_service
+from history_store import HistoryStore
+
+class TestCalcService(unittest.IsolatedAsyncioTestCase):
+    workers = 0 # Evaluate in the server process; TestCalcServiceWithWorkers uses a pool
+
+    async def asyncSetUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.history_file = os.path.join(self.directory, "history.sqlite3")
+        self.service = calc_service.CalculatorService(self.workers, self.history_file)
+        await self.service.start(port=0)
+        host, port = self.service.address[:2]
+        self.open_connection = lambda: asyncio.open_connection(host, port)
+
+    async def asyncTearDown(self):
+        await self.service.close()
+        shutil.rmtree(self.directory, True)
+
+    async def ask(self, *requests):
+        reader, writer = await self.open_connection()
+        writer.write(b"".join(json.dumps(request).encode() + b"\n" if isinstance(request, dict) else request for request in requests))
+        responses = [json.loads(await reader.readline()) for _ in requests]
+        writer.close()
+        return responses
+
+    async def test_operations(self):
+        responses = await self.ask({"id": 1, "op": "evaluate", "expression": "2 × 3 + 1"}, {"id": 2, "op": "evaluate", "expression": "tan(90)", "degrees": True},
+                                   {"id": 3, "op": "evaluate", "expression": "9^9^9"}, {"id": 4, "op": "convert", "category": "Length", "from": "feet", "to": "in", "value": 2},
+                                   {"id": 5, "op": "convert", "category": "Length", "from": "ft", "to": "parsnips", "value": "1"}, {"id": 6, "op": "ping"})
+        self.assertEqual(responses, [{"id": 1, "ok": True, "result": "7"}, {"id": 2, "ok": False, "error": "Error"}, {"id": 3, "ok": False, "error": "Overflow"},
+                                     {"id": 4, "ok": True, "result": "24"}, {"id": 5, "ok": False, "error": "Unknown unit"}, {"id": 6, "ok": True, "result": "pong"}])
+
+    async def test_bad_requests_keep_the_connection(self):
+        responses = await self.ask(b"not json\n", {"id": 7, "op": "divide"}, {"id": 8, "op": "evaluate"}, {"id": 9, "op": "ping"})
+        self.assertEqual([(response["id"], response["ok"]) for response in responses], [(None, False), (7, False), (8, False), (9, True)])
+        self.assertEqual(responses[1]["error"], "unknown op 'divide'")
+
+    async def test_history_appends_are_batched(self):
+        requests = [{"id": i, "op": "evaluate", "expression": f"{i}+1", "record": True} for i in range(20)] + [{"id": 20, "op": "history_append", "expression": "x", "result": "Error"}]
+        self.assertTrue(all(response["ok"] for response in await self.ask(*requests)))
+        self.assertLess(self.service.history.batches, 21)
+        store = HistoryStore(self.history_file); self.addCleanup(store.close)
+        self.assertEqual(sorted(str(record) for record in store.tail_records(50)), sorted([f"{i}+1={i + 1}" for i in range(20)] + ["x=Error"]))
+
+    async def test_pipelined_requests_are_batched_and_answered_in_order(self):
+        responses = await self.ask(*({"id": i, "op": "evaluate", "expression": f"{i}*2"} for i in range(200)))
+        self.assertEqual([response["result"] for response in responses], [str(i * 2) for i in range(200)])
+        self.assertLess(self.service.evaluations.batches, 200)
+
+    async def test_backpressure(self):
+        self.service._admission = asyncio.Semaphore(4) # Far fewer than the client keeps in flight
+        report = await calc_service.load_test(self.open_connection, connections=3, requests=600, depth=50)
+        self.assertEqual((report["requests"], report["errors"]), (600, 0))
+        self.assertEqual(self.service.requests, 600)
+        self.assertGreater(report["p99_us"], 0)
+
+    async def test_client_that_stops_reading_stops_being_read(self):
+        asyncio.get_running_loop().set_debug(False) # Debug mode's per-callback checks make 5000 round trips take seconds
+        writers = []; send_responses = self.service._send_responses
+        async def with_small_buffers(responses, writer): # Saturates after a few KB instead of the kernel's megabytes
+            writer.get_extra_info("socket").setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 4096)
+            writer.transport.set_write_buffer_limits(high=4096); writers.append(writer)
+            await send_responses(responses, writer)
+        self.service._send_responses = with_small_buffers; self.service.MAX_IN_FLIGHT = 64 # Per-connection response queue
+        sock = socket.socket(); sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096); sock.setblocking(False)
+        await asyncio.get_running_loop().sock_connect(sock, self.service.address[:2])
+        reader, writer = await asyncio.open_connection(sock=sock)
+        writer.write(b'{"op": "ping"}\n' * 5000) # Then not read until the server stalls
+        read = -1; stable = 0
+        while stable < 3:
+            await asyncio.sleep(0.05)
+            stable = stable + 1 if self.service.requests == read else 0; read = self.service.requests
+        self.assertLess(read, 5000)
+        self.assertLessEqual(writers[0].transport.get_write_buffer_size(), 4096 + 64) # At most one response past the high-water mark
+        self.assertEqual([json.loads(await reader.readline())["result"] for _ in range(5000)], ["pong"] * 5000)
+        writer.close()
+
+    async def test_internal_errors_fail_only_their_request(self):
+        async def broken(items): raise sqlite3.OperationalError("database is locked")
+        async def broken_pool(items): raise BrokenProcessPool("a worker died")
+        self.service.history.process = broken; self.service.evaluations.process = broken_pool
+        responses = await self.ask({"id": 1, "op": "history_append", "expression": "1+1", "result": "2"},
+                                   {"id": 2, "op": "evaluate", "expression": "1+1"}, {"id": 3, "op": "ping"})
+        self.assertEqual([(response["id"], response["ok"]) for response in responses], [(1, False), (2, False), (3, True)])
+        self.assertEqual(responses[0]["error"], "internal error: OperationalError: database is locked")
+
+class TestCalcServiceWithWorkers(TestCalcService):
+    workers = 2
+
+    async def test_broken_pool_is_replaced(self):
+        pool = self.service._pool
+        with self.assertRaises(BrokenProcessPool): await asyncio.wrap_future(pool.submit(os._exit, 1)) # Kills a worker
+        first, second = await self.ask({"id": 1, "op": "evaluate", "expression": "2+2"}), await self.ask({"id": 2, "op": "evaluate", "expression": "2+2"})
+        self.assertEqual((first[0]["ok"], second[0]), (False, {"id": 2, "ok": True, "result": "4"}))
+        self.assertIsNot(self.service._pool, pool)
+
+    async def test_unix_socket(self):
+        path = os.path.join(self.directory, "calc.sock")
+        service = calc_service.CalculatorService(1, self.history_file); await service.start(unix_path=path)
+        try:
+            reader, writer = await asyncio.open_unix_connection(path)
+            writer.write(b'{"id": 1, "op": "evaluate", "expression": "sqrt(16)"}\n')
+            self.assertEqual(json.loads(await reader.readline()), {"id": 1, "ok": True, "result": "4.0"})
+            writer.close()
+        finally:
+            await service.close()
+
+if __name__ == '__main__':
+    unittest.main()
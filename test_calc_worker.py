@@ -0,0 +1,63 @@
+import unittest
+import math
+import time
+from calc_engine import ExpressionEngine
+from calc_worker import EvaluationWorker, evaluate_job
+
+def wait_for(worker, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        outcome = worker.poll()
+        if outcome is not None: return outcome
+        time.sleep(0.01)
+    raise AssertionError("worker did not finish")
+
+class TestEvaluationWorker(unittest.TestCase):
+
+    def setUp(self):
+        self.worker = EvaluationWorker(time_budget=1.0)
+
+    def tearDown(self):
+        self.worker.shutdown()
+
+    def test_evaluate_job(self):
+        engine = ExpressionEngine()
+        self.assertEqual(evaluate_job(engine, ("2**10", False, None, None)), (1024, "1024"))
+        self.assertEqual(evaluate_job(engine, ("3", False, None, 2)), (9, "9"))
+        self.assertAlmostEqual(evaluate_job(engine, ("30", True, "sin", None))[0], 0.5)
+
+    def test_result_is_posted_back(self):
+        self.worker.submit(("2**100", False, None, None))
+        self.assertTrue(self.worker.busy)
+        self.assertEqual(wait_for(self.worker), ("ok", 2**100, str(2**100)))
+        self.assertFalse(self.worker.busy)
+
+    def test_definitions_are_sent_with_the_job(self):
+        self.worker.submit(("area(r)*2", False, None, None), ["r=3", "area(r)=π*r**2"])
+        self.assertEqual(wait_for(self.worker)[1], math.pi * 18)
+        self.worker.submit(("r**3", False, None, 2), ["r=2"]) # Changed definitions are rebuilt
+        self.assertEqual(wait_for(self.worker), ("ok", 64, "64"))
+        self.worker.submit(("r", False, None, None))
+        self.assertEqual(wait_for(self.worker), ("error", "NameError"))
+
+    def test_errors_are_reported(self):
+        self.worker.submit(("1/0", False, None, None))
+        self.assertEqual(wait_for(self.worker), ("error", "ZeroDivisionError"))
+
+    def test_time_budget(self):
+        self.worker.time_budget = 0 # Spawning the worker alone takes longer than this
+        self.worker.submit(("2**100", False, None, None))
+        self.assertEqual(self.worker.poll(), ("timeout",))
+        self.assertFalse(self.worker.busy)
+        self.worker.time_budget = 30
+        self.worker.submit(("1+1", False, None, None)) # A fresh worker replaces the killed one
+        self.assertEqual(wait_for(self.worker), ("ok", 2, "2"))
+
+    def test_cancel(self):
+        self.worker.submit(("2**100", False, None, None))
+        self.worker.cancel()
+        self.assertFalse(self.worker.busy)
+        self.assertIsNone(self.worker.poll())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,54 +1,147 @@
 import unittest
 import tkinter as tk
 from tkinter import ttk # Import ttk for style checks
+from calc_core import CalculatorCore
+from test_support import FakeView
 from calculator import Calculator # Assuming Calculator class is in calculator.py
 import collections
+import math
 import os   # For file operations in tests
 import json # For creating test settings files
+import shutil
+import tempfile
+import time
 
 class TestCalculatorMemoryFunctions(unittest.TestCase):
     # This test class is for the *original* single-slot memory system.
     # It has been commented out as the memory system was replaced.
     pass
 
-class TestCalculatorAdvancedFeatures(unittest.TestCase):
+class StateDirectoryMixin:
+    # Each test gets its own settings and history files, so tests can run in parallel (pytest -n)
+    def make_state_directory(self):
+        self.directory = tempfile.mkdtemp()
+        self.settings_file = os.path.join(self.directory, "calc_settings.json")
+        self.history_file = os.path.join(self.directory, "calc_history.sqlite3")
+        self.addCleanup(shutil.rmtree, self.directory, True)
+
+    def reopen(self):
+        """A second calculator on the same files, as after a restart."""
+        self.calc.settings_store.flush()
+        other = CalculatorCore(FakeView(), self.settings_file, self.history_file)
+        self.addCleanup(other.close)
+        return other
+
+class TestCalculatorAdvancedFeatures(StateDirectoryMixin, unittest.TestCase):
+    # Keypad, memory, history, settings and unit logic, against the in-memory view (no display needed)
 
     def setUp(self):
-        self.root = tk.Tk()
-        self.root.withdraw()
-        if os.path.exists(Calculator.SETTINGS_FILE):
-            os.remove(Calculator.SETTINGS_FILE)
-        self.calc = Calculator(self.root)
+        self.make_state_directory()
+        self.view = FakeView()
+        self.calc = CalculatorCore(self.view, self.settings_file, self.history_file)
 
     def tearDown(self):
-        if self.calc.history_window and self.calc.history_window.winfo_exists():
-            self.calc.on_close_history_window() # Use the proper close method
-        if self.calc.unit_conversion_window and self.calc.unit_conversion_window.winfo_exists():
-            self.calc.on_close_uc_window() # Use the proper close method for UC window
-        self.root.destroy()
-        if os.path.exists(Calculator.SETTINGS_FILE):
-            os.remove(Calculator.SETTINGS_FILE)
+        self.calc.close()
 
-    def test_history_population_and_recall(self):
+    def test_history_population(self):
         self.calc.expression = "2+3"; self.calc.calculate()
         self.calc.expression = "10-4"; self.calc.calculate()
-        self.assertEqual(list(self.calc.history), ["2+3=5", "10-4=6"])
-
-        self.calc.toggle_history_window()
-        self.assertIsNotNone(self.calc.history_listbox)
-        self.assertEqual(self.calc.history_listbox.size(), 2)
-
-        self.calc.history_listbox.selection_set(0) 
-        self.calc.recall_history_item(None) 
-        self.assertEqual(self.calc.expression, "5")
-        self.assertEqual(self.calc.result_var.get(), "5")
-
-        self.calc.history_listbox.selection_clear(0, tk.END)
-        self.calc.history_listbox.selection_set(1)
-        self.calc.recall_history_item(None)
-        self.assertEqual(self.calc.expression, "6")
-        self.assertEqual(self.calc.result_var.get(), "6")
-        self.calc.toggle_history_window()
+        self.assertEqual(list(map(str, self.calc.history)), ["2+3=5", "10-4=6"])
+
+    def test_history_records_keep_value_and_angle_mode(self):
+        self.calc.button_click("Rad") # Switches to degrees
+        self.calc.expression = "2**100/2**99"; self.calc.calculate()
+        record = self.calc.history[-1]
+        self.assertEqual((record.expression, record.value, record.degree_mode), ("2**100/2**99", 2.0, True))
+        self.assertIsNotNone(record.timestamp)
+        calc2 = self.reopen()
+        self.assertEqual((calc2.history[-1].value, calc2.history[-1].degree_mode), (2.0, True))
+
+    def test_angle_mode_key_toggles_both_ways(self):
+        self.calc.button_click("Rad")
+        self.assertEqual((self.calc.degree_mode, self.calc.result_var.get(), self.calc.angle_mode_text), (True, "Mode: Deg", "Deg"))
+        self.calc.button_click("Deg")
+        self.assertEqual((self.calc.degree_mode, self.calc.result_var.get(), self.calc.expression), (False, "Mode: Rad", ""))
+
+    def test_keypad_edits_whole_tokens(self):
+        for key in ["1", "2", "^", "*", "3"]: self.calc.button_click(key) # "*" after "**" is refused
+        self.assertEqual((self.calc.expression, self.calc.result_var.get()), ("12**3", "12**3"))
+        self.calc.button_click("Del"); self.calc.button_click("Del") # The second press removes "**"
+        self.assertEqual(self.calc.expression, "12")
+        self.calc.button_click("*"); self.calc.button_click("*")
+        self.assertEqual((self.calc.expression, self.calc.buffer.last), ("12**", "**"))
+        self.calc.button_click("="); self.assertEqual(self.calc.result_var.get(), "Error")
+
+    def test_key_bursts_update_the_display_once(self):
+        shown = []; set_display = self.calc.result_var.set
+        self.calc.result_var.set = lambda value: (shown.append(value), set_display(value))
+        for char, keysym in [("1", "1"), ("2", "2"), ("+", "plus"), ("", "Shift_L"), ("3", "3"), ("\x08", "BackSpace"), ("4", "4")]:
+            self.calc.handle_keypress(type("Event", (), {"char": char, "keysym": keysym})())
+        self.assertEqual(shown, []) # Queued until the idle cycle
+        self.calc._drain_input()
+        self.assertEqual(shown, ["12+4"])
+        for char, keysym in [("+", "plus"), ("\r", "Return"), ("5", "5")]:
+            self.calc.handle_keypress(type("Event", (), {"char": char, "keysym": keysym})())
+        self.calc._drain_input()
+        self.assertEqual(shown[1:], ["12+4+", "Error", "12+4+5"]) # "=" sees the typed text first
+
+    def test_paste(self):
+        self.assertTrue(self.calc.paste_expression(" 12 × (3+4)^2\n"))
+        self.assertEqual((self.calc.expression, self.calc.result_var.get()), ("12*(3+4)**2", "12*(3+4)**2"))
+        for bad in ["", "12;3", "import os", "1,5"]: self.assertFalse(self.calc.paste_expression(bad))
+        self.assertEqual((self.calc.expression, self.view.bells), ("12*(3+4)**2", 4))
+        self.calc.button_click("="); self.assertEqual(self.calc.result_var.get(), "588")
+        self.calc.clear()
+        self.calc.handle_keypress(type("Event", (), {"char": "2", "keysym": "2"})())
+        self.view.clipboard = "*sqrt(9)"; self.calc.on_paste() # Applied after the keys queued before it
+        self.view.run_pending() # The idle cycle
+        self.assertEqual(self.calc.expression, "2*sqrt(9)")
+
+    def test_live_preview(self):
+        self.assertFalse(self.calc.live_preview)
+        self.calc.toggle_live_preview()
+        for key in ["2", "+", "3", "*", "4"]: self.calc.button_click(key)
+        self.calc._update_preview() # Normally run by the throttle timer
+        self.assertEqual(self.calc.preview_var.get(), "= 14")
+        self.calc.button_click("*"); self.calc._update_preview()
+        self.assertEqual(self.calc.preview_var.get(), "= 14") # A trailing operator is ignored
+        self.calc.button_click("Del"); self.calc.button_click("="); self.calc._update_preview()
+        self.assertEqual(self.calc.preview_var.get(), "") # Nothing to add to a plain number
+        self.assertTrue(self.reopen().live_preview)
+        self.calc.toggle_live_preview()
+        self.assertEqual(self.calc.preview_var.get(), "")
+
+    def test_instrumentation_is_opt_in(self):
+        from instrumentation import Instrumentation
+        self.assertFalse(set(CalculatorCore.INSTRUMENTED_METHODS) & set(vars(self.calc))) # No wrappers unless enabled
+        instrumentation = Instrumentation()
+        self.calc.instrument(instrumentation)
+        for key in ["2", "+", "3", "="]: self.calc.button_click(key)
+        self.calc.toggle_theme()
+        self.calc.settings_store.flush()
+        stats = instrumentation.snapshot()
+        self.assertEqual(stats["operations"]["button_click"]["count"], 4)
+        self.assertEqual((stats["operations"]["calculate"]["count"], stats["operations"]["apply_theme"]["count"]), (1, 1))
+        self.assertEqual(stats["counters"]["history"]["writes"], 1)
+        self.assertEqual(stats["counters"]["settings"]["writes"], 1)
+
+    def test_huge_power_is_refused_up_front(self):
+        self.calc.expression = "9**9**9"; self.calc.calculate()
+        self.assertEqual(self.calc.result_var.get(), "Overflow")
+        self.assertIsNone(self.calc._pending_evaluation)
+        self.calc.expression = "2**10000"; self.calc.apply_power(3)
+        self.assertEqual(self.calc.result_var.get(), "Overflow")
+
+    def test_long_evaluation_is_computed_off_the_ui_thread_and_cancellable(self):
+        self.calc.expression = "2**5000*3"; self.calc.calculate()
+        self.assertEqual(self.calc.result_var.get(), "Computing…")
+        self.calc.button_click("5") # Ignored while computing
+        self.assertEqual(self.calc.expression, "2**5000*3")
+        event = type("Event", (), {"char": "\x1b", "keysym": "Escape"})()
+        self.calc.handle_keypress(event)
+        self.assertIsNone(self.calc._pending_evaluation)
+        self.assertEqual(self.calc.result_var.get(), "0")
+        self.assertFalse(self.calc.evaluator.busy)
 
     def test_theme_switching(self):
         self.assertEqual(self.calc.current_theme_name, "Light")
@@ -57,27 +150,11 @@ class TestCalculatorAdvancedFeatures(unittest.TestCase):
         self.calc.toggle_theme()
         self.assertEqual(self.calc.current_theme_name, "Light")
 
-    def test_theme_colors_applied_basic(self):
-        self.calc.toggle_theme() # To Dark
-        dark_colors = self.calc.themes["Dark"]
-        self.assertEqual(self.calc.style.lookup("TFrame", "background"), dark_colors["bg"])
-        self.assertEqual(self.calc.style.lookup(self.calc.display_label.cget("style") or "Display.TLabel", "background"), dark_colors["display_bg"])
-        self.assertEqual(self.calc.style.lookup("Num.TButton", "background"), dark_colors["button_bg"])
-
-        self.calc.toggle_theme() # Back to Light
-        light_colors = self.calc.themes["Light"]
-        self.assertEqual(self.calc.style.lookup("TFrame", "background"), light_colors["bg"])
-        self.assertEqual(self.calc.style.lookup(self.calc.display_label.cget("style") or "Display.TLabel", "background"), light_colors["display_bg"])
-        self.assertEqual(self.calc.style.lookup("Num.TButton", "background"), light_colors["button_bg"])
-
     def test_save_load_theme_setting(self):
-        self.calc.toggle_theme() 
+        self.calc.toggle_theme()
         self.assertEqual(self.calc.current_theme_name, "Dark")
-        
-        calc2_root = tk.Tk(); calc2_root.withdraw()
-        calc2 = Calculator(calc2_root)
+        calc2 = self.reopen()
         self.assertEqual(calc2.current_theme_name, "Dark")
-        calc2_root.destroy()
 
     def test_load_settings_no_file(self):
         self.assertEqual(self.calc.current_theme_name, "Light")
@@ -86,42 +163,47 @@ class TestCalculatorAdvancedFeatures(unittest.TestCase):
         self.assertEqual(self.calc.active_memory_slot_index, 0)
 
     def test_load_settings_corrupt_json(self):
-        with open(Calculator.SETTINGS_FILE, "w") as f: f.write("this is not json")
-        new_root = tk.Tk(); new_root.withdraw()
-        calc_corrupt = Calculator(new_root)
+        with open(self.settings_file, "w") as f: f.write("this is not json")
+        calc_corrupt = self.reopen()
         self.assertEqual(calc_corrupt.current_theme_name, "Light")
         self.assertEqual(len(calc_corrupt.history), 0)
         self.assertEqual(calc_corrupt.memory_slots, [0.0] * Calculator.NUM_MEMORY_SLOTS)
-        new_root.destroy()
 
     def test_load_settings_missing_keys(self):
         settings_data = {"some_other_key": "value"}
-        with open(Calculator.SETTINGS_FILE, "w") as f: json.dump(settings_data, f)
-        new_root = tk.Tk(); new_root.withdraw()
-        calc_missing_keys = Calculator(new_root)
+        with open(self.settings_file, "w") as f: json.dump(settings_data, f)
+        calc_missing_keys = self.reopen()
         self.assertEqual(calc_missing_keys.current_theme_name, "Light")
         self.assertEqual(len(calc_missing_keys.history), 0)
         self.assertEqual(calc_missing_keys.memory_slots, [0.0] * Calculator.NUM_MEMORY_SLOTS)
-        new_root.destroy()
 
     def test_save_load_history(self):
         self.calc.expression = "1+1"; self.calc.calculate()
         self.calc.expression = "2+2"; self.calc.calculate()
         expected_history = ["1+1=2", "2+2=4"]
-        self.assertEqual(list(self.calc.history), expected_history)
-
-        calc2_root = tk.Tk(); calc2_root.withdraw()
-        calc2 = Calculator(calc2_root)
-        self.assertEqual(list(calc2.history), expected_history)
-        calc2_root.destroy()
+        self.assertEqual(list(map(str, self.calc.history)), expected_history)
+        calc2 = self.reopen()
+        self.assertEqual(list(map(str, calc2.history)), expected_history)
+
+    def test_legacy_history_is_migrated(self):
+        self.calc.close(); os.remove(self.history_file)
+        with open(self.settings_file, "w") as f: json.dump({"theme": "Dark", "history": ["1+1=2", "2*3=6"]}, f)
+        self.calc = CalculatorCore(FakeView(), self.settings_file, self.history_file)
+        self.assertEqual(list(map(str, self.calc.history)), ["1+1=2", "2*3=6"])
+        self.assertEqual(self.calc.history_store.count(), 2)
+        self.calc.settings_store.flush()
+        with open(self.settings_file) as f: self.assertNotIn("history", json.load(f))
+
+    def test_history_is_not_stored_in_settings(self):
+        self.calc.expression = "1+1"; self.calc.calculate()
+        self.calc.toggle_theme(); self.calc.settings_store.flush()
+        with open(self.settings_file) as f: self.assertNotIn("history", json.load(f))
 
     def test_save_load_empty_history(self):
-        self.calc.save_settings() 
-        calc2_root = tk.Tk(); calc2_root.withdraw()
-        calc2 = Calculator(calc2_root)
+        self.calc.save_settings()
+        calc2 = self.reopen()
         self.assertEqual(len(calc2.history), 0)
         self.assertEqual(calc2.current_theme_name, "Light")
-        calc2_root.destroy()
 
     def test_initial_memory_state(self):
         self.assertEqual(len(self.calc.memory_slots), Calculator.NUM_MEMORY_SLOTS)
@@ -133,7 +215,7 @@ class TestCalculatorAdvancedFeatures(unittest.TestCase):
     def test_ms_mr_mc_mac_per_slot(self):
         self.calc.expression = "10"; self.calc.button_click("MS")
         self.assertEqual(self.calc.memory_slots[0], 10.0)
-        self.calc.button_click("MNext") 
+        self.calc.button_click("MNext")
         self.calc.expression = "20"; self.calc.button_click("MS")
         self.assertEqual(self.calc.memory_slots[1], 20.0)
         self.calc.button_click("MR"); self.assertEqual(self.calc.expression, "20.0")
@@ -145,14 +227,14 @@ class TestCalculatorAdvancedFeatures(unittest.TestCase):
         self.calc.expression = "10"; self.calc.button_click("MS")
         self.calc.expression = "5"; self.calc.button_click("M+")
         self.assertEqual(self.calc.memory_slots[0], 15.0)
-        self.calc.button_click("MNext") 
+        self.calc.button_click("MNext")
         self.calc.expression = "30"; self.calc.button_click("MS")
         self.calc.expression = "7"; self.calc.button_click("M-")
         self.assertEqual(self.calc.memory_slots[1], 23.0)
         self.assertEqual(self.calc.memory_slots[0], 15.0)
 
     def test_mnext_cycling(self):
-        for i in range(Calculator.NUM_MEMORY_SLOTS * 2): 
+        for i in range(Calculator.NUM_MEMORY_SLOTS * 2):
             expected_index = i % Calculator.NUM_MEMORY_SLOTS
             self.assertEqual(self.calc.active_memory_slot_index, expected_index)
             self.assertEqual(self.calc.memory_slot_display_var.get(), f"M{expected_index + 1}")
@@ -162,119 +244,352 @@ class TestCalculatorAdvancedFeatures(unittest.TestCase):
         self.calc.memory_slots[0] = 11.0; self.calc.memory_slots[1] = 22.0
         self.calc.active_memory_slot_index = 1; self.calc.memory_slot_display_var.set("M2")
         self.calc.save_settings()
-
-        calc2_root = tk.Tk(); calc2_root.withdraw()
-        calc2 = Calculator(calc2_root)
+        calc2 = self.reopen()
         self.assertEqual(calc2.memory_slots[:2], [11.0, 22.0])
         self.assertEqual(calc2.active_memory_slot_index, 1)
         self.assertEqual(calc2.memory_slot_display_var.get(), "M2")
-        calc2_root.destroy()
+
+    def test_direct_register_addressing(self):
+        self.calc.register_count = 300; self.calc.save_settings()
+        self.calc = self.reopen()
+        self.assertEqual(len(self.calc.memory_slots), 300)
+        self.calc.expression = "6*7"
+        for key in ["STO", "2", "5", "0", "="]: self.calc.button_click(key)
+        self.assertEqual((self.calc.memory_slots[249], self.calc.memory_slot_display_var.get()), (42.0, "M250"))
+        for key in ["RCL", "9", "Del", "3", "1", "="]: self.calc.button_click(key)
+        self.assertEqual((self.calc.active_memory_slot_index, self.calc.expression), (30, "0.0"))
+        self.calc.expression = "5"; self.calc.result_var.set("5")
+        for key in ["STO", "9", "9", "9"]: self.calc.button_click(key)
+        self.assertEqual(self.calc.result_var.get(), "STO 999_")
+        self.calc.button_click("="); self.assertEqual(self.calc.view.bells, 1) # Only 300 registers
+        self.calc.button_click("RCL"); self.calc.button_click("C")
+        self.assertEqual((self.calc.result_var.get(), self.calc.expression), ("5", "5"))
+        self.calc.expression = "10**400"; self.calc.button_click("MS")
+        self.assertEqual(self.calc.result_var.get(), "Overflow")
+
+    def test_registers_are_written_in_place_and_survive_a_count_change(self):
+        self.calc.expression = "3"; self.calc.button_click("MS")
+        self.calc.button_click("MNext"); self.calc.expression = "4"; self.calc.button_click("MS")
+        self.assertFalse(self.calc.settings_store.dirty) # Memory keys no longer rewrite the settings file
+        self.assertEqual(self.calc.memory_slots.bytes_written, 52 + 12 + 8) # New file, then the active register, then one register
+        self.calc.register_count = 1; self.calc.save_settings()
+        small = self.reopen()
+        self.assertEqual((small.memory_slots, small.active_memory_slot_index), ([3.0], 0))
+        small.register_count = None; small.save_settings()
+        self.assertEqual(self.reopen().memory_slots, [3.0, 4.0, 0.0, 0.0, 0.0])
+
+    def test_legacy_memory_slots_are_migrated(self):
+        self.calc.close()
+        with open(self.settings_file, "w") as f: json.dump({"memory_slots": [1.5, 2, 10**400], "active_memory_slot_index": 1}, f)
+        self.calc = CalculatorCore(FakeView(), self.settings_file, self.history_file)
+        self.assertEqual((self.calc.memory_slots, self.calc.active_memory_slot_index), ([1.5, 2.0, 0.0, 0.0, 0.0], 1))
+        self.calc.settings_store.flush()
+        with open(self.settings_file) as f: self.assertNotIn("memory_slots", json.load(f))
+        self.assertEqual(self.reopen().memory_slots[:2], [1.5, 2.0])
+
+    def define(self, *texts):
+        for text in texts: self.calc.enter_definition(text)
+
+    def test_definitions_are_defined_and_evaluated(self):
+        self.assertEqual(self.calc.enter_definition("r = 3"), "r = 3")
+        self.assertEqual(self.calc.enter_definition("area(r) = π×r^2"), "Defined area()")
+        self.assertEqual(self.calc.enter_definition("a = area(r)"), f"a = {math.pi * 9}")
+        self.assertEqual(self.calc.enter_definition("area(2) ÷ 2"), str(math.pi * 2))
+
+    def test_circular_definitions_are_refused(self):
+        self.define("r = 3", "a = r*2")
+        self.assertTrue(self.calc.enter_definition("r = a").startswith("Error"))
+        self.assertEqual(self.calc.definitions.value("r"), 3)
+
+    def test_definitions_follow_the_angle_mode(self):
+        self.calc.button_click(self.calc.angle_mode_text); self.calc.enter_definition("t = sin(90)")
+        self.assertEqual(self.calc.definition_rows()[-1], ("t", "t=sin(90)   → 1.0"))
+
+    def test_used_definitions_are_evaluated_by_equals(self):
+        self.define("r = 3", "area(r) = π×r^2", "a = area(r)")
+        self.calc.use_definition("a")
+        self.assertEqual(self.calc.result_var.get(), "a")
+        self.calc.button_click("+"); self.calc.button_click("1"); self.calc.button_click("=")
+        self.assertEqual(self.calc.result_var.get(), str(math.pi * 9 + 1))
+        self.calc.use_definition("area"); self.calc.button_click("2"); self.calc.button_click(")"); self.calc.button_click("*"); self.calc.use_definition("r")
+        self.assertEqual(self.calc.result_var.get(), "area(2)*r")
+        self.calc.button_click("=")
+        self.assertEqual(self.calc.result_var.get(), str(math.pi * 4 * 3))
+
+    def test_pasted_definitions(self):
+        self.define("r = 3")
+        self.assertTrue(self.calc.paste_expression("r × 2")); self.calc.button_click("=")
+        self.assertEqual(self.calc.result_var.get(), "6")
+        self.assertFalse(self.calc.paste_expression("nope(3)"))
+
+    def test_preview_follows_redefinition(self):
+        self.define("r = 3")
+        self.calc.paste_expression("r × 2"); self.calc._update_preview()
+        self.assertEqual(self.calc.preview_var.get(), "= 6")
+        self.calc.enter_definition("r = 5"); self.calc._update_preview()
+        self.assertEqual(self.calc.preview_var.get(), "= 10")
+
+    def test_large_definition_results_run_in_the_worker(self):
+        self.define("r = 5")
+        self.calc.paste_expression("r^3000"); self.calc.button_click("=") # Too big to run inline: the worker rebuilds the definitions
+        self.assertEqual(self.calc.result_var.get(), "Computing…")
+        self.calc.finish_evaluation()
+        self.assertEqual(self.calc.result_var.get(), str(5 ** 3000))
+
+    def test_definitions_are_removed_and_persisted(self):
+        self.define("r = 3", "area(r) = π×r^2", "a = area(r)", "t = 1")
+        self.assertIsNotNone(self.calc.remove_definition("r")) # a still uses it
+        self.assertIsNone(self.calc.remove_definition("t"))
+        calc2 = self.reopen()
+        self.assertEqual(calc2.definitions.sources(), ["r=3", "area(r)=π*r**2", "a=area(r)"])
+        self.assertEqual(calc2.definitions.value("a"), math.pi * 9)
+
+    def convert(self, category, from_unit, to_unit, value):
+        self.calc.load_unit_catalog()
+        self.calc.uc_category_var.set(category)
+        self.calc.uc_from_unit_var.set(from_unit); self.calc.uc_to_unit_var.set(to_unit)
+        self.calc.uc_input_var.set(value); self.calc.perform_unit_conversion()
+        return self.calc.uc_result_var.get()
 
     def test_length_conversions(self):
-        self.calc.toggle_unit_conversion_window()
-        self.calc.uc_category_var.set("Length")
-        self.calc.uc_from_unit_var.set("Meter (m)"); self.calc.uc_to_unit_var.set("Foot (ft)")
-        self.calc.uc_input_var.set("10"); self.calc.perform_unit_conversion()
-        self.assertAlmostEqual(float(self.calc.uc_result_var.get()), 32.8084, places=4)
-        self.calc.toggle_unit_conversion_window()
+        self.assertAlmostEqual(float(self.convert("Length", "Meter (m)", "Foot (ft)", "10")), 32.8084, places=4)
 
     def test_unit_conversion_invalid_input(self):
-        self.calc.toggle_unit_conversion_window()
-        self.calc.uc_category_var.set("Length")
-        self.calc.uc_from_unit_var.set("Meter (m)"); self.calc.uc_to_unit_var.set("Foot (ft)")
-        self.calc.uc_input_var.set("abc"); self.calc.perform_unit_conversion()
-        self.assertEqual(self.calc.uc_result_var.get(), "Invalid input value")
-        self.calc.toggle_unit_conversion_window()
+        self.assertEqual(self.convert("Length", "Meter (m)", "Foot (ft)", "abc"), "Invalid input value")
 
-    def test_update_unit_menus_logic(self):
-        self.calc.toggle_unit_conversion_window()
-        length_units = list(self.calc.conversion_factors["Length"].keys())
-        self.assertIn(self.calc.uc_from_unit_var.get(), length_units)
-        self.assertIn(self.calc.uc_to_unit_var.get(), length_units)
-        self.calc.toggle_unit_conversion_window()
+    def test_unit_catalog_is_loaded_lazily(self):
+        self.assertIsNone(self.calc.unit_catalog)
+        self.assertEqual(self.convert("Length", "feet", "in", "2"), "24") # Typed, not picked
+        self.assertIn("Pressure", self.calc.unit_categories)
+        self.assertEqual(self.convert("Length", "feet", "furlongs per fortnight", "2"), "Unknown unit")
 
     # --- Tests for New Unit Conversion Categories ---
     def test_weight_conversions(self):
-        self.calc.toggle_unit_conversion_window()
-        self.assertIsNotNone(self.calc.unit_conversion_window, "Unit conversion window should be created.")
-        
-        self.calc.uc_category_var.set("Weight")
         # Test 1: Kilograms to Grams (1 kg = 1000 g)
-        self.calc.uc_from_unit_var.set("Kilogram (kg)")
-        self.calc.uc_to_unit_var.set("Gram (g)")
-        self.calc.uc_input_var.set("1")
-        self.calc.perform_unit_conversion()
-        self.assertAlmostEqual(float(self.calc.uc_result_var.get()), 1000.0, places=4)
-
+        self.assertAlmostEqual(float(self.convert("Weight", "Kilogram (kg)", "Gram (g)", "1")), 1000.0, places=4)
         # Test 2: Kilograms to Pounds (1 kg ≈ 2.20462 lb)
-        self.calc.uc_from_unit_var.set("Kilogram (kg)")
-        self.calc.uc_to_unit_var.set("Pound (lb)")
-        self.calc.uc_input_var.set("1")
-        self.calc.perform_unit_conversion()
-        self.assertAlmostEqual(float(self.calc.uc_result_var.get()), 2.20462, places=5)
-
+        self.assertAlmostEqual(float(self.convert("Weight", "Kilogram (kg)", "Pound (lb)", "1")), 2.20462, places=5)
         # Test 3: Pounds to Ounces (1 lb = 16 oz)
-        self.calc.uc_from_unit_var.set("Pound (lb)")
-        self.calc.uc_to_unit_var.set("Ounce (oz)")
-        self.calc.uc_input_var.set("1")
-        self.calc.perform_unit_conversion()
-        self.assertAlmostEqual(float(self.calc.uc_result_var.get()), 16.0, places=4)
-        
+        self.assertAlmostEqual(float(self.convert("Weight", "Pound (lb)", "Ounce (oz)", "1")), 16.0, places=4)
         # Test 4: Grams to Kilograms (1000g = 1kg)
-        self.calc.uc_from_unit_var.set("Gram (g)")
-        self.calc.uc_to_unit_var.set("Kilogram (kg)")
-        self.calc.uc_input_var.set("1000")
-        self.calc.perform_unit_conversion()
-        self.assertAlmostEqual(float(self.calc.uc_result_var.get()), 1.0, places=4)
-
-        self.calc.toggle_unit_conversion_window() # Close window
+        self.assertAlmostEqual(float(self.convert("Weight", "Gram (g)", "Kilogram (kg)", "1000")), 1.0, places=4)
 
     def test_temperature_conversions(self):
-        self.calc.toggle_unit_conversion_window()
-        self.assertIsNotNone(self.calc.unit_conversion_window, "Unit conversion window should be created.")
+        # Celsius to Fahrenheit (0°C = 32°F; 100°C = 212°F)
+        self.assertAlmostEqual(float(self.convert("Temperature", "Celsius (°C)", "Fahrenheit (°F)", "0")), 32.00, places=2)
+        self.assertAlmostEqual(float(self.convert("Temperature", "Celsius (°C)", "Fahrenheit (°F)", "100")), 212.00, places=2)
+        # Fahrenheit to Celsius (32°F = 0°C; 212°F = 100°C)
+        self.assertAlmostEqual(float(self.convert("Temperature", "Fahrenheit (°F)", "Celsius (°C)", "32")), 0.00, places=2)
+        self.assertAlmostEqual(float(self.convert("Temperature", "Fahrenheit (°F)", "Celsius (°C)", "212")), 100.00, places=2)
+        # Celsius to Kelvin (0°C = 273.15K) and back
+        self.assertAlmostEqual(float(self.convert("Temperature", "Celsius (°C)", "Kelvin (K)", "0")), 273.15, places=2)
+        self.assertAlmostEqual(float(self.convert("Temperature", "Kelvin (K)", "Celsius (°C)", "273.15")), 0.00, places=2)
+        # Fahrenheit to Kelvin (32°F -> 273.15K) and back
+        self.assertAlmostEqual(float(self.convert("Temperature", "Fahrenheit (°F)", "Kelvin (K)", "32")), 273.15, places=2)
+        self.assertAlmostEqual(float(self.convert("Temperature", "Kelvin (K)", "Fahrenheit (°F)", "273.15")), 32.00, places=2)
+        # Same unit conversion (10°C to 10°C)
+        self.assertAlmostEqual(float(self.convert("Temperature", "Celsius (°C)", "Celsius (°C)", "10")), 10.00, places=2)
 
-        self.calc.uc_category_var.set("Temperature")
+class TestCalculatorWindow(StateDirectoryMixin, unittest.TestCase):
+    # The widgets themselves; these need a display (e.g. xvfb-run) and are skipped without one
 
-        # Celsius to Fahrenheit (0°C = 32°F; 100°C = 212°F)
-        self.calc.uc_from_unit_var.set("Celsius (°C)"); self.calc.uc_to_unit_var.set("Fahrenheit (°F)")
-        self.calc.uc_input_var.set("0"); self.calc.perform_unit_conversion()
-        self.assertAlmostEqual(float(self.calc.uc_result_var.get()), 32.00, places=2)
-        self.calc.uc_input_var.set("100"); self.calc.perform_unit_conversion()
-        self.assertAlmostEqual(float(self.calc.uc_result_var.get()), 212.00, places=2)
+    def setUp(self):
+        self.make_state_directory()
+        try: self.root = tk.Tk()
+        except tk.TclError as e: self.skipTest(f"no display: {e}")
+        self.root.withdraw()
+        self.calc = Calculator(self.root, self.settings_file, self.history_file)
 
-        # Fahrenheit to Celsius (32°F = 0°C; 212°F = 100°C)
-        self.calc.uc_from_unit_var.set("Fahrenheit (°F)"); self.calc.uc_to_unit_var.set("Celsius (°C)")
-        self.calc.uc_input_var.set("32"); self.calc.perform_unit_conversion()
-        self.assertAlmostEqual(float(self.calc.uc_result_var.get()), 0.00, places=2)
-        self.calc.uc_input_var.set("212"); self.calc.perform_unit_conversion()
-        self.assertAlmostEqual(float(self.calc.uc_result_var.get()), 100.00, places=2)
-
-        # Celsius to Kelvin (0°C = 273.15K)
-        self.calc.uc_from_unit_var.set("Celsius (°C)"); self.calc.uc_to_unit_var.set("Kelvin (K)")
-        self.calc.uc_input_var.set("0"); self.calc.perform_unit_conversion()
-        self.assertAlmostEqual(float(self.calc.uc_result_var.get()), 273.15, places=2)
-
-        # Kelvin to Celsius (273.15K = 0°C)
-        self.calc.uc_from_unit_var.set("Kelvin (K)"); self.calc.uc_to_unit_var.set("Celsius (°C)")
-        self.calc.uc_input_var.set("273.15"); self.calc.perform_unit_conversion()
-        self.assertAlmostEqual(float(self.calc.uc_result_var.get()), 0.00, places=2)
-
-        # Fahrenheit to Kelvin (32°F -> 273.15K)
-        self.calc.uc_from_unit_var.set("Fahrenheit (°F)"); self.calc.uc_to_unit_var.set("Kelvin (K)")
-        self.calc.uc_input_var.set("32"); self.calc.perform_unit_conversion()
-        self.assertAlmostEqual(float(self.calc.uc_result_var.get()), 273.15, places=2)
-        
-        # Kelvin to Fahrenheit (273.15K -> 32°F)
-        self.calc.uc_from_unit_var.set("Kelvin (K)"); self.calc.uc_to_unit_var.set("Fahrenheit (°F)")
-        self.calc.uc_input_var.set("273.15"); self.calc.perform_unit_conversion()
-        self.assertAlmostEqual(float(self.calc.uc_result_var.get()), 32.00, places=2)
+    def tearDown(self):
+        if self.calc.history_window and self.calc.history_window.winfo_exists():
+            self.calc.on_close_history_window() # Use the proper close method
+        if self.calc.unit_conversion_window and self.calc.unit_conversion_window.winfo_exists():
+            self.calc.on_close_uc_window() # Use the proper close method for UC window
+        if self.calc.plot_window: self.calc.on_close_plot_window()
+        if self.calc.definitions_window: self.calc.on_close_definitions_window()
+        self.root.destroy()
 
-        # Same unit conversion (10°C to 10°C)
-        self.calc.uc_from_unit_var.set("Celsius (°C)"); self.calc.uc_to_unit_var.set("Celsius (°C)")
+    def test_history_population_and_recall(self):
+        self.calc.expression = "2+3"; self.calc.calculate()
+        self.calc.expression = "10-4"; self.calc.calculate()
+
+        self.calc.toggle_history_window()
+        self.assertIsNotNone(self.calc.history_listbox)
+        self.assertEqual(self.calc.history_listbox.size(), 2)
+
+        self.calc.history_listbox.selection_set(0)
+        self.calc.recall_history_item(None)
+        self.assertEqual(self.calc.expression, "5")
+        self.assertEqual(self.calc.result_var.get(), "5")
+
+        self.calc.history_listbox.selection_clear(0, tk.END)
+        self.calc.history_listbox.selection_set(1)
+        self.calc.recall_history_item(None)
+        self.assertEqual(self.calc.expression, "6")
+        self.assertEqual(self.calc.result_var.get(), "6")
+        self.calc.toggle_history_window()
+
+    def test_history_recall_uses_the_stored_value(self):
+        self.calc.expression = "2**100/2**99"; self.calc.calculate()
+        self.calc.toggle_history_window()
+        self.calc.history_listbox.selection_set(0); self.calc.recall_history_item(None)
+        self.assertEqual(self.calc.expression, "2.0") # From the stored value, not the row text
+        self.calc.toggle_history_window()
+
+    def test_angle_mode_button_follows_the_mode(self):
+        self.calc.deg_rad_button.invoke()
+        self.assertEqual((self.calc.degree_mode, self.calc.deg_rad_button.cget("text")), (True, "Deg"))
+        self.calc.deg_rad_button.invoke()
+        self.assertEqual((self.calc.degree_mode, self.calc.deg_rad_button.cget("text")), (False, "Rad"))
+
+    def test_live_preview_label_is_shown_only_when_enabled(self):
+        self.assertFalse(self.calc.preview_label.winfo_manager())
+        self.calc.toggle_live_preview()
+        self.assertEqual(self.calc.preview_label.winfo_manager(), "grid")
+        self.calc.toggle_live_preview()
+
+    def test_stats_window(self):
+        from instrumentation import Instrumentation
+        self.calc.instrument(Instrumentation())
+        self.calc.button_click("2"); self.calc.button_click("=")
+        self.calc.toggle_stats_window()
+        self.assertIn("calculate", self.calc.stats_text.get("1.0", tk.END))
+        self.calc.toggle_stats_window()
+        self.assertIsNone(self.calc.stats_window)
+
+    def test_history_window_is_virtualized(self):
+        now = time.time(); self.calc.history_store.extend((f"{i}+0", str(i), now - 5000 + i) for i in range(5000)) # Recent, so retention keeps them
+        self.calc.toggle_history_window()
+        view = self.calc.history_view
+        self.assertEqual(view.total, 5000)
+        self.assertEqual(self.calc.history_listbox.size(), view.rows) # Only the visible rows exist
+        self.assertEqual(self.calc.history_listbox.get(view.rows - 1), "4999+0=4999")
+
+        self.calc.expression = "2+3"; self.calc.calculate() # Appended without a rebuild
+        self.assertEqual(view.total, 5001)
+        self.assertEqual(self.calc.history_listbox.size(), view.rows)
+        self.assertEqual(self.calc.history_listbox.get(view.rows - 1), "2+3=5")
+
+        view.on_scrollbar("moveto", "0.0") # Older rows are paged in from the store
+        self.assertEqual(self.calc.history_listbox.get(0), "0+0=0")
+        self.calc.expression = "1+1"; self.calc.calculate()
+        self.assertEqual(self.calc.history_listbox.get(0), "0+0=0") # Scrolled away from the tail: view stays put
+        self.assertEqual(view.total, 5002)
+        self.calc.toggle_history_window()
+
+    def test_history_filter(self):
+        for expression in ["2+3", "12*35", "7-2"]: self.calc.expression = expression; self.calc.calculate()
+        self.calc.toggle_history_window()
+        self.calc.history_filter_var.set("=5")
+        self.assertIsNotNone(self.calc._history_filter_job) # Debounced
+        self.calc.apply_history_filter()
+        self.assertEqual(self.calc.history_listbox.get(0, tk.END), ("2+3=5", "7-2=5"))
+        self.calc.history_filter_var.set("*35"); self.calc.apply_history_filter()
+        self.assertEqual(self.calc.history_listbox.get(0, tk.END), ("12*35=420",))
+        self.calc.history_filter_var.set(""); self.calc.apply_history_filter()
+        self.assertEqual(self.calc.history_listbox.size(), 3)
+        self.calc.toggle_history_window()
+
+    def test_theme_colors_applied_basic(self):
+        self.calc.toggle_theme() # To Dark
+        dark_colors = self.calc.themes["Dark"]
+        self.assertEqual(self.calc.style.lookup("TFrame", "background"), dark_colors["bg"])
+        self.assertEqual(self.calc.style.lookup(self.calc.display_label.cget("style") or "Display.TLabel", "background"), dark_colors["display_bg"])
+        self.assertEqual(self.calc.style.lookup("Num.TButton", "background"), dark_colors["button_bg"])
+
+        self.calc.toggle_theme() # Back to Light
+        light_colors = self.calc.themes["Light"]
+        self.assertEqual(self.calc.style.lookup("TFrame", "background"), light_colors["bg"])
+        self.assertEqual(self.calc.style.lookup(self.calc.display_label.cget("style") or "Display.TLabel", "background"), light_colors["display_bg"])
+        self.assertEqual(self.calc.style.lookup("Num.TButton", "background"), light_colors["button_bg"])
+
+    def test_button_styles_are_assigned_once_and_windows_follow_the_theme(self):
+        styles = {button.cget("text"): button.cget("style") for button in self.calc.all_button_widgets}
+        self.assertEqual((styles["7"], styles["+"], styles["MS"], styles["="], styles["sin"]), ("Num.TButton", "Op.TButton", "Mem.TButton", "Eq.TButton", "Spec.TButton"))
+        self.calc.toggle_history_window()
+        self.calc.toggle_theme() # To Dark
+        self.assertEqual(self.calc.history_listbox.cget("bg"), self.calc.themes["Dark"]["listbox_bg"])
+        self.assertEqual({button.cget("text"): button.cget("style") for button in self.calc.all_button_widgets}, styles)
+        self.calc.toggle_history_window()
+
+    def test_window_conversion(self):
+        self.calc.toggle_unit_conversion_window()
+        self.calc.uc_category_var.set("Length")
+        self.calc.uc_from_unit_var.set("Meter (m)"); self.calc.uc_to_unit_var.set("Foot (ft)")
         self.calc.uc_input_var.set("10"); self.calc.perform_unit_conversion()
-        self.assertAlmostEqual(float(self.calc.uc_result_var.get()), 10.00, places=2)
+        self.assertAlmostEqual(float(self.calc.uc_result_var.get()), 32.8084, places=4)
+        self.calc.toggle_unit_conversion_window()
 
-        self.calc.toggle_unit_conversion_window() # Close window
+    def test_batch_conversion(self):
+        self.calc.toggle_unit_conversion_window()
+        self.calc.uc_category_var.set("Temperature")
+        self.calc.uc_from_unit_var.set("Celsius (°C)"); self.calc.uc_to_unit_var.set("Fahrenheit (°F)")
+        self.calc.toggle_uc_batch_window()
+        self.calc.uc_batch_input.insert(tk.END, "0\n100\n\nwarm\n-40\n")
+        self.calc.perform_batch_conversion()
+        self.assertEqual(self.calc.uc_batch_output.get("1.0", tk.END).split(), ["32.00", "212.00", "Invalid", "Invalid", "-40.00"]) # One result per line
+        self.calc.toggle_unit_conversion_window() # Closes the batch window too
+        self.assertIsNone(self.calc.uc_batch_window)
+
+    def test_unit_catalog_is_loaded_lazily_with_type_ahead_pickers(self):
+        self.assertIsNone(self.calc.unit_catalog)
+        self.calc.toggle_unit_conversion_window()
+        self.assertIn("Pressure", self.calc.unit_categories)
+        picker = self.calc.uc_from_unit_picker
+        self.calc.filter_unit_picker(picker, "kilo")
+        self.assertEqual(tuple(picker["values"]), ("Kilometer (km)", "Kiloparsec (kpc)"))
+        self.calc.uc_from_unit_var.set("feet"); self.calc.uc_to_unit_var.set("in") # Typed, not picked
+        self.calc.uc_input_var.set("2"); self.calc.perform_unit_conversion()
+        self.assertEqual(self.calc.uc_result_var.get(), "24")
+        self.calc.uc_to_unit_var.set("furlongs per fortnight"); self.calc.perform_unit_conversion()
+        self.assertEqual(self.calc.uc_result_var.get(), "Unknown unit")
+        self.calc.toggle_unit_conversion_window()
+
+    def test_plot_window_table_and_plot(self):
+        self.calc.toggle_plot_window()
+        self.calc.plot_expression_var.set("x^2"); self.calc.plot_mode_var.set("Table"); self.calc.update_plot()
+        self.assertEqual(self.calc.plot_table.total, 41)
+        self.assertEqual(self.calc.plot_table.listbox.get(0).split(), ["-10", "100"])
+        self.calc.plot_expression_var.set("tan(x)"); self.calc.plot_mode_var.set("Plot"); self.calc.update_plot()
+        self.assertIsNone(self.calc.plot_table)
+        self.assertGreater(len(self.calc.plot_lines), 1) # Broken at the poles
+        x_min = self.calc.plot_viewport.x_min
+        self.calc.on_plot_wheel(type("Event", (), {"num": 4, "x": 0, "y": 0})()); self.calc.draw_plot()
+        self.assertEqual(self.calc.plot_viewport.x_min, x_min) # Zoomed in around the left edge
+        self.assertLess(self.calc.plot_viewport.x_max, 10)
+        self.calc.plot_expression_var.set("y+1"); self.calc.update_plot()
+        self.assertTrue(self.calc.plot_status_var.get().startswith("Error"))
+        self.calc.plot_expression_var.set("x+9^9^7"); self.calc.update_plot()
+        self.assertEqual(self.calc.plot_status_var.get(), "Overflow")
+        self.assertEqual(self.calc.plot_function.expression, "tan(x)") # Still the plotted function, so panning is safe
+        self.calc.plot_expression_var.set("(" * 500 + "x" + ")" * 500); self.calc.update_plot() # RecursionError in the parser
+        self.assertEqual(self.calc.plot_status_var.get(), "Error")
+        self.calc.toggle_plot_window()
+        self.assertIsNone(self.calc.plot_window)
+
+    def test_definitions_window(self):
+        self.calc.toggle_definitions_window()
+        for text in ("r = 2", "d = r*5"):
+            self.calc.definitions_entry_var.set(text); self.calc.submit_definition()
+        self.assertEqual(self.calc.definitions_listbox.get(0, "end"), ("r=2   → 2", "d=r*5   → 10"))
+        self.calc.definitions_entry_var.set("r = 4"); self.calc.submit_definition()
+        self.assertEqual(self.calc.definitions_listbox.get(1), "d=r*5   → 20")
+        self.calc.definitions_listbox.selection_set(1); self.calc.use_selected_definition()
+        self.assertEqual(self.calc.result_var.get(), "d")
+        self.calc.button_click("=")
+        self.assertEqual(self.calc.result_var.get(), "20")
+        self.calc.definitions_listbox.selection_clear(0, "end"); self.calc.definitions_listbox.selection_set(0)
+        self.calc.delete_selected_definition()
+        self.assertTrue(self.calc.definitions_status_var.get().startswith("Error")) # d still uses r
+        self.calc.toggle_definitions_window()
+        self.assertIsNone(self.calc.definitions_window)
+
+    def test_update_unit_menus_logic(self):
+        self.calc.toggle_unit_conversion_window()
+        length_units = self.calc.unit_catalog["Length"].labels
+        self.assertIn(self.calc.uc_from_unit_var.get(), length_units)
+        self.assertIn(self.calc.uc_to_unit_var.get(), length_units)
+        self.calc.toggle_unit_conversion_window()
 
 if __name__ == '__main__':
     unittest.main()
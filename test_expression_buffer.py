@@ -0,0 +1,36 @@
+import unittest
+from expression_buffer import ExpressionBuffer, piece_kind
+
+class TestExpressionBuffer(unittest.TestCase):
+
+    def test_pieces_and_last_token(self):
+        buffer = ExpressionBuffer("12**3+sin(4)")
+        self.assertEqual(list(buffer), ["1", "2", "**", "3", "+", "sin", "(", "4", ")"])
+        self.assertEqual((buffer.last, buffer.last_kind), (")", "rparen"))
+        buffer.pop(); buffer.pop(); buffer.pop(); buffer.pop(); buffer.pop()
+        self.assertEqual((buffer.last, buffer.last_kind), ("3", "num"))
+        buffer.pop()
+        self.assertEqual((buffer.last, buffer.last_kind), ("**", "op"))
+        self.assertEqual(ExpressionBuffer().last_kind, None)
+
+    def test_text_is_rendered_incrementally(self):
+        buffer = ExpressionBuffer()
+        for piece in "123": buffer.append(piece)
+        self.assertEqual(buffer.text, "123")
+        buffer.pop(); buffer.pop(); buffer.append("**"); buffer.append("4")
+        self.assertEqual((buffer.text, len(buffer)), ("1**4", 4))
+        buffer.pop(); buffer.pop(); buffer.pop()
+        self.assertEqual((buffer.text, len(buffer), bool(buffer)), ("", 0, False))
+        self.assertEqual(buffer.pop(), "")
+
+    def test_set(self):
+        buffer = ExpressionBuffer("2*")
+        buffer.set("1e+20")
+        self.assertEqual((buffer.text, len(buffer), buffer.last), ("1e+20", 5, "0"))
+
+    def test_piece_kinds(self):
+        self.assertEqual([piece_kind(piece) for piece in ["7", ".", "**", "-", "(", ")", "pi", "π", "%"]],
+                         ["num", "num", "op", "op", "lparen", "rparen", "name", "name", "other"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+import os
+import shutil
+import tempfile
+import time
+from history_search import parse_query, search
+from history_store import HistoryStore
+
+class TestHistorySearch(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.store = HistoryStore(os.path.join(self.directory, "history.sqlite3"))
+        day = time.mktime((2026, 10, 18, 12, 0, 0, 0, 0, -1))
+        self.store.extend([("2+3", "5", day - 86400), ("12*35", "420", day), ("100/4", "25.0", day),
+                           ("1235-1", "1234", day + 86400), ("7_x", "7", day + 86400)])
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.directory)
+
+    def expressions(self, text):
+        return [record.expression for record in self.store.records_by_ids(search(self.store, text))]
+
+    def test_parse_query(self):
+        self.assertIsNone(parse_query("  "))
+        self.assertEqual(parse_query("=5"), ("value", 5.0, 5.0))
+        self.assertEqual(parse_query("=20..-1e1"), ("value", -10.0, 20.0))
+        self.assertEqual(parse_query("2+3"), ("text", "2+3"))
+        kind, start, end = parse_query("2026-10-01..2026-10-02")
+        self.assertEqual((kind, end - start), ("time", 2 * 86400))
+        self.assertEqual(parse_query("2026-13-45"), ("text", "2026-13-45"))
+
+    def test_substring(self):
+        self.assertEqual(self.expressions("235"), ["1235-1"]) # Trigram index
+        self.assertEqual(self.expressions("*3"), ["12*35"]) # Too short for trigrams: scan
+        self.assertEqual(self.expressions("7_"), ["7_x"]) # LIKE wildcards are escaped
+        self.assertEqual(self.expressions("99"), [])
+        self.assertIsNone(search(self.store, ""))
+
+    def test_value_and_date(self):
+        self.assertEqual(self.expressions("=25"), ["100/4"])
+        self.assertEqual(self.expressions("=5..420"), ["2+3", "12*35", "100/4", "7_x"])
+        self.assertEqual(self.expressions("2026-10-18"), ["12*35", "100/4"])
+        self.assertEqual(self.expressions("2026-10-17..2026-10-18"), ["2+3", "12*35", "100/4"])
+
+    def test_index_follows_appends_and_retention(self):
+        self.store.append("4235*2", "8470")
+        self.assertEqual(self.expressions("235"), ["1235-1", "4235*2"])
+        self.store.max_entries = 1; self.store.apply_retention()
+        self.assertEqual(self.expressions("235"), ["4235*2"])
+
+    def test_limit_keeps_newest_matches_in_order(self):
+        self.assertEqual([record.expression for record in self.store.records_by_ids(search(self.store, "=5..420", limit=2))], ["100/4", "7_x"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import unittest
+import os
+import shutil
+import tempfile
+import sqlite3
+from history_store import HistoryRecord, HistoryStore, decode_result
+
+class TestHistoryStore(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "history.sqlite3")
+        self.store = HistoryStore(self.path)
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.directory)
+
+    def test_append_and_tail(self):
+        for i in range(20): self.store.append(f"{i}+1", str(i + 1), timestamp=1000 + i)
+        self.assertEqual(self.store.count(), 20)
+        self.assertEqual([str(record) for record in self.store.tail_records(3)], ["17+1=18", "18+1=19", "19+1=20"])
+
+    def test_write_counters(self):
+        self.store.append("2+3", "5")
+        self.store.extend([("π", "3.14", 100.0), ("1+1", "2", 200.0)])
+        self.assertEqual((self.store.writes, self.store.bytes_written), (2, 4 + 6 + 4))
+
+    def test_extend_is_one_write_with_optional_angle_mode(self):
+        self.store.extend([("sin(30)", "0.5", 100.0, True), ("1/0", "Error", 200.0, False), ("2+2", "4", 300.0)])
+        self.assertEqual(self.store.writes, 1)
+        self.assertEqual([(str(record), record.degree_mode) for record in self.store.tail_records(3)],
+                         [("sin(30)=0.5", True), ("1/0=Error", False), ("2+2=4", False)])
+
+    def test_extend_counts_toward_retention(self):
+        self.store.max_entries = 10
+        self.store.extend((f"{i}", f"{i}", float(i)) for i in range(HistoryStore.RETENTION_CHECK_INTERVAL))
+        self.assertEqual(self.store.count(), 10)
+
+    def test_paging_by_position(self):
+        self.assertEqual((self.store.position_count(), self.store.page_records(0, 5)), (0, []))
+        self.store.extend((f"{i}", f"{i}", float(i)) for i in range(100))
+        self.store.max_entries = 60; self.store.apply_retention()
+        self.assertEqual(self.store.position_count(), 60)
+        self.assertEqual([record.expression for record in self.store.page_records(0, 3)], ["40", "41", "42"])
+        self.assertEqual([record.expression for record in self.store.page_records(58, 10)], ["98", "99"])
+
+    def test_persists_across_instances(self):
+        self.store.append("2+3", "5")
+        self.store.close()
+        self.store = HistoryStore(self.path)
+        self.assertEqual([str(record) for record in self.store.tail_records(10)], ["2+3=5"])
+
+    def test_indexed_lookups(self):
+        self.store.extend([("2+3", "5", 100.0), ("2*3", "6", 200.0), ("10-4", "6", 300.0), ("1/0.5", "2.0", 400.0), ("3**99", "1e47", 500.0)])
+        expressions = lambda ids: [record.expression for record in self.store.records_by_ids(ids)]
+        self.assertEqual(expressions(self.store.ids_between(150, 350)), ["10-4", "2*3"]) # Newest first
+        self.assertEqual(expressions(self.store.ids_with_value(6, 6)), ["10-4", "2*3"])
+        self.assertEqual(expressions(self.store.ids_with_value(1, 5.5)), ["1/0.5", "2+3"])
+        self.assertEqual(expressions(self.store.ids_containing("2", limit=2)), ["2*3", "2+3"])
+        plan = " ".join(str(row) for row in self.store._conn.execute("EXPLAIN QUERY PLAN SELECT * FROM history WHERE value >= 1 AND value <= 2"))
+        self.assertIn("history_value", plan)
+
+    def test_non_numeric_results_are_kept(self):
+        self.store.append("(-8)**(1/3)", "(1.0000000000000002+1.7320508075688772j)")
+        self.assertEqual(self.store.count(), 1)
+        self.assertEqual(self.store.ids_with_value(1, 2), [])
+
+    def test_records_round_trip(self):
+        big = 3 ** 500
+        for record in (HistoryRecord("3**500", big, timestamp=1.0), HistoryRecord("sin(90)", 1.0, True, 2.0), HistoryRecord("1/0", None, timestamp=3.0)):
+            self.store.add(record)
+        records = self.store.tail_records(3)
+        self.assertEqual([(r.expression, r.value, r.degree_mode, r.timestamp) for r in records],
+                         [("3**500", big, False, 1.0), ("sin(90)", 1.0, True, 2.0), ("1/0", None, False, 3.0)])
+        self.assertEqual([str(r) for r in self.store.page_records(1, 5)], ["sin(90)=1.0", "1/0=Error"])
+        ids = self.store.ids_between(0.0, 4.0)
+        self.assertEqual([r.expression for r in self.store.records_by_ids(ids)], ["1/0", "sin(90)", "3**500"])
+        self.assertEqual([decode_result(t) for t in ("5", "2.5", "(1+2j)", "Error")], [5, 2.5, 1 + 2j, None])
+        with self.assertRaises(AttributeError): records[0].note = "" # __slots__
+
+    def test_version_2_file_is_migrated(self):
+        self.store.close(); os.remove(self.path)
+        conn = sqlite3.connect(self.path)
+        conn.execute("CREATE TABLE history (id INTEGER PRIMARY KEY, ts REAL NOT NULL, expression TEXT NOT NULL, result TEXT NOT NULL, value REAL)")
+        conn.execute("INSERT INTO history (ts, expression, result, value) VALUES (1.0, '2+3', '5', 5.0)")
+        conn.execute("PRAGMA user_version = 2"); conn.commit(); conn.close()
+        self.store = HistoryStore(self.path)
+        self.assertEqual(self.store._conn.execute("PRAGMA user_version").fetchone()[0], HistoryStore.SCHEMA_VERSION)
+        self.assertEqual(str(self.store.tail_records(1)[0]), "2+3=5")
+        self.assertFalse(self.store.tail_records(1)[0].degree_mode)
+
+    def test_retention_by_count_and_age(self):
+        self.store.extend((f"{i}", f"{i}", float(i)) for i in range(100))
+        self.store.max_entries = 30
+        self.assertEqual(self.store.apply_retention(), 70)
+        self.assertEqual(self.store.tail_records(1)[0].expression, "99")
+        self.store.max_entries = None; self.store.max_age_days = 1
+        self.assertEqual(self.store.apply_retention(now=86400 + 80), 10) # Drops ts < 80
+        self.assertEqual(self.store.count(), 20)
+
+if __name__ == '__main__':
+    unittest.main()
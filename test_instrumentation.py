@@ -0,0 +1,68 @@
+import unittest
+import json
+import os
+import random
+import shutil
+import tempfile
+import instrumentation
+from instrumentation import Instrumentation, LatencyHistogram
+
+class TestLatencyHistogram(unittest.TestCase):
+
+    def test_percentiles_within_bucket_resolution(self):
+        rng = random.Random(7)
+        samples = [int(rng.lognormvariate(10, 1.5)) for _ in range(20000)]
+        histogram = LatencyHistogram()
+        for ns in samples: histogram.add(ns)
+        samples.sort()
+        for fraction in (0.5, 0.95, 0.99):
+            exact = samples[round(fraction * len(samples)) - 1]
+            self.assertAlmostEqual(histogram.percentile(fraction) / exact, 1, delta=0.07)
+        self.assertEqual((histogram.count, histogram.max_ns, histogram.total_ns), (len(samples), samples[-1], sum(samples)))
+
+    def test_small_and_empty(self):
+        histogram = LatencyHistogram()
+        self.assertEqual(histogram.percentile(0.5), 0)
+        for ns in (0, 3, 7): histogram.add(ns)
+        self.assertEqual([histogram.percentile(f) for f in (0.3, 0.5, 1.0)], [0, 3, 7])
+        self.assertEqual(histogram.summary()["count"], 3)
+
+class Worker:
+    def work(self, x): return x * 2
+    def fail(self): raise ValueError("boom")
+
+class TestInstrumentation(unittest.TestCase):
+
+    def test_instrument_times_calls_on_the_instance_only(self):
+        stats = Instrumentation(); worker = Worker()
+        stats.instrument(worker, ("work", "fail"))
+        self.assertEqual(worker.work(21), 42)
+        self.assertRaises(ValueError, worker.fail) # Failures are timed and re-raised
+        self.assertNotIn("work", vars(Worker()))
+        self.assertEqual(worker.work.__name__, "work")
+        snapshot = stats.snapshot()["operations"]
+        self.assertEqual((snapshot["work"]["count"], snapshot["fail"]["count"]), (1, 1))
+
+    def test_counters_dump_and_format(self):
+        directory = tempfile.mkdtemp()
+        try:
+            stats = Instrumentation(os.path.join(directory, "stats.json"))
+            stats.histogram("save").add(1500)
+            writes = [3]
+            stats.add_counters("disk", lambda: {"writes": writes[0]})
+            writes[0] = 5 # Counters are read when the snapshot is taken
+            with open(stats.dump()) as f: data = json.load(f)
+            self.assertEqual(data["counters"], {"disk": {"writes": 5}})
+            self.assertEqual(data["operations"]["save"]["count"], 1)
+            self.assertIn("save", stats.format())
+        finally:
+            shutil.rmtree(directory)
+
+    def test_from_environment(self):
+        self.assertIsNone(instrumentation.from_environment({}))
+        self.assertIsNone(instrumentation.from_environment({"CALC_INSTRUMENT": "0"}))
+        self.assertEqual(instrumentation.from_environment({"CALC_INSTRUMENT": "1"}).dump_path, instrumentation.DEFAULT_DUMP_FILE)
+        self.assertEqual(instrumentation.from_environment({"CALC_INSTRUMENT": "run.json"}).dump_path, "run.json")
+
+if __name__ == '__main__':
+    unittest.main()
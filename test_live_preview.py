@@ -0,0 +1,64 @@
+import unittest
+import math
+import random
+from calc_definitions import Definitions
+from calc_engine import ExpressionEngine
+from expression_buffer import ExpressionBuffer
+from live_preview import PreviewEvaluator
+
+def _random_expression(rng):
+    parts = []
+    for i in range(rng.randint(1, 8)):
+        if i: parts.append(rng.choice(["+", "-", "*", "/", "**", "*-"]))
+        atom = rng.choice([str(rng.randint(0, 50)), f"{rng.randint(0, 9)}.{rng.randint(0, 99)}", "pi", "e", "2e+3"])
+        if rng.random() < 0.2: atom = rng.choice(["sin", "cos", "sqrt", "ln", "exp"]) + "(" + atom + ")"
+        if rng.random() < 0.1: atom = "√" + atom
+        if rng.random() < 0.15: atom = "(" + atom + rng.choice(["+", "*"]) + str(rng.randint(1, 9)) + ")"
+        parts.append(atom)
+    return "".join(parts)
+
+class TestPreviewEvaluator(unittest.TestCase):
+
+    def test_every_complete_prefix_matches_the_engine(self):
+        rng = random.Random(7); engine = ExpressionEngine()
+        for _ in range(300):
+            text = _random_expression(rng); degree_mode = rng.random() < 0.3
+            buffer = ExpressionBuffer(); preview = PreviewEvaluator()
+            for piece in ExpressionBuffer(text):
+                buffer.append(piece)
+                value = preview.update(buffer, degree_mode)
+                try: expected = engine.evaluate(buffer.text, degree_mode)
+                except Exception: continue # Incomplete or rejected: the preview may show the last complete part
+                self.assertEqual(value, expected, buffer.text)
+
+    def test_partial_input(self):
+        cases = {"2+3*": 5, "(1+2": 3, "2*(": 2, "2+sin(": 2, "-": None, "1/0": None, "05": None, "2(": None, ")": None, "foo": None}
+        for text, expected in cases.items():
+            self.assertEqual(PreviewEvaluator().update(ExpressionBuffer(text)), expected, text)
+        self.assertAlmostEqual(PreviewEvaluator().update(ExpressionBuffer("sin(30"), True), 0.5)
+        self.assertIsNone(PreviewEvaluator(max_bits=64).update(ExpressionBuffer("3**100")))
+
+    def test_user_definitions(self):
+        definitions = Definitions()
+        for text in ["r = 3", "area(s) = π*s^2", "h(p, q) = p+q", "big = 2^5000"]: definitions.define(text)
+        cases = {"r*2": 6, "area(2": math.pi * 4, "1+area(": 1, "area(r)+": math.pi * 9, "h(1,2)": None, "big": None, "_sin(1)": None, "rr": None}
+        for text, expected in cases.items():
+            self.assertEqual(PreviewEvaluator(names=definitions.namespace).update(ExpressionBuffer(text)), expected, text)
+
+    def test_edits_reevaluate_only_the_tail(self):
+        buffer = ExpressionBuffer("+".join(["1"] * 500)); preview = PreviewEvaluator()
+        self.assertEqual(preview.update(buffer), 500)
+        steps = preview.steps
+        buffer.append("*"); buffer.append("3")
+        self.assertEqual(preview.update(buffer), 502)
+        self.assertEqual(preview.steps - steps, 2)
+        steps = preview.steps
+        for _ in range(3): buffer.pop()
+        self.assertEqual(preview.update(buffer), 499)
+        self.assertLessEqual(preview.steps - steps, PreviewEvaluator.CHECKPOINT_INTERVAL)
+        buffer.set("7*6")
+        self.assertEqual(preview.update(buffer), 42) # Replaced text starts over
+        self.assertAlmostEqual(preview.update(ExpressionBuffer("sin(90)"), True), 1.0) # So does an angle mode change
+
+if __name__ == '__main__':
+    unittest.main()
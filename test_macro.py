@@ -0,0 +1,72 @@
+import unittest
+import os
+import shutil
+import tempfile
+import macro
+from calc_core import CalculatorCore
+from macro import KeyEvent, MacroRecorder, Step
+from test_support import FakeView
+
+class TestMacroFile(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_round_trip(self):
+        steps = [Step(0, "c", "7"), Step(15, "k", ["plus", "+"]), Step(3, "p", "2 × (3 + 4)\n"), Step(120, "c", "=")]
+        for name in ("session.macro", "session.macro.gz"):
+            path = os.path.join(self.directory, name)
+            macro.save(path, steps)
+            self.assertEqual(macro.load(path), steps)
+        with open(os.path.join(self.directory, "session.macro")) as f: self.assertEqual(f.readline(), macro.HEADER + "\n")
+
+    def test_rejects_other_files(self):
+        path = os.path.join(self.directory, "notes.txt")
+        with open(path, "w") as f: f.write("1+1\n")
+        self.assertRaises(ValueError, macro.load, path)
+
+class TestMacroReplay(unittest.TestCase):
+    # Replayed against the headless core, so no display is needed
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.settings_file = os.path.join(self.directory, "calc_settings.json")
+        self.history_file = os.path.join(self.directory, "calc_history.sqlite3")
+        self.view = FakeView()
+        self.calc = CalculatorCore(self.view, self.settings_file, self.history_file)
+
+    def tearDown(self):
+        self.calc.close()
+        shutil.rmtree(self.directory)
+
+    def test_recorded_input_replays_to_the_same_state(self):
+        recorder = MacroRecorder(); recorder.attach(self.calc)
+        for text in ["1", "2", "*", "3", "=", "MS"]: self.calc.button_click(text)
+        for keysym, char in [("plus", "+"), ("4", "4"), ("Return", "\r")]: self.calc.handle_keypress(KeyEvent(keysym, char))
+        self.calc.process_pending_input()
+        self.view.clipboard = "*2^3"; self.calc.on_paste(); self.calc.process_pending_input()
+        self.calc.button_click("=")
+        recorder.detach()
+        self.assertEqual([step.kind for step in recorder.steps], ["c"] * 6 + ["k"] * 3 + ["p", "c"])
+        expected = macro.final_state(self.calc)
+        self.assertEqual(expected["display"], "32") # MS clears the input, so "+" is refused and "4" starts afresh
+        path = os.path.join(self.directory, "session.macro"); recorder.save(path)
+
+        self.calc.close() # Replayed in a fresh directory, without the recording's settings, history or registers
+        replay_directory = os.path.join(self.directory, "replay"); os.mkdir(replay_directory)
+        self.calc = CalculatorCore(FakeView(), os.path.join(replay_directory, "calc_settings.json"), os.path.join(replay_directory, "calc_history.sqlite3"))
+        self.assertEqual(self.calc.memory_slots[0], 0.0) # So only replaying MS can store the 36
+        report = macro.replay(self.calc, macro.load(path))
+        self.assertEqual(report.state, expected)
+        self.assertEqual(report.summary()["steps"], 11)
+
+    def test_replay_waits_for_background_results(self):
+        report = macro.replay(self.calc, [Step(0, "p", "2**5000*3"), Step(0, "c", "=")])
+        self.assertEqual(report.state["display"], str(2**5000*3))
+        self.assertEqual(report.state["history_entries"], 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import unittest
+import os
+import shutil
+import tempfile
+from register_bank import HEADER, ITEM, RegisterBank
+
+class TestRegisterBank(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "calc_settings.registers")
+        self.addCleanup(shutil.rmtree, self.directory, True)
+
+    def test_behaves_like_a_list_of_floats(self):
+        bank = RegisterBank(4)
+        bank[1] = 2; bank[-1] = 0.5
+        self.assertEqual(bank, [0.0, 2.0, 0.0, 0.5]); self.assertNotEqual(bank, [0.0] * 3)
+        self.assertEqual((bank[1:], list(bank), len(bank)), ([2.0, 0.0, 0.5], [0.0, 2.0, 0.0, 0.5], 4))
+        self.assertEqual(str(bank[1]), "2.0")
+        bank[:2] = [7, 8]; self.assertEqual(bank.tolist(), [7.0, 8.0, 0.0, 0.5])
+        self.assertRaises(OverflowError, bank.__setitem__, 0, 10**400)
+        self.assertRaises(TypeError, bank.__setitem__, 0, 1j)
+        self.assertRaises(IndexError, setattr, bank, "active", 4)
+        self.assertEqual(bank.values.itemsize * len(bank), 32)
+
+    def test_only_changed_registers_are_written(self):
+        bank = RegisterBank(1000, self.path)
+        self.assertFalse(bank.load())
+        self.assertEqual(bank.flush(), 0); self.assertFalse(os.path.exists(self.path)) # Nothing to keep yet
+        bank[0] = 1.0
+        self.assertEqual(bank.flush(), HEADER.size + 1000 * ITEM) # The first write creates the whole file
+        bank[500] = 1.5; bank[501] = 2.5
+        self.assertEqual(bank.flush(), 2 * ITEM) # One run of two neighbours
+        bank.active = 7
+        self.assertEqual(bank.flush(), HEADER.size)
+        self.assertEqual(bank.flush(), 0)
+        bank.clear(); self.assertEqual(bank.flush(), 3 * ITEM) # Registers 0, 500 and 501
+        bank[3] = 9.0; bank.flush()
+        reopened = RegisterBank(1000, self.path); self.assertTrue(reopened.load())
+        self.assertEqual((reopened[3], reopened[500], reopened.active), (9.0, 0.0, 7))
+
+    def test_changing_the_count_keeps_the_registers(self):
+        bank = RegisterBank(10, self.path)
+        for i in range(10): bank[i] = i
+        bank.active = 9; bank.flush()
+        small = RegisterBank(3, self.path); small.load()
+        self.assertEqual((small.tolist(), small.active), ([0.0, 1.0, 2.0], 0))
+        small[0] = 42; small.flush()
+        large = RegisterBank(20, self.path); large.load()
+        self.assertEqual(large[:11], [42.0] + [float(i) for i in range(1, 10)] + [0.0]) # Registers 4-10 survived
+        large[19] = 1; large.flush()
+        self.assertEqual(os.path.getsize(self.path), HEADER.size + 20 * ITEM)
+
+    def test_invalid_files_are_replaced(self):
+        with open(self.path, "wb") as f: f.write(b"not registers")
+        bank = RegisterBank(5, self.path)
+        self.assertFalse(bank.load()); self.assertEqual(bank, [0.0] * 5)
+        bank[0] = 1; bank.flush()
+        self.assertTrue(RegisterBank(5, self.path).load())
+
+if __name__ == '__main__':
+    unittest.main()
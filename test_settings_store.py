@@ -0,0 +1,61 @@
+import unittest
+import json
+import os
+import shutil
+import tempfile
+import time
+from settings_store import SettingsStore
+
+class TestSettingsStore(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "calc_settings.json")
+        self.store = SettingsStore(self.path, delay=60)
+
+    def tearDown(self):
+        self.store.flush()
+        shutil.rmtree(self.directory)
+
+    def test_updates_are_coalesced_into_one_write(self):
+        for i in range(100): self.store.update({"theme": "Dark", "count": i})
+        self.assertFalse(os.path.exists(self.path))
+        self.assertTrue(self.store.dirty)
+        self.store.flush()
+        self.assertEqual(self.store.writes, 1)
+        with open(self.path) as f: self.assertEqual(json.load(f), {"theme": "Dark", "count": 99})
+        self.assertEqual(os.listdir(self.directory), ["calc_settings.json"]) # No temporary files left behind
+
+    def test_background_timer_writes(self):
+        self.store.delay = 0.01
+        self.store.update({"theme": "Dark"})
+        deadline = time.monotonic() + 5
+        while self.store.writes == 0 and time.monotonic() < deadline: time.sleep(0.01)
+        self.assertEqual(self.store.writes, 1)
+        self.assertFalse(self.store.dirty)
+
+    def test_load_sees_pending_changes(self):
+        self.assertIsNone(self.store.load())
+        self.store.update({"theme": "Dark", "memory_slots": [1.0]})
+        loaded = self.store.load()
+        self.assertEqual(loaded["theme"], "Dark")
+        loaded["memory_slots"][0] = 5.0 # The caller's copy is independent of the pending write
+        self.assertEqual(self.store.load()["memory_slots"], [1.0])
+
+    def test_flush_without_changes_does_not_write(self):
+        self.store.flush()
+        self.assertEqual(self.store.writes, 0)
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_stores_are_shared_per_path(self):
+        shared = SettingsStore.for_path(self.path)
+        self.assertIs(shared, SettingsStore.for_path(os.path.join(self.directory, ".", "calc_settings.json")))
+        self.assertIsNot(shared, SettingsStore.for_path(os.path.join(self.directory, "other.json")))
+
+    def test_replace_is_atomic(self):
+        with open(self.path, "w") as f: f.write('{"theme": "Light"}')
+        self.store.update({"theme": "Dark"}); self.store.flush()
+        with open(self.path) as f: self.assertEqual(json.load(f), {"theme": "Dark"})
+
+if __name__ == '__main__':
+    unittest.main()
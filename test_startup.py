@@ -0,0 +1,21 @@
+import unittest
+from benchmarks import bench_startup
+
+class TestStartup(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.sample = bench_startup.measure()
+
+    def test_import_defers_secondary_modules(self):
+        self.assertEqual(self.sample["deferred_modules"], [])
+
+    def test_import_within_budget(self):
+        self.assertLess(self.sample["import_cpu_ms"], bench_startup.IMPORT_BUDGET_MS)
+
+    def test_first_idle_within_budget(self):
+        if "first_idle_ms" not in self.sample: self.skipTest(self.sample.get("error", "no display"))
+        self.assertLess(self.sample["first_idle_ms"], bench_startup.FIRST_IDLE_BUDGET_MS)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+"""Test helpers: an in-memory view for driving ``CalculatorCore`` without a display."""
+
+class FakeVariable:
+    # No __slots__: tests may replace get/set on an instance, as they can on a StringVar
+
+    def __init__(self, value=""):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+    def set(self, value):
+        self.value = value
+
+class FakeView:
+    """In-memory view: variables are plain values, callbacks wait in ``pending`` and the clipboard is an attribute."""
+
+    def __init__(self, clipboard=""):
+        self.clipboard = clipboard
+        self.bells = 0
+        self.pending = {} # job id -> (delay_ms, callback), in scheduling order
+        self._next_job = 0
+
+    def variable(self, value=""):
+        return FakeVariable(value)
+
+    def after(self, ms, callback):
+        self._next_job += 1; self.pending[self._next_job] = (ms, callback)
+        return self._next_job
+
+    def after_idle(self, callback):
+        return self.after(0, callback)
+
+    def after_cancel(self, job):
+        self.pending.pop(job, None)
+
+    def bell(self):
+        self.bells += 1
+
+    def clipboard_text(self):
+        return self.clipboard
+
+    def run_pending(self):
+        """Run the callbacks scheduled so far (not the ones they schedule); returns how many ran."""
+        jobs, self.pending = self.pending, {}
+        for delay_ms, callback in jobs.values(): callback()
+        return len(jobs)
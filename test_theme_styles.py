@@ -0,0 +1,32 @@
+import unittest
+from theme_styles import THEMES, button_style, compile_theme, theme_table
+
+class TestThemeStyles(unittest.TestCase):
+
+    def test_button_style_classes(self):
+        self.assertEqual(button_style("5"), "Num.TButton")
+        self.assertEqual(button_style("^"), "Op.TButton")
+        self.assertEqual(button_style("MNext"), "Mem.TButton")
+        self.assertEqual(button_style("="), "Eq.TButton")
+        self.assertEqual(button_style("Deg"), "Spec.TButton")
+        self.assertEqual(button_style("?"), "TButton")
+
+    def test_tables_are_compiled_once(self):
+        self.assertIs(theme_table("Dark"), theme_table("Dark"))
+        self.assertIs(theme_table("No such theme"), theme_table("Light"))
+
+    def test_switch_pushes_only_changed_options(self):
+        light, dark = theme_table("Light"), theme_table("Dark")
+        delta = dark.changes_from(light)
+        self.assertEqual(delta.styles["TButton"], {"background": "#505050", "foreground": "White"}) # Font and padding are unchanged
+        self.assertEqual(delta.styles["Display.TLabel"], {"background": "#1C1C1C", "foreground": "White"})
+        self.assertEqual(delta.widgets["listbox"]["selectbackground"], "#005A9C")
+        self.assertNotIn("selectforeground", delta.widgets["listbox"])
+        self.assertIs(light.changes_from(None), light)
+
+    def test_same_theme_is_an_empty_delta(self):
+        delta = theme_table("Light").changes_from(compile_theme("Light", THEMES["Light"]))
+        self.assertEqual((delta.styles, delta.maps, delta.widgets), ({}, {}, {}))
+
+if __name__ == '__main__':
+    unittest.main()
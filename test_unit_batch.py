@@ -0,0 +1,61 @@
+import unittest
+import contextlib
+import io
+import math
+import os
+import shutil
+import tempfile
+from array import array
+import unit_batch
+
+class TestUnitBatch(unittest.TestCase):
+
+    def test_convert_array(self):
+        result = unit_batch.convert_array(array("d", [0.0, 100.0, math.nan]), 1.8, 32.0)
+        self.assertEqual(list(result[:2]), [32.0, 212.0])
+        self.assertTrue(math.isnan(result[2]))
+
+    def test_pure_python_fallback(self):
+        saved = unit_batch.numpy; unit_batch.numpy = None
+        try:
+            result = unit_batch.convert_array(array("d", [1.0, 2.0]), 3.0, 1.0)
+            self.assertIsInstance(result, array)
+            self.assertEqual(list(result), [4.0, 7.0])
+        finally: unit_batch.numpy = saved
+
+    def test_pasted_list_streams_in_chunks(self):
+        chunks = list(unit_batch.convert_stream(["1", " 2 ", "", "x", "3\n", "4", "5"], "Length", "km", "m", chunk_size=2, invalid="?"))
+        self.assertEqual(chunks, [["1000", "2000"], ["?", "?"], ["3000", "4000"], ["5000"]]) # One result per line, blank or not
+
+    def test_non_finite_values_are_invalid_in_any_chunk(self):
+        for lines in (["nan", "inf", "1"], ["nan", "inf", "x"]): # A clean chunk and one that takes the slow path
+            self.assertEqual(list(unit_batch.convert_stream(lines, "Length", "km", "m", invalid="?"))[0][:2], ["?", "?"])
+
+    def test_csv_column(self):
+        lines = ["a;1.5;b", "c;;d", "", "e;nan"]
+        chunks = list(unit_batch.convert_stream(lines, "Weight", "kg", "g", column=1, delimiter=";", invalid="Invalid"))
+        self.assertEqual(chunks, [["1500", "Invalid", "Invalid", "Invalid"]])
+
+    def test_unknown_units(self):
+        with self.assertRaises(KeyError): list(unit_batch.convert_stream(["1"], "Length", "m", "kg"))
+
+    def test_chunk_size_must_be_positive(self):
+        with self.assertRaises(SystemExit), contextlib.redirect_stderr(io.StringIO()): unit_batch.main(["Length", "m", "ft", "--chunk-size", "0"])
+        with self.assertRaises(ValueError): list(unit_batch.convert_stream(["1"], "Length", "m", "ft", chunk_size=0))
+
+    def test_cli_converts_a_file(self):
+        directory = tempfile.mkdtemp()
+        try:
+            source = os.path.join(directory, "in.csv"); destination = os.path.join(directory, "out.txt")
+            with open(source, "w") as f: f.write("name,temp\na,0\nb,37\n")
+            self.assertEqual(unit_batch.main(["Temperature", "degC", "K", source, "-o", destination, "--column", "1", "--skip-header"]), 0)
+            with open(destination) as f: self.assertEqual(f.read(), "273.15\n310.15\n")
+        finally: shutil.rmtree(directory)
+
+    def test_convert_file_counts_values(self):
+        out = io.StringIO()
+        self.assertEqual(unit_batch.convert_file(io.StringIO("1\n2\n3\n"), out, "Length", "m", "cm", chunk_size=2), 3)
+        self.assertEqual(out.getvalue(), "100\n200\n300\n")
+
+if __name__ == '__main__':
+    unittest.main()
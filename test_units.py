@@ -0,0 +1,84 @@
+import unittest
+import json
+import os
+import shutil
+import tempfile
+import units
+from units import Unit, UnitCatalog, UnitCategory, default_catalog
+
+class TestUnits(unittest.TestCase):
+
+    def test_linear_conversions(self):
+        length = default_catalog()["Length"]
+        self.assertAlmostEqual(length.convert(10, "m", "ft"), 32.8084, places=4)
+        self.assertAlmostEqual(length.convert(1, "mi", "km"), 1.60934)
+        self.assertAlmostEqual(default_catalog()["Weight"].convert(1, "lb", "oz"), 16.0, places=4)
+
+    def test_affine_temperature(self):
+        temperature = default_catalog()["Temperature"]
+        for value, from_id, to_id, expected in [(0, "degC", "degF", 32), (212, "degF", "degC", 100), (0, "degC", "K", 273.15),
+                                                (32, "degF", "K", 273.15), (273.15, "K", "degF", 32), (-40, "degC", "degF", -40)]:
+            self.assertAlmostEqual(temperature.convert(value, from_id, to_id), expected, places=9)
+
+    def test_identity_is_exact(self):
+        for name in default_catalog().names:
+            category = default_catalog()[name]
+            for unit in category.units: self.assertEqual(category.convert(0.1, unit.id, unit.id), 0.1)
+            self.assertEqual(category.coefficients(category.units[0].id, category.units[0].id), (1.0, 0.0))
+
+    def test_round_trip(self):
+        category = UnitCategory("Test", [Unit("a", "A", "a", 1.0), Unit("b", "B", "b", 3.0, 7.0)])
+        self.assertAlmostEqual(category.convert(category.convert(5.0, "a", "b"), "b", "a"), 5.0)
+        self.assertEqual(category.convert(1.0, "b", "a"), 10.0)
+
+    def test_labels_ids_and_formatting(self):
+        temperature = default_catalog()["Temperature"]
+        self.assertEqual(temperature.unit("Fahrenheit (°F)").id, "degF")
+        self.assertEqual(temperature.labels[:3], ["Celsius (°C)", "Fahrenheit (°F)", "Kelvin (K)"])
+        self.assertEqual(temperature.format(273.15), "273.15")
+        self.assertEqual(default_catalog()["Length"].format(32.80839895), "32.8084")
+        with self.assertRaises(KeyError): temperature.convert(1, "degC", "m")
+
+    def test_lookup_by_id_symbol_name_and_alias(self):
+        length = default_catalog()["Length"]
+        for text in ("ft", "Foot", "foot", "feet", " Foot (ft) "): self.assertEqual(length.unit(text).id, "ft")
+        self.assertEqual(length.unit("Mm").name, "Megameter") # Exact case wins over case-insensitive matches
+        self.assertEqual(length.unit("mm").name, "Millimeter")
+        self.assertEqual(length.unit("um").id, "µm")
+        self.assertEqual(default_catalog()["Data"].unit("b").id, "bit")
+        with self.assertRaises(KeyError): length.unit("parsnip")
+
+    def test_prefix_expansion(self):
+        data = default_catalog()["Data"]
+        self.assertEqual(data.convert(1, "MiB", "KiB"), 1024.0)
+        self.assertEqual(data.convert(8, "kbit", "B"), 1000.0)
+        self.assertEqual(default_catalog()["Length"].unit("km").scale, 1000.0) # Listed explicitly, not duplicated
+        self.assertGreater(len(default_catalog()), 300)
+
+    def test_type_ahead_search(self):
+        length = default_catalog()["Length"]
+        self.assertEqual([unit.id for unit in length.search("kilo")], ["km", "kpc"])
+        self.assertEqual([unit.id for unit in length.search("FE")], ["ft", "fm"]) # "feet", "Femtometer"
+        self.assertEqual(len(length.search("", limit=5)), 5)
+        self.assertEqual(length.search("zzz"), [])
+
+    def test_large_categories_are_not_cached_as_a_matrix(self):
+        category = UnitCategory("Big", [Unit(f"u{i}", f"Unit {i}", f"u{i}", float(i + 1)) for i in range(units.MATRIX_MAX_UNITS + 1)])
+        self.assertEqual(category.convert(3.0, "u1", "u5"), 1.0)
+        self.assertEqual(category._matrix, {})
+
+    def test_data_files_merge(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, "currency.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"categories": [{"name": "Currency", "format": ".2f", "units": [
+                    {"id": "EUR", "name": "Euro", "symbol": "€", "scale": 1},
+                    {"id": "XTS", "name": "Test dollar", "symbol": "T$", "scale": 0.5, "aliases": ["testbucks"]}]}]}, f)
+            catalog = UnitCatalog.load(path)
+            self.assertEqual(catalog["Currency"].format(catalog["Currency"].convert(10, "XTS", "EUR")), "5.00")
+            self.assertEqual(catalog["Currency"].unit("testbucks").id, "XTS")
+        finally: shutil.rmtree(directory)
+
+if __name__ == '__main__':
+    unittest.main()
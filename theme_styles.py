@@ -0,0 +1,112 @@
+"""Colour themes compiled into ttk style tables.
+
+A theme is a dict of colour roles. ``theme_table(name)`` compiles it once into
+a ``ThemeTable``: the ``style.configure`` and ``style.map`` options of every
+ttk style the calculator uses, plus the plain Tk options of its windows,
+listboxes and text boxes. ``changes_from`` keeps only what differs from the
+table applied before, so a theme switch pushes a delta instead of restyling
+every widget. Buttons get their style class once, from ``button_style``.
+"""
+
+THEMES = {
+    "Light": {
+        "bg": "#F0F0F0", "fg": "Black",
+        "display_bg": "#FFFFFF", "display_fg": "Black", "mem_slot_fg": "Black", "uc_label_fg": "Black",
+        "button_bg": "#E1E1E1", "button_fg": "Black", "button_active_bg": "#CFCFCF",
+        "operator_button_bg": "#D3D3D3", "operator_button_fg": "Black", "operator_button_active_bg": "#BEBEBE",
+        "memory_button_bg": "#CFCFCF", "memory_button_fg": "Black", "memory_button_active_bg": "#BDBDBD",
+        "equals_button_bg": "#ADD8E6", "equals_button_fg": "Black", "equals_button_active_bg": "#9CCCE0",
+        "special_button_bg": "#E1E1E1", "special_button_fg": "Black", "special_button_active_bg": "#CFCFCF",
+        "listbox_bg": "#FFFFFF", "listbox_fg": "Black", "listbox_select_bg": "#0078D7", "listbox_select_fg": "White",
+        "entry_bg": "#FFFFFF", "entry_fg": "Black", "plot_curve": "#0078D7",
+    },
+    "Dark": {
+        "bg": "#2E2E2E", "fg": "White",
+        "display_bg": "#1C1C1C", "display_fg": "White", "mem_slot_fg": "#A9A9A9", "uc_label_fg": "White",
+        "button_bg": "#505050", "button_fg": "White", "button_active_bg": "#6A6A6A",
+        "operator_button_bg": "#606060", "operator_button_fg": "White", "operator_button_active_bg": "#7A7A7A",
+        "memory_button_bg": "#5A5A5A", "memory_button_fg": "White", "memory_button_active_bg": "#707070",
+        "equals_button_bg": "#005A9C", "equals_button_fg": "White", "equals_button_active_bg": "#007ACC",
+        "special_button_bg": "#505050", "special_button_fg": "White", "special_button_active_bg": "#6A6A6A",
+        "listbox_bg": "#1C1C1C", "listbox_fg": "White", "listbox_select_bg": "#005A9C", "listbox_select_fg": "White",
+        "entry_bg": "#3C3C3C", "entry_fg": "White", "plot_curve": "#4FC3F7",
+    }
+}
+
+_BUTTON_STYLES = (
+    ("Num.TButton", ("0", "1", "2", "3", "4", "5", "6", "7", "8", "9", ".")),
+    ("Op.TButton", ("+", "-", "*", "/", "^")),
+    ("Mem.TButton", ("MS", "MR", "MC", "M+", "M-", "MNext", "MAC")),
+    ("Eq.TButton", ("=",)),
+    ("Spec.TButton", ("C", "Del", "History", "Theme", "Units", "Preview", "Plot", "Vars", "Rad", "Deg", "π", "e", "sin", "cos", "tan", "log", "ln", "exp", "√", "x²", "x³")),
+)
+_STYLE_BY_TEXT = {text: style for style, texts in _BUTTON_STYLES for text in texts}
+
+def button_style(text):
+    """The ttk style class of the keypad button labelled ``text``."""
+    return _STYLE_BY_TEXT.get(text, "TButton")
+
+def _delta(old, new):
+    delta = {}
+    for name, options in new.items():
+        previous = old.get(name, {})
+        changed = {key: value for key, value in options.items() if previous.get(key) != value}
+        if changed: delta[name] = changed
+    return delta
+
+class ThemeTable:
+    __slots__ = ("name", "styles", "maps", "widgets", "_deltas")
+
+    def __init__(self, name, styles, maps, widgets):
+        self.name = name
+        self.styles = styles # ttk style -> style.configure options
+        self.maps = maps # ttk style -> style.map options
+        self.widgets = widgets # "root", "window", "listbox", "text" -> Tk config options
+        self._deltas = {} # previous table -> its delta; themes toggle back and forth between the same pairs
+
+    def changes_from(self, previous):
+        """A ThemeTable of only the options that differ from ``previous`` (all of them when it is None)."""
+        if previous is None: return self
+        delta = self._deltas.get(previous)
+        if delta is None:
+            delta = self._deltas[previous] = ThemeTable(self.name, _delta(previous.styles, self.styles), _delta(previous.maps, self.maps),
+                                                        _delta(previous.widgets, self.widgets))
+        return delta
+
+def compile_theme(name, colors):
+    button = {"background": colors["button_bg"], "foreground": colors["button_fg"]}
+    styles = {
+        "TFrame": {"background": colors["bg"]},
+        "Display.TLabel": {"background": colors["display_bg"], "foreground": colors["display_fg"], "font": ("Arial", 30), "anchor": "e", "padding": (0, 0, 5, 0)},
+        "MemorySlot.TLabel": {"background": colors["display_bg"], "foreground": colors["mem_slot_fg"], "font": ("Arial", 12), "anchor": "w", "padding": (2, 0, 2, 0)},
+        "Preview.TLabel": {"background": colors["display_bg"], "foreground": colors["mem_slot_fg"], "font": ("Arial", 12), "anchor": "e"},
+        "UC.TLabel": {"background": colors["bg"], "foreground": colors["uc_label_fg"]},
+        "UC.TEntry": {"fieldbackground": colors["entry_bg"], "foreground": colors["entry_fg"]},
+        "TButton": dict(button, font=("Arial", 10), padding=(3, 3, 3, 3)),
+        "Num.TButton": button,
+    }
+    maps = {
+        "TButton": {"background": [("active", colors["button_active_bg"]), ("pressed", colors["button_active_bg"])]},
+        "Num.TButton": {"background": [("active", colors["button_active_bg"])]},
+    }
+    for style, role in (("Op.TButton", "operator_button"), ("Mem.TButton", "memory_button"), ("Eq.TButton", "equals_button"), ("Spec.TButton", "special_button")):
+        styles[style] = {"background": colors[role + "_bg"], "foreground": colors[role + "_fg"]}
+        maps[style] = {"background": [("active", colors[role + "_active_bg"])]}
+    widgets = {
+        "root": {"bg": colors["bg"]},
+        "window": {"bg": colors["bg"]},
+        "listbox": {"bg": colors["listbox_bg"], "fg": colors["listbox_fg"], "selectbackground": colors["listbox_select_bg"], "selectforeground": colors["listbox_select_fg"]},
+        "text": {"bg": colors["entry_bg"], "fg": colors["entry_fg"], "insertbackground": colors["entry_fg"]},
+        "canvas": {"bg": colors["display_bg"]},
+        "plot": {"axis": colors["mem_slot_fg"], "label": colors["display_fg"], "curve": colors["plot_curve"]}, # Canvas item fills by tag
+    }
+    return ThemeTable(name, styles, maps, widgets)
+
+_tables = {}
+
+def theme_table(name):
+    """The compiled table of theme ``name`` (Light if unknown), built on first use."""
+    if name not in THEMES: name = "Light"
+    table = _tables.get(name)
+    if table is None: table = _tables[name] = compile_theme(name, THEMES[name])
+    return table
@@ -0,0 +1,107 @@
+"""Batch unit conversion: pasted lists, CSV columns and files.
+
+Values are read lazily and converted ``chunk_size`` at a time, so a
+multi-GB file never sits in memory. Each chunk is converted in one
+vectorised multiply-add with NumPy when it is installed, or with a loop over
+an ``array('d')`` otherwise. Also usable from the command line::
+
+    python -m unit_batch Length m ft measurements.csv --column 2 --skip-header
+"""
+import argparse
+import csv
+import itertools
+import math
+import sys
+from array import array
+from units import default_catalog
+
+try:
+    import numpy # Optional; without it chunks are converted in a pure-Python loop
+except ImportError:
+    numpy = None
+
+CHUNK_SIZE = 65536
+
+def convert_array(values, scale, offset):
+    """``values * scale + offset`` for a whole chunk: a NumPy array if available, else ``array('d')``."""
+    if numpy is not None: return numpy.asarray(values, dtype=float) * scale + offset
+    return array("d", [value * scale + offset for value in values])
+
+def _parse(text):
+    # NaN marks an invalid value; float() also accepts "nan" and "inf", which are invalid too
+    try: value = float(text)
+    except ValueError: return math.nan
+    return value if math.isfinite(value) else math.nan
+
+def _parse_lines(lines):
+    # float() accepts surrounding whitespace, so a clean chunk converts in one pass; the sum of
+    # finite values is only non-finite if it overflows, which just takes the slow path
+    try:
+        values = array("d", map(float, lines))
+        if math.isfinite(sum(values)): return values, True
+    except ValueError: pass
+    return array("d", [_parse(line) for line in lines]), False
+
+def _parse_rows(rows, column):
+    return array("d", [_parse(row[column]) if column < len(row) else math.nan for row in rows]), False
+
+def convert_stream(lines, category, from_unit, to_unit, column=None, delimiter=",", chunk_size=CHUNK_SIZE,
+                   format_spec=None, invalid="", catalog=None):
+    """Yield lists of formatted results, one list per ``chunk_size`` input lines.
+
+    Units may be given by ID, symbol, name or alias. Without ``column`` every line is a value; with
+    it, values come from that CSV column. Anything that is not a finite number, including a blank
+    line, gives ``invalid``, so there is one result per input line.
+    """
+    if chunk_size < 1: raise ValueError("chunk_size must be at least 1")
+    unit_category = (default_catalog() if catalog is None else catalog)[category]
+    scale, offset = unit_category.coefficients(unit_category.unit(from_unit).id, unit_category.unit(to_unit).id)
+    formatter = ("{:" + (unit_category.format_spec if format_spec is None else format_spec) + "}").format
+    rows = iter(lines) if column is None else csv.reader(lines, delimiter=delimiter)
+    while True:
+        batch = list(itertools.islice(rows, chunk_size))
+        if not batch: return
+        chunk, clean = _parse_lines(batch) if column is None else _parse_rows(batch, column)
+        results = convert_array(chunk, scale, offset)
+        if clean: yield list(map(formatter, results))
+        else: yield [formatter(value) if value == value else invalid for value in results] # NaN != NaN
+
+def convert_file(source, destination, category, from_unit, to_unit, **options):
+    """Convert ``source`` (a file object or iterable of lines) into ``destination``; returns the number of values."""
+    count = 0
+    for chunk in convert_stream(source, category, from_unit, to_unit, **options):
+        destination.write("\n".join(chunk)); destination.write("\n"); count += len(chunk)
+    return count
+
+def _positive_int(text):
+    value = int(text)
+    if value < 1: raise argparse.ArgumentTypeError(f"must be at least 1, not {value}")
+    return value
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="unit_batch", description="Convert many values between units.")
+    parser.add_argument("category", help='e.g. "Length"')
+    parser.add_argument("from_unit", help='unit ID, symbol or name, e.g. "m"'); parser.add_argument("to_unit", help='e.g. "ft" or "feet"')
+    parser.add_argument("input", nargs="?", help="file to read (default: standard input)")
+    parser.add_argument("-o", "--output", help="file to write (default: standard output)")
+    parser.add_argument("--column", type=int, help="read this 0-based CSV column instead of one value per line")
+    parser.add_argument("--delimiter", default=",")
+    parser.add_argument("--skip-header", action="store_true", help="ignore the first line")
+    parser.add_argument("--format", dest="format_spec", help="format spec for results (default: the category's)")
+    parser.add_argument("--chunk-size", type=_positive_int, default=CHUNK_SIZE, help=f"values per chunk (default {CHUNK_SIZE})")
+    args = parser.parse_args(argv)
+    source = open(args.input, newline="") if args.input else sys.stdin
+    destination = open(args.output, "w") if args.output else sys.stdout
+    try:
+        lines = iter(source)
+        if args.skip_header: next(lines, None)
+        convert_file(lines, destination, args.category, args.from_unit, args.to_unit, column=args.column,
+                     delimiter=args.delimiter, chunk_size=args.chunk_size, format_spec=args.format_spec)
+    except KeyError as e: parser.error(f"unknown category or unit: {e}")
+    finally:
+        if source is not sys.stdin: source.close()
+        if destination is not sys.stdout: destination.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
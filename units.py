@@ -0,0 +1,165 @@
+"""Unit conversion engine.
+
+Every unit is an affine transform onto its category's base unit
+(``base = value * scale + offset``), so Temperature needs no special case.
+Each category precomputes its from→to matrix of ``(scale, offset)`` pairs,
+one source row at a time the first time that unit is converted from, so a
+conversion is one lookup and one multiply-add. Categories larger than
+``MATRIX_MAX_UNITS`` (thousands of currencies) compose the pair per call
+instead of caching millions of them. Units are
+keyed by compact IDs ("m", "degF"); display labels are only used by the UI.
+
+The catalogue is data: ``units.json`` (plus ``units_local.json`` in the
+working directory, if present, e.g. for an offline currency table) is read
+the first time ``default_catalog()`` is called. Units can be looked up by ID,
+symbol, name, label or alias, and searched by prefix for type-ahead pickers.
+"""
+import bisect
+import itertools
+import json
+import os
+
+DATA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "units.json")
+LOCAL_DATA_FILE = "units_local.json"
+MATRIX_MAX_UNITS = 512 # Bigger categories are not cached as a matrix (rows would grow to n² pairs)
+MICRO_SIGNS = ("µ", "μ") # Micro sign and Greek mu; both are typed for "micro"
+
+class Unit:
+    __slots__ = ("id", "name", "symbol", "scale", "offset", "aliases")
+
+    def __init__(self, id, name, symbol, scale, offset=0.0, aliases=()):
+        self.id = id; self.name = name; self.symbol = symbol
+        self.scale = scale; self.offset = offset; self.aliases = tuple(aliases)
+
+    @property
+    def label(self):
+        return f"{self.name} ({self.symbol})"
+
+    def keys(self):
+        return (self.id, self.symbol, self.name, self.label) + self.aliases
+
+def _compose(source, target):
+    if source is target: return (1.0, 0.0) # Exact identity
+    return (source.scale / target.scale, (source.offset - target.offset) / target.scale)
+
+class UnitCategory:
+    def __init__(self, name, units, format_spec=".6g"):
+        self.name = name
+        self.units = []; self._by_id = {}
+        self.format_spec = format_spec # Display precision for results in this category
+        self._matrix = {} # from_id -> {to_id: (scale, offset)} with to = from * scale + offset
+        self._exact = None; self._folded = None; self._search_keys = None # Lookup index, built on first use
+        for unit in units: self.add(unit)
+
+    def add(self, unit):
+        if unit.id in self._by_id: return # The first definition of an ID wins
+        self._by_id[unit.id] = unit; self.units.append(unit)
+        self._matrix = {}; self._exact = None
+
+    @property
+    def labels(self):
+        return [unit.label for unit in self.units]
+
+    def _build_index(self):
+        # Exact keys take priority over case-insensitive ones ("mm" is not "Mm"); earlier units win ties
+        self._exact = {}; self._folded = {}; search_keys = set()
+        for position, unit in enumerate(self.units):
+            for key in unit.keys():
+                self._exact.setdefault(key, unit)
+                self._folded.setdefault(key.casefold(), unit)
+                search_keys.add((key.casefold(), position))
+        self._search_keys = sorted(search_keys)
+
+    def unit(self, text):
+        """The unit whose ID, symbol, name, label or alias is ``text``; raises KeyError."""
+        if self._exact is None: self._build_index()
+        text = text.strip()
+        unit = self._exact.get(text) or self._folded.get(text.casefold())
+        if unit is None: raise KeyError(text)
+        return unit
+
+    def search(self, text, limit=None):
+        """Units with a key starting with ``text`` (case-insensitive), in catalogue order."""
+        if self._exact is None: self._build_index()
+        prefix = text.strip().casefold()
+        if not prefix: return self.units[:limit]
+        positions = set()
+        start = bisect.bisect_left(self._search_keys, (prefix,))
+        for key, position in itertools.islice(self._search_keys, start, None):
+            if not key.startswith(prefix): break
+            positions.add(position)
+        return [self.units[position] for position in sorted(positions)[:limit]]
+
+    def coefficients(self, from_id, to_id):
+        """``(scale, offset)`` for converting ``from_id`` to ``to_id``; raises KeyError for unknown IDs."""
+        row = self._matrix.get(from_id)
+        if row is None:
+            source = self._by_id[from_id]
+            if len(self.units) > MATRIX_MAX_UNITS: return _compose(source, self._by_id[to_id])
+            row = self._matrix[from_id] = {target.id: _compose(source, target) for target in self.units}
+        return row[to_id]
+
+    def convert(self, value, from_id, to_id):
+        row = self._matrix.get(from_id)
+        scale, offset = row[to_id] if row is not None else self.coefficients(from_id, to_id)
+        return value * scale + offset
+
+    def format(self, value):
+        return format(value, self.format_spec)
+
+class UnitCatalog:
+    def __init__(self, categories=()):
+        self.categories = {category.name: category for category in categories}
+
+    @property
+    def names(self):
+        return list(self.categories)
+
+    def __getitem__(self, name):
+        return self.categories[name]
+
+    def __contains__(self, name):
+        return name in self.categories
+
+    def __len__(self):
+        return sum(len(category.units) for category in self.categories.values())
+
+    def merge(self, data):
+        """Add the categories and units of a parsed data file (see ``units.json``)."""
+        prefix_sets = data.get("prefix_sets", {})
+        prefixes_by_symbol = {prefix[0]: prefix for prefixes in prefix_sets.values() for prefix in prefixes}
+        for category_data in data.get("categories", []):
+            category = self.categories.get(category_data["name"])
+            if category is None:
+                category = self.categories[category_data["name"]] = UnitCategory(category_data["name"], [], category_data.get("format", ".6g"))
+            prefixed = []
+            for unit_data in category_data["units"]:
+                unit = Unit(unit_data["id"], unit_data["name"], unit_data["symbol"], float(unit_data["scale"]),
+                            float(unit_data.get("offset", 0.0)), unit_data.get("aliases", ()))
+                category.add(unit)
+                for entry in unit_data.get("prefixes", ()):
+                    for prefix in prefix_sets.get(entry) or [prefixes_by_symbol[entry]]: prefixed.append(_prefixed(unit, *prefix))
+            for unit in prefixed: category.add(unit) # After the explicitly listed units, which keep their order
+        return self
+
+    @classmethod
+    def load(cls, *paths):
+        catalog = cls()
+        for path in paths:
+            with open(path, encoding="utf-8") as f: catalog.merge(json.load(f))
+        return catalog
+
+def _prefixed(unit, symbol, name, factor):
+    aliases = [name + alias for alias in unit.aliases if alias[:1].islower()]
+    if symbol in MICRO_SIGNS: aliases += ["u" + unit.id] + [sign + unit.symbol for sign in MICRO_SIGNS if sign != symbol]
+    return Unit(symbol + unit.id, name.capitalize() + unit.name[0].lower() + unit.name[1:], symbol + unit.symbol, factor * unit.scale, 0.0, aliases)
+
+_default_catalog = None
+
+def default_catalog():
+    """The shipped catalogue, plus ``LOCAL_DATA_FILE`` if it exists; loaded on first use."""
+    global _default_catalog
+    if _default_catalog is None:
+        paths = [DATA_FILE] + ([LOCAL_DATA_FILE] if os.path.exists(LOCAL_DATA_FILE) else [])
+        _default_catalog = UnitCatalog.load(*paths)
+    return _default_catalog